@@ -0,0 +1,60 @@
+"""
+Benchmark: per-record FMP ingest decoding, legacy path vs. precompiled codec.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingest_codec [--records 2000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+from schemas.fmp_codec import FMPStatementCodec
+from schemas.fmp_schemas import FMPBalanceSheetSchema, FMPIncomeStatementSchema, FMPCashFlowStatementSchema
+from utils.case_converter import convert_keys_to_snake_case
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "financial_data"
+
+FIXTURES = {
+    "balance": (FIXTURE_DIR / "APPL_balance.json", FMPBalanceSheetSchema),
+    "income": (FIXTURE_DIR / "APPL_income.json", FMPIncomeStatementSchema),
+    "cash": (FIXTURE_DIR / "APPL_cash.json", FMPCashFlowStatementSchema),
+}
+
+
+def legacy_split(schema, data):
+    """The decoding previously done by `_upsert_single` for every record."""
+    snake_case_data = convert_keys_to_snake_case(data)
+    parsed_data = schema.model_validate(snake_case_data)
+    core_field_names = set(schema.model_fields.keys())
+    core_data_dict = parsed_data.model_dump(include=core_field_names, exclude_unset=True)
+    eav_data = parsed_data.model_dump(exclude=core_field_names, exclude_unset=True)
+    return core_data_dict, eav_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000, help="records decoded per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'statement':<10} {'legacy µs/rec':>14} {'codec µs/rec':>13} {'speedup':>8}")
+    for name, (path, schema) in FIXTURES.items():
+        fixture = json.loads(path.read_text())
+        records = (fixture * (args.records // len(fixture) + 1))[:args.records]
+        codec = FMPStatementCodec(schema)
+
+        # 两条路径的输出必须一致
+        for record in fixture:
+            core, eav = legacy_split(schema, record)
+            core_values, eav_pairs = codec.decode(record)
+            assert core_values == core
+            assert dict(eav_pairs) == eav
+
+        legacy = min(timeit.repeat(lambda: [legacy_split(schema, r) for r in records], number=1, repeat=args.repeat))
+        compiled = min(timeit.repeat(lambda: [codec.decode(r) for r in records], number=1, repeat=args.repeat))
+        print(f"{name:<10} {legacy / len(records) * 1e6:>14.1f} {compiled / len(records) * 1e6:>13.1f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
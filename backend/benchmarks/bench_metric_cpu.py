@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: CPU cost of building one metric chart from already fetched series.
+
+Runs `get_chart_data` of every registered metric (plus a synthetic multi-series metric,
+since the only registered one depends on unavailable data) on random `--points`-year
+series and prints the median time per call. No database is involved.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metric_cpu [--points 10] [--calls 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.metrics import get_metric, get_metric_names
+from services.metrics.multi_metric import MultiMetric
+
+
+class _SpreadMetric(MultiMetric):
+    """Three-input arithmetic metric exercising the MultiMetric alignment path."""
+    metric_name = "bench_spread"
+    chart_title = "bench"
+    dependent_metrics = ["operating_cash_flow", "free_cash_flow", "net_income"]
+    register_metric = False
+
+    def _calculate_series_values(self, aligned_df):
+        return (aligned_df["operating_cash_flow"] - aligned_df["free_cash_flow"]) / aligned_df["net_income"]
+
+
+def random_series(points: int):
+    return [{"year": str(2000 + i), "value": random.uniform(-1e11, 1e11)} for i in range(points)]
+
+
+def time_metric(metric, points: int, calls: int, rounds: int = 5) -> float:
+    """Median microseconds per `get_chart_data` call."""
+    dependencies = metric.dependencies or [metric.metric_name]
+    data = {name: random_series(points) for name in dependencies}
+    metric.get_chart_data(data)  # 预热
+    samples = []
+    for _ in range(rounds):
+        start = time.process_time()
+        for _ in range(calls):
+            metric.get_chart_data(data)
+        samples.append((time.process_time() - start) / calls * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10, help="years per series")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per timing round")
+    args = parser.parse_args()
+
+    random.seed(42)
+    metrics = [get_metric(name) for name in get_metric_names()] + [_SpreadMetric()]
+    print(f"{'metric':<42} {'kind':<13} {'µs/call':>9}")
+    for metric in metrics:
+        kind = next(base.__name__ for base in type(metric).__mro__[1:] if base.__name__.endswith("Metric"))
+        print(f"{metric.metric_name:<42} {kind:<13} {time_metric(metric, args.points, args.calls):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,11 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from core.config import config
 from core.database import engine
-from core.exceptions import http_exception_handler, generic_exception_handler, validation_exception_handler
+from core.exceptions import http_exception_handler, generic_exception_handler, validation_exception_handler, \
+    vendor_unavailable_exception_handler, VendorUnavailableError
 from core.lifespan import lifespan
 from core.middleware import register_middlewares
-from routers import company, financial_statement, valuation
+from routers import company, financial_statement, valuation, ingest_job, vendor, metric_formula, export
 
 
 def create_app() -> FastAPI:
@@ -33,6 +34,7 @@ def create_app() -> FastAPI:
     # -----------------------------
     app.add_exception_handler(StarletteHTTPException, http_exception_handler)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(VendorUnavailableError, vendor_unavailable_exception_handler)
     app.add_exception_handler(Exception, generic_exception_handler)
 
     # -----------------------------
@@ -41,5 +43,9 @@ def create_app() -> FastAPI:
     app.include_router(company.router, prefix=config.api.prefix)
     app.include_router(financial_statement.router, prefix=config.api.prefix)
     app.include_router(valuation.router, prefix=config.api.prefix)
+    app.include_router(ingest_job.router, prefix=config.api.prefix)
+    app.include_router(vendor.router, prefix=config.api.prefix)
+    app.include_router(metric_formula.router, prefix=config.api.prefix)
+    app.include_router(export.router, prefix=config.api.prefix)
 
     return app
\ No newline at end of file
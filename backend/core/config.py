@@ -2,6 +2,7 @@ import yaml
 from pathlib import Path
 from pydantic import BaseModel
 import os
+from typing import Dict, List, Optional
 
 class AppInfo(BaseModel):
     name: str
@@ -31,8 +32,60 @@ class OpenTelemetryConfig(BaseModel):
     deployment_environment: str
     otlp_endpoint: str
 
+class FMPCacheConfig(BaseModel):
+    enabled: bool = True
+    directory: str = "./cache/fmp"
+    max_bytes: int = 512 * 1024 * 1024
+    default_ttl: int = 24 * 3600
+    endpoint_ttl: Dict[str, int] = {}
+
+class FMPClientConfig(BaseModel):
+    rate_limit_per_minute: int = 300
+    burst: int = 10
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 60.0
+
 class FinancialModelingPrepConfig(BaseModel):
     apikey:str
+    base_url: str = "https://financialmodelingprep.com/stable"
+    max_concurrency: int = 10
+    cache: FMPCacheConfig = FMPCacheConfig()
+    client: FMPClientConfig = FMPClientConfig()
+    offline: bool = False
+    fixtures_dir: str = "./financial_data"
+
+class WorkersConfig(BaseModel):
+    pool_size: int
+    stale_after_seconds: int = 3600
+
+class ChartCacheConfig(BaseModel):
+    enabled: bool = True
+    max_entries: int = 5000
+    ttl_seconds: int = 3600
+
+class MetricSeriesConfig(BaseModel):
+    enabled: bool = True
+    debounce_seconds: float = 1.0
+
+class StatementStoreConfig(BaseModel):
+    enabled: bool = False
+    max_megabytes: int = 512
+
+class StatementVersionsConfig(BaseModel):
+    enabled: bool = True
+    poll_interval_seconds: float = 1.0
+    lookback_seconds: int = 300
+
+class MetricFormulaConfig(BaseModel):
+    name: str
+    formula: str
+    title: Optional[str] = None
+    unit: Optional[str] = None
 
 class AppConfig(BaseModel):
     app: AppInfo
@@ -42,6 +95,12 @@ class AppConfig(BaseModel):
     database: DatabaseConfig
     opentelemetry: OpenTelemetryConfig
     financial_modeling_prep:FinancialModelingPrepConfig
+    workers: WorkersConfig
+    chart_cache: ChartCacheConfig = ChartCacheConfig()
+    metric_series: MetricSeriesConfig = MetricSeriesConfig()
+    statement_store: StatementStoreConfig = StatementStoreConfig()
+    statement_versions: StatementVersionsConfig = StatementVersionsConfig()
+    metric_formulas: List[MetricFormulaConfig] = []
 
 def merge_configs(base, override):
     for key, value in override.items():
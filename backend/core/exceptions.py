@@ -42,4 +42,28 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             msg=f"Validation Error: {detail_message}",
         ).model_dump(exclude_none=True),
-    )
\ No newline at end of file
+    )
+
+class VendorUnavailableError(Exception):
+    """
+    外部数据供应商（如 FMP）暂时不可用：熔断器打开，或限流/服务端错误在重试后仍未恢复。
+    """
+
+    def __init__(self, vendor: str, detail: str, retry_after: float = None):
+        super().__init__(f"{vendor} is unavailable: {detail}")
+        self.vendor = vendor
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+async def vendor_unavailable_exception_handler(request: Request, exc: VendorUnavailableError):
+    """
+    供应商不可用时返回 503，而不是 404 或 500。
+    """
+    logger.warning(str(exc))
+    headers = {"Retry-After": str(int(exc.retry_after) + 1)} if exc.retry_after else None
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=ApiResponse(status=status.HTTP_503_SERVICE_UNAVAILABLE, msg=str(exc), data=None).model_dump(),
+        headers=headers,
+    )
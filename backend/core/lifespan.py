@@ -1,7 +1,47 @@
+import threading
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from core.log import logger
-from core.database import init_db, engine
+from core.database import init_db, engine, SessionLocal
+from modules.workers import ingest_pool
+from repositories.financial_repo import get_fmp_batch_loader, get_metric_repositories, load_metric_catalog, refresh_metric_catalog
+from repositories.statement_store import statement_store
+from core.config import config
+from repositories.events import statement_events, statement_version_watcher
+from services.metric_formula_service import load_metric_formulas
+from services.metric_series_service import metric_series_materializer
+from services.metrics.graph import get_metric_graph
+
+def _load_metric_catalog():
+    """启动时构建指标位置索引；失败时不阻塞启动，首次查询指标时再加载。"""
+    db = SessionLocal()
+    try:
+        load_metric_catalog(db)
+    except Exception as e:
+        logger.warning(f"Metric catalog not loaded at startup: {e}")
+    finally:
+        db.close()
+
+
+def _load_metric_formulas():
+    """启动时编译并注册配置文件与数据库中的公式指标（需在指标目录加载之后，以便校验引用）。"""
+    db = SessionLocal()
+    try:
+        count = load_metric_formulas(db)
+        logger.info(f"Registered {count} metric formulas")
+    except Exception as e:
+        logger.warning(f"Metric formulas not loaded at startup: {e}")
+    finally:
+        db.close()
+
+
+def _load_statement_store():
+    """后台批量载入报表列存；载入完成前指标读取回退数据库。"""
+    try:
+        statement_store.load(get_metric_repositories())
+    except Exception as e:
+        logger.warning(f"Statement store not loaded: {e}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -10,5 +50,25 @@ async def lifespan(app: FastAPI):
     """
     logger.info("🚀 Application starting up... Initializing database.")
     init_db()  # Automatically import models and create tables (checkfirst=True)
+    get_metric_graph()  # 校验指标依赖图，存在循环依赖时直接启动失败
+    if config.statement_versions.enabled:
+        # 先记录当前版本号再加载各缓存：加载期间其他进程提交的写入随后仍会同步到本进程
+        statement_version_watcher.start()
+        statement_events.subscribe(refresh_metric_catalog)
+    _load_metric_catalog()
+    _load_metric_formulas()
+    if config.statement_store.enabled:
+        # 列存先于其他订阅者刷新，物化序列与图表缓存随后读到的是新数据
+        statement_events.subscribe(statement_store.on_statements_changed, first=True)
+        threading.Thread(target=_load_statement_store, name="statement-store-loader", daemon=True).start()
+    if config.metric_series.enabled:
+        # 报表写入提交后在后台线程重算受影响公司的物化指标序列
+        metric_series_materializer.start()
+        statement_events.subscribe(metric_series_materializer.on_statements_changed)
+    ingest_pool.start()
     yield
     logger.info("🛑 Application shutting down... Cleaning up resources.")
+    ingest_pool.shutdown()
+    get_fmp_batch_loader().close()
+    statement_version_watcher.shutdown()
+    metric_series_materializer.shutdown()
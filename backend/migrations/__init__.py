@@ -0,0 +1,6 @@
+"""
+手动执行的数据库迁移脚本（`Base.metadata.create_all` 只会建新表，不会为已有表补索引）。
+
+Usage (from backend/):
+    python -m migrations.<name> [--dry-run]
+"""
@@ -0,0 +1,120 @@
+"""
+Adds the composite and unique indexes of the statement core and EAV tables to an existing
+database.
+
+The unique keys cannot be created while duplicates exist, so each table is deduplicated
+first: for a repeated (symbol, fiscal_year, period) the most recently inserted statement
+is kept and the EAV rows of the others are removed with them; for a repeated
+(statement, attribute_name) the most recently inserted EAV row is kept.
+
+Usage (from backend/):
+    python -m migrations.add_statement_indexes [--dry-run]
+"""
+import argparse
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import Engine, Index, MetaData, Table, UniqueConstraint, and_, delete, func, inspect, select
+from sqlalchemy.orm import Session
+
+from core.log import logger
+from models import (
+    BalanceSheetStatementCore, BalanceSheetStatementEAV,
+    IncomeSheetStatementCore, IncomeSheetStatementEAV,
+    CashSheetStatementCore, CashSheetStatementEAV,
+)
+from repositories.base import chunked
+
+# (核心表, EAV 表, EAV 外键列)
+STATEMENT_TABLES = (
+    (BalanceSheetStatementCore.__table__, BalanceSheetStatementEAV.__table__, "balance_statement_id"),
+    (IncomeSheetStatementCore.__table__, IncomeSheetStatementEAV.__table__, "income_statement_id"),
+    (CashSheetStatementCore.__table__, CashSheetStatementEAV.__table__, "cash_statement_id"),
+)
+
+
+def target_indexes(table: Table) -> List[Index]:
+    """
+    The composite/unique indexes the model declares for `table`, as Index objects bound to
+    a detached copy of the table (so the model metadata itself is never modified).
+    """
+    copy = table.to_metadata(MetaData())
+    indexes = [index for index in copy.indexes if len(index.columns) > 1]
+    indexes += [
+        Index(constraint.name, *(copy.c[column.name] for column in constraint.columns), unique=True)
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.name
+    ]
+    return indexes
+
+
+def _duplicate_ids(db: Session, table: Table, key_columns: Sequence[str]) -> List[int]:
+    """Ids of every row except the newest one of each duplicated key."""
+    keys = [table.c[name] for name in key_columns]
+    groups = (
+        select(*keys, func.max(table.c.id).label("keep_id"))
+        .group_by(*keys)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    return list(db.scalars(
+        select(table.c.id)
+        .join(groups, and_(*(table.c[name] == groups.c[name] for name in key_columns)))
+        .where(table.c.id != groups.c.keep_id)
+    ))
+
+
+def deduplicate(db: Session, core: Table, eav: Table, fk_name: str) -> Tuple[int, int]:
+    """Removes duplicated statements (with their EAV rows) and duplicated EAV attributes."""
+    statement_ids = _duplicate_ids(db, core, ("symbol", "fiscal_year", "period"))
+    for ids in chunked(statement_ids):
+        db.execute(delete(eav).where(eav.c[fk_name].in_(list(ids))))
+        db.execute(delete(core).where(core.c.id.in_(list(ids))))
+
+    attribute_ids = _duplicate_ids(db, eav, (fk_name, "attribute_name"))
+    for ids in chunked(attribute_ids):
+        db.execute(delete(eav).where(eav.c.id.in_(list(ids))))
+    return len(statement_ids), len(attribute_ids)
+
+
+def create_missing_indexes(engine: Engine, tables: Sequence[Table], *, dry_run: bool = False) -> List[str]:
+    """Creates the declared composite/unique indexes that the database does not have yet."""
+    inspector = inspect(engine)
+    created = []
+    for table in tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        existing |= {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+        for index in target_indexes(table):
+            if index.name in existing:
+                continue
+            if not dry_run:
+                index.create(bind=engine)
+            created.append(index.name)
+    return created
+
+
+def upgrade(engine: Engine, *, dry_run: bool = False) -> None:
+    with Session(engine) as db:
+        for core, eav, fk_name in STATEMENT_TABLES:
+            statements, attributes = deduplicate(db, core, eav, fk_name)
+            logger.info(f"{core.name}: {statements} duplicated statements, {eav.name}: {attributes} duplicated attributes")
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+    tables = [table for core, eav, _ in STATEMENT_TABLES for table in (core, eav)]
+    for name in create_missing_indexes(engine, tables, dry_run=dry_run):
+        logger.info(f"{'Would create' if dry_run else 'Created'} index {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report duplicates and missing indexes without changing anything")
+    args = parser.parse_args()
+
+    from core.database import engine
+    upgrade(engine, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
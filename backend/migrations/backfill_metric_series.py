@@ -0,0 +1,59 @@
+"""
+Computes the materialized metric series (`metric_series` table) of the companies already in
+the database.
+
+Statement writes keep the table up to date afterwards. Run this once after deploying the
+table, and again after changing a metric class or a formula of the config file (charts of
+metrics without stored points are computed live in the meantime).
+
+Usage (from backend/):
+    python -m migrations.backfill_metric_series [--company-id ID ...] [--metric NAME ...]
+"""
+import argparse
+from typing import List, Optional
+
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from core.log import logger
+from models import Base, Company, MetricSeriesPoint, StatementVersion
+
+
+def backfill(engine: Engine, company_ids: Optional[List[int]] = None, metric_names: Optional[List[str]] = None) -> int:
+    """Materializes `metric_names` (every registered metric when None) for the given companies (all when None)."""
+    from repositories.financial_repo import load_metric_catalog
+    from services.metric_formula_service import load_metric_formulas
+    from services.metric_series_service import MetricSeriesMaterializer
+    from services.metrics import get_metric_names
+
+    Base.metadata.create_all(engine, tables=[MetricSeriesPoint.__table__, StatementVersion.__table__])
+    materializer = MetricSeriesMaterializer(lambda: Session(engine))
+    total = 0
+    with Session(engine) as db:
+        # 公式指标也需要物化：先加载指标目录与公式
+        load_metric_catalog(db)
+        load_metric_formulas(db)
+        unknown = sorted(set(metric_names or []) - set(get_metric_names()))
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+        company_ids = company_ids or list(db.scalars(select(Company.id).order_by(Company.id)))
+        for company_id in company_ids:
+            points = materializer.materialize(db, company_id, metric_names)
+            logger.info(f"Company {company_id}: {points} metric points")
+            total += points
+    logger.info(f"Materialized {total} metric points for {len(company_ids)} companies")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", type=int, action="append", help="only this company (repeatable)")
+    parser.add_argument("--metric", action="append", help="only this metric (repeatable)")
+    args = parser.parse_args()
+
+    from core.database import engine
+    backfill(engine, company_ids=args.company_id, metric_names=args.metric)
+
+
+if __name__ == "__main__":
+    main()
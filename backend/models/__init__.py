@@ -3,6 +3,10 @@ from models.company import Company,IndustryProfile
 from models.financial_balance import BalanceSheetStatementCore, BalanceSheetStatementEAV
 from models.financial_income import IncomeSheetStatementCore, IncomeSheetStatementEAV
 from models.financial_cash import CashSheetStatementCore,CashSheetStatementEAV
+from models.ingest_job import IngestJob, IngestJobStatus
+from models.metric_formula import MetricFormula
+from models.metric_series import MetricSeriesPoint
+from models.statement_version import StatementVersion
 __all__ = [
     "Base",
     "TimestampMixin",
@@ -14,4 +18,9 @@ __all__ = [
     "IncomeSheetStatementEAV",
     "CashSheetStatementCore",
     "CashSheetStatementEAV",
+    "IngestJob",
+    "IngestJobStatus",
+    "MetricFormula",
+    "MetricSeriesPoint",
+    "StatementVersion",
 ]
\ No newline at end of file
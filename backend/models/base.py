@@ -1,7 +1,8 @@
 from datetime import datetime, timezone, timedelta
 
-from sqlalchemy import Column, DateTime, String, Date
+from sqlalchemy import Column, DateTime, String, Date, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import declared_attr
 
 Base = declarative_base()
 # 定义东八区时区对象
@@ -16,8 +17,29 @@ class TimestampMixin:
     updated_at = Column(DateTime(timezone=True), default=now_cst, onupdate=now_cst)
 
 
+def eav_table_args(tablename: str, fk_name: str) -> tuple:
+    """
+    EAV 表的约束与索引：
+    - (报表ID, 属性名) 唯一，防止并发 upsert 写入重复属性；
+    - (报表ID, 属性名, 数值) 覆盖索引，数值型指标读取无需回表。
+    """
+    return (
+        UniqueConstraint(fk_name, "attribute_name", name=f"uq_{tablename}_statement_attr"),
+        Index(f"ix_{tablename}_numeric", fk_name, "attribute_name", "value_numeric"),
+    )
+
+
 class FinancialBaseMixin:
 
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            # upsert 的查找键；唯一约束防止并发 upsert 写入重复报告期
+            UniqueConstraint("symbol", "fiscal_year", "period", name=f"uq_{cls.__tablename__}_symbol_period"),
+            # 指标读取路径：按公司取时间序列
+            Index(f"ix_{cls.__tablename__}_company_year", "company_id", "fiscal_year"),
+        )
+
     # ---------- Meta Info ----------
     symbol = Column(String(20), index=True, nullable=False, comment="Ticker symbol")
     cik = Column(String(20), nullable=True, comment="CIK number")
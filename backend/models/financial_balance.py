@@ -2,7 +2,7 @@ from sqlalchemy import Column, String, Integer, Date, BigInteger, ForeignKey, Te
 from sqlalchemy.orm import relationship
 
 from models import Base, TimestampMixin
-from models.base import FinancialBaseMixin
+from models.base import FinancialBaseMixin, eav_table_args
 
 
 class BalanceSheetStatementCore(Base, FinancialBaseMixin,TimestampMixin):
@@ -57,6 +57,7 @@ class BalanceSheetStatementCore(Base, FinancialBaseMixin,TimestampMixin):
 
 class BalanceSheetStatementEAV(Base, TimestampMixin):
     __tablename__ = 'balance_sheet_statement_eav'
+    __table_args__ = eav_table_args('balance_sheet_statement_eav', 'balance_statement_id')
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
     balance_statement_id = Column(Integer, ForeignKey('balance_sheet_statement_core.id'), nullable=False, index=True, comment="报表ID")
@@ -2,7 +2,7 @@ from sqlalchemy import Column, String, Integer, Date, BigInteger, ForeignKey, Te
 from sqlalchemy.orm import relationship
 
 from models import Base, TimestampMixin
-from models.base import FinancialBaseMixin
+from models.base import FinancialBaseMixin, eav_table_args
 
 
 class CashSheetStatementCore(Base, FinancialBaseMixin, TimestampMixin):
@@ -50,6 +50,7 @@ class CashSheetStatementCore(Base, FinancialBaseMixin, TimestampMixin):
 
 class CashSheetStatementEAV(Base, TimestampMixin):
     __tablename__ = 'cash_sheet_statement_eav'
+    __table_args__ = eav_table_args('cash_sheet_statement_eav', 'cash_statement_id')
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
     cash_statement_id = Column(Integer, ForeignKey('cash_sheet_statement_core.id'), nullable=False, index=True, comment="报表ID")
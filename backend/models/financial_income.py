@@ -2,7 +2,7 @@ from sqlalchemy import Column, String, Integer, Date, BigInteger, ForeignKey, Te
 from sqlalchemy.orm import relationship
 
 from models import Base, TimestampMixin
-from models.base import FinancialBaseMixin
+from models.base import FinancialBaseMixin, eav_table_args
 
 
 class IncomeSheetStatementCore(Base, FinancialBaseMixin, TimestampMixin):
@@ -51,6 +51,7 @@ class IncomeSheetStatementCore(Base, FinancialBaseMixin, TimestampMixin):
 
 class IncomeSheetStatementEAV(Base, TimestampMixin):
     __tablename__ = 'income_sheet_statement_eav'
+    __table_args__ = eav_table_args('income_sheet_statement_eav', 'income_statement_id')
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
     income_statement_id = Column(Integer, ForeignKey('income_sheet_statement_core.id'), nullable=False, index=True, comment="报表ID")
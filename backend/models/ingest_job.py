@@ -0,0 +1,36 @@
+from enum import Enum
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum as SqlEnum
+
+from models.base import Base, TimestampMixin
+
+
+class IngestJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class IngestJob(Base, TimestampMixin):
+    """后台财报导入任务：一个任务对应 (公司, 报表类型) 的一次拉取与 upsert"""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True, comment="公司ID")
+    ticker = Column(String(50), nullable=False, comment="股票代码")
+    statement_type = Column(String(20), nullable=False, comment="报表类型(balance/income/cash)")
+    mode = Column(String(20), nullable=False, default="incremental", comment="同步模式(latest/full/incremental)")
+    period = Column(String(20), nullable=False, default="annual", comment="报告期(annual/quarter)")
+
+    status = Column(SqlEnum(IngestJobStatus), nullable=False, default=IngestJobStatus.PENDING, index=True, comment="任务状态")
+    progress = Column(Integer, nullable=False, default=0, comment="进度(0-100)")
+    message = Column(String(255), nullable=True, comment="当前步骤说明")
+    result = Column(Text, nullable=True, comment="upsert 结果摘要(JSON)")
+    error = Column(Text, nullable=True, comment="失败原因")
+
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="开始执行时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+
+    def __repr__(self):
+        return f"<IngestJob(id={self.id}, ticker={self.ticker}, type={self.statement_type}, status={self.status})>"
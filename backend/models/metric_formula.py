@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Text
+
+from models.base import Base, TimestampMixin
+
+
+class MetricFormula(Base, TimestampMixin):
+    """公式定义的派生指标，如 `free_cash_flow / net_income`，启动时编译并注册到指标注册表"""
+    __tablename__ = "metric_formulas"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
+    name = Column(String(100), nullable=False, unique=True, index=True, comment="指标名")
+    formula = Column(Text, nullable=False, comment="指标公式")
+    title = Column(String(100), nullable=True, comment="图表标题")
+    unit = Column(String(20), nullable=True, comment="展示单位(one/thousand/.../billion)")
+
+    def __repr__(self):
+        return f"<MetricFormula(id={self.id}, name={self.name}, formula={self.formula})>"
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, String, UniqueConstraint
+
+from models.base import Base
+
+
+class MetricSeriesPoint(Base):
+    """
+    写入时物化的指标序列：每个注册指标在每个报告期的展示值与环比增长率（%），
+    由报表写入后的监听器重算，读取图表时按 (公司, 指标, 粒度) 做一次索引范围扫描
+    """
+    __tablename__ = "metric_series"
+    __table_args__ = (
+        # 读取路径：按公司、指标、粒度取一段报告期，同时保证每个点只有一行
+        UniqueConstraint("company_id", "metric_name", "granularity", "period", name="uq_metric_series_point"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, comment="公司ID")
+    metric_name = Column(String(100), nullable=False, comment="指标名")
+    granularity = Column(String(10), nullable=False, comment="annual/quarterly/ttm")
+    period = Column(String(10), nullable=False, comment="报告期标签，如 2024、2024Q3")
+    value = Column(Float(precision=53), nullable=True, comment="图表展示值（已换算单位并保留两位小数）")
+    growth = Column(Float(precision=53), nullable=True, comment="相对上一期的增长率（%）")
+
+    def __repr__(self):
+        return f"<MetricSeriesPoint(company_id={self.company_id}, metric_name={self.metric_name}, period={self.period})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from models.base import Base
+
+
+class StatementVersion(Base):
+    """
+    每个 (公司, 报表类型) 的写入版本号：报表写入在同一事务中递增 version，
+    其他进程轮询最近变化的版本以失效各自的进程内缓存；materialized_version 为物化序列所依据的版本
+    """
+    __tablename__ = "statement_versions"
+
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True, comment="公司ID")
+    statement_type = Column(String(20), primary_key=True, comment="报表类型(balance/income/cash)")
+    version = Column(Integer, nullable=False, default=0, comment="报表写入版本号，每次提交写入时递增")
+    materialized_version = Column(Integer, nullable=False, default=0, comment="物化指标序列所依据的版本号")
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="最近一次写入时间（轮询游标）")
+
+    def __repr__(self):
+        return f"<StatementVersion(company_id={self.company_id}, type={self.statement_type}, version={self.version})>"
@@ -0,0 +1,204 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from core.config import AppConfig
+from core.exceptions import VendorUnavailableError
+from core.log import logger
+from modules.data_loader.resilience import VendorGuard, RETRYABLE_STATUS, get_fmp_guard, parse_retry_after
+from modules.data_loader.response_cache import ResponseCache, FixtureStore, build_response_cache
+
+# (symbol, endpoint)
+FetchKey = Tuple[str, str]
+
+
+class FMPBatchLoader:
+    """
+    Fetches many (symbol, endpoint) pairs from the FMP API concurrently.
+
+    Every batch goes through one pooled `httpx.AsyncClient` that lives as long as the loader
+    (keep-alive connections are reused across tickers, endpoints and batches), driven by one
+    background event loop thread. At most `concurrency` requests are in flight at any time,
+    across all concurrent batches. Both are created on first use; `close()` releases them.
+    """
+
+    def __init__(
+        self,
+        apikey: str,
+        *,
+        base_url: str,
+        concurrency: int = 10,
+        timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+        fixtures: Optional[FixtureStore] = None,
+        offline: bool = False,
+        guard: Optional[VendorGuard] = None,
+        connect_timeout: float = 5.0,
+    ):
+        if not apikey:
+            raise ValueError("API key cannot be empty.")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1.")
+        self._apikey = apikey
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache = cache
+        self.fixtures = fixtures
+        self.offline = offline
+        # 与 FMPBaseLoader 共享的限流器与熔断器；批量刷新以套餐允许的最大速率运行
+        self.guard = guard
+        self.connect_timeout = connect_timeout
+        # 连接池、并发信号量与事件循环线程：首次请求时创建，close() 时释放
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> "FMPBatchLoader":
+        fmp = config.financial_modeling_prep
+        return cls(
+            fmp.apikey,
+            base_url=fmp.base_url,
+            concurrency=fmp.max_concurrency,
+            timeout=fmp.client.read_timeout,
+            cache=build_response_cache(config),
+            fixtures=FixtureStore(fmp.fixtures_dir),
+            offline=fmp.offline,
+            guard=get_fmp_guard(),
+            connect_timeout=fmp.client.connect_timeout,
+        )
+
+    def _replay(self, symbol: str, endpoint: str) -> Optional[Any]:
+        """Answers a pair from the cache (or, offline, from the fixtures) without touching the network."""
+        params = {"symbol": symbol}
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, params, ignore_ttl=self.offline)
+            if cached is not None:
+                return cached
+        if self.offline and self.fixtures is not None:
+            return self.fixtures.load(endpoint, symbol) or None
+        return None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Returns the loader's event loop, starting its thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="fmp-batch-loader", daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def _ensure_client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Returns the pooled client and the in-flight semaphore; runs on the loader's loop only."""
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client, self._semaphore
+
+    async def _fetch_one(self, symbol: str, endpoint: str) -> Optional[Any]:
+        client, semaphore = self._ensure_client()
+        max_retries = self.guard.max_retries if self.guard else 0
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                status_code, retry_after = None, None
+                if self.guard:
+                    try:
+                        await asyncio.sleep(self.guard.acquire())
+                    except VendorUnavailableError as e:
+                        logger.warning(f"Skipping {symbol} from {endpoint}: {e}")
+                        return None
+                try:
+                    resp = await client.get(f"/{endpoint}", params={"symbol": symbol, "apikey": self._apikey})
+                except httpx.HTTPError as e:
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    if resp.status_code not in RETRYABLE_STATUS:
+                        if self.guard:
+                            self.guard.record_response()
+                        try:
+                            resp.raise_for_status()
+                            data = resp.json()
+                        except (httpx.HTTPError, ValueError) as e:
+                            logger.warning(f"Error fetching data for {symbol} from {endpoint}: {e}")
+                            return None
+                        break
+                    status_code = resp.status_code
+                    error = f"HTTP {status_code}"
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+
+                if self.guard:
+                    self.guard.record_error(status_code)
+                if attempt == max_retries:
+                    logger.warning(f"Error fetching data for {symbol} from {endpoint}: {error}")
+                    return None
+                self.guard.count("retries")
+                await asyncio.sleep(self.guard.backoff(attempt, retry_after))
+        if not data:
+            return None
+        if self.cache is not None:
+            self.cache.put(endpoint, {"symbol": symbol}, data)
+        return data
+
+    async def _fetch_missing(self, missing: List[FetchKey]) -> List[Optional[Any]]:
+        return await asyncio.gather(*(self._fetch_one(symbol, endpoint) for symbol, endpoint in missing))
+
+    def _submit(self, pairs: Iterable[FetchKey]) -> Tuple[Dict[FetchKey, Optional[Any]], Optional[Future]]:
+        """
+        Answers what it can from the cache / fixtures and schedules the remaining pairs on the
+        loader's loop. Returns the partial results and the future of the missing payloads.
+        """
+        pairs = list(dict.fromkeys(pairs))
+        results: Dict[FetchKey, Optional[Any]] = {pair: self._replay(*pair) for pair in pairs}
+        missing = [pair for pair, payload in results.items() if payload is None]
+        if self.offline:
+            for symbol, endpoint in missing:
+                logger.warning(f"Offline mode: no cached response or fixture for {symbol} from {endpoint}.")
+            return results, None
+        if not missing:
+            return results, None
+        return results, asyncio.run_coroutine_threadsafe(self._fetch_missing(missing), self._ensure_loop())
+
+    async def fetch_many(self, pairs: Iterable[FetchKey]) -> Dict[FetchKey, Optional[Any]]:
+        """
+        Fetches every (symbol, endpoint) pair and returns {pair: payload}.
+        The payload is the decoded JSON body, or None when the request failed or was empty.
+        Can be awaited from any event loop; the requests run on the loader's own loop.
+        """
+        results, future = self._submit(pairs)
+        if future is not None:
+            missing = [pair for pair, payload in results.items() if payload is None]
+            results.update(zip(missing, await asyncio.wrap_future(future)))
+        return results
+
+    def fetch_many_sync(self, pairs: Iterable[FetchKey]) -> Dict[FetchKey, Optional[Any]]:
+        """Blocking variant of `fetch_many` for use from worker threads."""
+        results, future = self._submit(pairs)
+        if future is not None:
+            missing = [pair for pair, payload in results.items() if payload is None]
+            results.update(zip(missing, future.result()))
+        return results
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Closes the pooled client and stops the event loop thread; both are recreated on next use."""
+        with self._lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        if loop is None:
+            return
+        if self._client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"FMP batch client not closed cleanly: {e}")
+        self._client = self._semaphore = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
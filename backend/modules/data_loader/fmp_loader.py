@@ -1,8 +1,16 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
 import requests
 from requests import Session
 
 from modules.data_loader.base import DataLoader
+from modules.data_loader.fmp_batch_loader import FMPBatchLoader
+from modules.data_loader.response_cache import ResponseCache, FixtureStore, build_response_cache
+from modules.data_loader.resilience import VendorGuard, RETRYABLE_STATUS, get_fmp_guard, parse_retry_after
 from core.config import AppConfig
+from core.exceptions import VendorUnavailableError
+from core.log import logger
 
 
 class FMPBaseLoader:
@@ -13,59 +21,174 @@ class FMPBaseLoader:
     # BASE_URL = "https://financialmodelingprep.com/api/v3" # 使用 v3 API 更常见
     BASE_URL = "https://financialmodelingprep.com/stable" # 使用 v3 API 更常见
 
-    def __init__(self, apikey: str):
+    def __init__(
+        self,
+        apikey: str,
+        base_url: str = BASE_URL,
+        *,
+        cache: Optional[ResponseCache] = None,
+        fixtures: Optional[FixtureStore] = None,
+        offline: bool = False,
+        guard: Optional[VendorGuard] = None,
+        timeout: Tuple[float, float] = (5.0, 30.0),
+    ):
         if not apikey:
             raise ValueError("API key cannot be empty.")
         self._apikey = apikey
+        self.base_url = base_url.rstrip("/")
         self._session = requests.Session() # 使用 Session 提高性能
+        self.cache = cache
+        self.fixtures = fixtures
+        # 离线模式下只读缓存/样例数据，从不访问网络
+        self.offline = offline
+        # 限流、重试与熔断；为 None 时每个请求只发送一次
+        self.guard = guard
+        # (连接超时, 读取超时)
+        self.timeout = timeout
 
-    def fetch_json(self, endpoint: str, symbol: str):
+    @classmethod
+    def from_config(cls, config: AppConfig, cache: Optional[ResponseCache] = None) -> "FMPBaseLoader":
+        """`cache` shares an already built response cache (e.g. the batch loader's) instead of building one."""
+        fmp = config.financial_modeling_prep
+        return cls(
+            apikey=fmp.apikey,
+            base_url=fmp.base_url,
+            cache=cache or build_response_cache(config),
+            fixtures=FixtureStore(fmp.fixtures_dir),
+            offline=fmp.offline,
+            guard=get_fmp_guard(),
+            timeout=(fmp.client.connect_timeout, fmp.client.read_timeout),
+        )
+
+    def fetch_all(self, endpoint: str, symbol: str, *, period: Optional[str] = None, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
         """
-        Fetches data from a given FMP endpoint.
+        Fetches every record a given FMP endpoint returns for a symbol (newest first).
+        `period` ("annual"/"quarter") and `limit` are passed through to the API when set.
+        Responses are served from the on-disk cache while fresh; in offline mode only the
+        cache (regardless of age) and the local fixtures are consulted.
         """
-        params = {"symbol": symbol, "apikey": self._apikey}
-        url = f"{self.BASE_URL}/{endpoint}"
+        params = {"symbol": symbol}
+        if period:
+            params["period"] = period
+        if limit:
+            params["limit"] = limit
 
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, params, ignore_ttl=self.offline)
+            if cached is not None:
+                return cached
+        if self.offline:
+            data_list = self.fixtures.load(endpoint, symbol, period=period, limit=limit) if self.fixtures else None
+            if not data_list:
+                logger.warning(f"Offline mode: no cached response or fixture for {symbol} from {endpoint}.")
+                return None
+            return data_list
+
+        resp = self._request(endpoint, {**params, "apikey": self._apikey})
+        if resp is None:
+            return None
         try:
-            resp = self._session.get(url, params=params)
-            resp.raise_for_status()
             data_list = resp.json()
-        except requests.exceptions.RequestException as e:
-            # 考虑加入日志记录
-            print(f"Error fetching data for {symbol} from {endpoint}: {e}")
-            return None
         except requests.exceptions.JSONDecodeError:
             # API 可能返回了非 JSON 的错误页面
-            print(f"Failed to decode JSON for {symbol} from {endpoint}.")
+            logger.warning(f"Failed to decode JSON for {symbol} from {endpoint}.")
             return None
 
         if not data_list:
             return None
 
+        if self.cache is not None:
+            self.cache.put(endpoint, params, data_list)
+        return data_list
+
+    def _request(self, endpoint: str, params: Dict[str, Any]) -> Optional[requests.Response]:
+        """
+        Sends one GET through the guard: waits for a rate limit token, retries 429/5xx and
+        network errors with jittered exponential backoff, and feeds the circuit breaker.
+        Returns None for non-retryable client errors (e.g. an unknown symbol) and raises
+        VendorUnavailableError when the vendor stays unavailable.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        max_retries = self.guard.max_retries if self.guard else 0
+        for attempt in range(max_retries + 1):
+            status_code, retry_after = None, None
+            if self.guard:
+                time.sleep(self.guard.acquire())
+            try:
+                resp = self._session.get(url, params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if resp.status_code not in RETRYABLE_STATUS:
+                    if self.guard:
+                        self.guard.record_response()
+                    if not resp.ok:
+                        logger.warning(f"FMP returned {resp.status_code} for {params.get('symbol')} from {endpoint}.")
+                        return None
+                    return resp
+                status_code = resp.status_code
+                error = f"HTTP {status_code}"
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+
+            if self.guard is None:
+                logger.warning(f"Error fetching data for {params.get('symbol')} from {endpoint}: {error}")
+                return None
+            self.guard.record_error(status_code)
+            if attempt == max_retries:
+                raise VendorUnavailableError(self.guard.vendor, f"{error} from {endpoint} after {attempt + 1} attempts", retry_after=retry_after)
+            self.guard.count("retries")
+            delay = self.guard.backoff(attempt, retry_after)
+            logger.info(f"Retrying {endpoint} for {params.get('symbol')} in {delay:.2f}s ({error})")
+            time.sleep(delay)
+        return None
+
+    def fetch_json(self, endpoint: str, symbol: str):
+        """
+        Fetches data from a given FMP endpoint.
+        """
+        data_list = self.fetch_all(endpoint, symbol)
+        if not data_list:
+            return None
+
         # 默认返回列表的第一个元素（通常是最新一期）
         return data_list[0]
 
 
-class FMPBalanceSheetLoader(DataLoader):
-    """Loads balance sheet data using FMPBaseLoader."""
-    def __init__(self, config: AppConfig):
-        self.fmp_loader = FMPBaseLoader(apikey=config.financial_modeling_prep.apikey)
+class FMPStatementLoader(DataLoader):
+    """
+    Loads one statement endpoint. Loaders built from the same config can share one
+    FMPBaseLoader (and thus one pooled HTTP session) by passing `fmp_loader`, and one
+    FMPBatchLoader (one pooled async client) by passing `batch_loader`.
+    """
+    endpoint: str = ""
+
+    def __init__(self, config: AppConfig, fmp_loader: Optional[FMPBaseLoader] = None, batch_loader: Optional[FMPBatchLoader] = None):
+        self._config = config
+        self.fmp_loader = fmp_loader or FMPBaseLoader.from_config(config)
+        self.batch_loader = batch_loader
 
     def load(self, company_code: str):
-        return self.fmp_loader.fetch_json("balance-sheet-statement", company_code)
+        return self.fmp_loader.fetch_json(self.endpoint, company_code)
 
-class FMPIncomeSheetLoader(DataLoader):
-    """Loads income statement data using FMPBaseLoader."""
-    def __init__(self, config: AppConfig):
-        self.fmp_loader = FMPBaseLoader(apikey=config.financial_modeling_prep.apikey)
+    def load_history(self, company_code: str, *, period: str = "annual", limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Loads every period the endpoint returns (or the newest `limit` ones)."""
+        return self.fmp_loader.fetch_all(self.endpoint, company_code, period=period, limit=limit)
 
-    def load(self, company_code: str):
-        return self.fmp_loader.fetch_json("income-sheet-statement", company_code)
+    def load_many(self, company_codes: Iterable[str]) -> Dict[str, Any]:
+        """Loads many tickers concurrently; returns {ticker: payload or None}."""
+        if self.batch_loader is None:
+            self.batch_loader = FMPBatchLoader.from_config(self._config)
+        results = self.batch_loader.fetch_many_sync((code, self.endpoint) for code in company_codes)
+        return {code: payload[0] if payload else None for (code, _), payload in results.items()}
 
-class FMPCashFlowLoader(DataLoader):
-    """Loads cash flow statement data using FMPBaseLoader."""
-    def __init__(self, config: AppConfig):
-        self.fmp_loader = FMPBaseLoader(apikey=config.financial_modeling_prep.apikey)
+class FMPBalanceSheetLoader(FMPStatementLoader):
+    """Loads balance sheet data using FMPBaseLoader."""
+    endpoint = "balance-sheet-statement"
 
-    def load(self, company_code: str):
-        return self.fmp_loader.fetch_json("cash-flow-statement", company_code)
+class FMPIncomeSheetLoader(FMPStatementLoader):
+    """Loads income statement data using FMPBaseLoader."""
+    endpoint = "income-sheet-statement"
+
+class FMPCashFlowLoader(FMPStatementLoader):
+    """Loads cash flow statement data using FMPBaseLoader."""
+    endpoint = "cash-flow-statement"
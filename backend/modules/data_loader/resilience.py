@@ -0,0 +1,207 @@
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+from core.config import AppConfig, config as app_config
+from core.exceptions import VendorUnavailableError
+from core.log import logger
+
+# 需要重试的 HTTP 状态码：限流与服务端错误
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `reserve()` takes one token and returns how long the caller
+    must wait before using it, so sync callers can `time.sleep` and async callers
+    `asyncio.sleep` on the same bucket.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        if rate_per_second <= 0 or capacity < 1:
+            raise ValueError("rate_per_second must be positive and capacity at least 1.")
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 令牌可以透支：排队的调用方按顺序等待，不会同时醒来超出配额
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for `reset_timeout`
+    seconds; then lets one trial request through (half-open) and closes again on success.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_at: Optional[float] = None
+        self._open_seconds = 0.0
+        self.open_count = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[float]:
+        """Returns None when a request may proceed, otherwise the seconds until the next trial."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return None
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+            else:
+                # 半开状态只放行一个试探请求；试探长时间没有结果时再放行一个
+                remaining = self._trial_at + self.reset_timeout - now
+            if remaining > 0:
+                return remaining
+            self.state = self.HALF_OPEN
+            self._trial_at = now
+            return None
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                self._open_seconds += time.monotonic() - self._opened_at
+                logger.info("FMP circuit breaker closed")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    self._opened_at = time.monotonic()
+                    self.open_count += 1
+                else:
+                    # 试探失败：重新计时，已打开的时长继续累计
+                    now = time.monotonic()
+                    self._open_seconds += now - self._opened_at
+                    self._opened_at = now
+                self.state = self.OPEN
+                logger.warning(f"FMP circuit breaker opened after {self._failures} consecutive failures")
+
+    def open_seconds(self) -> float:
+        """Total time spent open (or half-open), including the current open period."""
+        with self._lock:
+            current = time.monotonic() - self._opened_at if self._opened_at is not None else 0.0
+            return self._open_seconds + current
+
+
+class VendorGuard:
+    """
+    Shared rate limiter, retry policy and circuit breaker for one vendor. Every loader of
+    the process goes through the same guard, so bulk refreshes run at the plan's maximum
+    rate without tripping the quota, and a vendor outage fails fast everywhere.
+    """
+
+    def __init__(
+        self,
+        vendor: str,
+        *,
+        rate_limit_per_minute: int,
+        burst: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        failure_threshold: int,
+        reset_timeout: float,
+    ):
+        self.vendor = vendor
+        self.bucket = TokenBucket(rate_limit_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._counters = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0, "short_circuited": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> "VendorGuard":
+        client = config.financial_modeling_prep.client
+        return cls(
+            "FMP",
+            rate_limit_per_minute=client.rate_limit_per_minute,
+            burst=client.burst,
+            max_retries=client.max_retries,
+            backoff_base=client.backoff_base,
+            backoff_max=client.backoff_max,
+            failure_threshold=client.circuit_failure_threshold,
+            reset_timeout=client.circuit_reset_timeout,
+        )
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def acquire(self) -> float:
+        """
+        Checks the breaker (raising VendorUnavailableError when open) and reserves a rate
+        limit token; returns the seconds to wait before sending the request.
+        """
+        retry_after = self.breaker.allow()
+        if retry_after is not None:
+            self.count("short_circuited")
+            raise VendorUnavailableError(self.vendor, "circuit breaker is open", retry_after=retry_after)
+        self.count("requests")
+        return self.bucket.reserve()
+
+    def record_response(self) -> None:
+        """The vendor answered with a non-retryable status."""
+        self.breaker.record_success()
+
+    def record_error(self, status_code: Optional[int]) -> None:
+        """Counts a retryable failure (429/5xx when `status_code` is set, else a network error)."""
+        if status_code == 429:
+            # 限流说明服务仍然可用，不计入熔断
+            self.count("throttled")
+            self.breaker.record_success()
+        else:
+            self.count("failures")
+            self.breaker.record_failure()
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the vendor's Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "circuit_state": self.breaker.state,
+            "circuit_opens": self.breaker.open_count,
+            "circuit_open_seconds": round(self.breaker.open_seconds(), 3),
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_fmp_guard() -> VendorGuard:
+    """Process-wide guard shared by FMPBaseLoader and FMPBatchLoader."""
+    return VendorGuard.from_config(app_config)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.config import AppConfig
+from core.log import logger
+
+# FMP 端点 → 本地样例文件中的报表类型后缀，例如 financial_data/AAPL_balance.json
+ENDPOINT_FIXTURE_KINDS = {
+    "balance-sheet-statement": "balance",
+    "income-statement": "income",
+    "income-sheet-statement": "income",
+    "cash-flow-statement": "cash",
+}
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of vendor responses.
+
+    The file name is the SHA-256 of (endpoint, request params without the API key), so the
+    same request always maps to the same entry. Entries expire after a per-endpoint TTL,
+    and the least recently used entries are evicted once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: str, *, max_bytes: int, default_ttl: int, endpoint_ttl: Optional[Dict[str, int]] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.endpoint_ttl = endpoint_ttl or {}
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+        request = {"endpoint": endpoint, "params": {k: v for k, v in params.items() if k != "apikey"}}
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, endpoint: str, params: Dict[str, Any], *, ignore_ttl: bool = False) -> Optional[Any]:
+        """Returns the cached payload, or None on a miss or an expired entry."""
+        path = self._path(self.cache_key(endpoint, params))
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        ttl = self.endpoint_ttl.get(endpoint, self.default_ttl)
+        if not ignore_ttl and time.time() - entry["fetched_at"] > ttl:
+            return None
+        try:
+            os.utime(path)  # 记录最近使用时间，用于 LRU 淘汰
+        except OSError:
+            pass
+        return entry["payload"]
+
+    def put(self, endpoint: str, params: Dict[str, Any], payload: Any) -> None:
+        key = self.cache_key(endpoint, params)
+        path = self._path(key)
+        body = json.dumps({
+            "endpoint": endpoint,
+            "params": {k: v for k, v in params.items() if k != "apikey"},
+            "fetched_at": time.time(),
+            "payload": payload,
+        }, ensure_ascii=False).encode("utf-8")
+
+        with self._lock:
+            size = self._current_size()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            old_size = path.stat().st_size if path.exists() else 0
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, path)
+            self._size = size - old_size + len(body)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self.directory.glob("*/*.json")) if self.directory.exists() else 0
+        return self._size
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache is back under 90% of `max_bytes`."""
+        entries = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in self.directory.glob("*/*.json")),
+            key=lambda e: e[0],
+        )
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            try:
+                path.unlink()
+                self._size -= size
+            except OSError:
+                pass
+        logger.info(f"FMP response cache evicted down to {self._size} bytes")
+
+
+class FixtureStore:
+    """
+    Serves recorded vendor payloads such as `financial_data/AAPL_balance.json` for
+    offline replay. Files are matched by the `<NAME>_<kind>.json` prefix or by the
+    `symbol` of the records they contain.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._index: Optional[Dict[tuple, Path]] = None
+        self._lock = threading.Lock()
+
+    def _build_index(self) -> Dict[tuple, Path]:
+        index: Dict[tuple, Path] = {}
+        kinds = set(ENDPOINT_FIXTURE_KINDS.values())
+        for path in sorted(self.directory.glob("*_*.json")):
+            name, _, kind = path.stem.rpartition("_")
+            if kind not in kinds:
+                continue
+            index[(name.upper(), kind)] = path
+            try:
+                records = json.loads(path.read_text(encoding="utf-8"))
+                symbol = records[0].get("symbol") if isinstance(records, list) and records else None
+            except (OSError, ValueError, AttributeError):
+                symbol = None
+            if symbol:
+                index.setdefault((symbol.upper(), kind), path)
+        return index
+
+    def load(self, endpoint: str, symbol: str, *, period: Optional[str] = None, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        kind = ENDPOINT_FIXTURE_KINDS.get(endpoint)
+        if kind is None:
+            return None
+        with self._lock:
+            if self._index is None:
+                self._index = self._build_index()
+        path = self._index.get((symbol.upper(), kind))
+        if path is None:
+            return None
+        records = json.loads(path.read_text(encoding="utf-8"))
+        if period == "annual":
+            records = [r for r in records if r.get("period") == "FY"]
+        elif period == "quarter":
+            records = [r for r in records if str(r.get("period", "")).startswith("Q")]
+        return records[:limit] if limit else records
+
+
+def build_response_cache(config: AppConfig) -> Optional[ResponseCache]:
+    """Builds the on-disk response cache from config, or None when caching is disabled."""
+    cache_config = config.financial_modeling_prep.cache
+    if not cache_config.enabled:
+        return None
+    return ResponseCache(
+        cache_config.directory,
+        max_bytes=cache_config.max_bytes,
+        default_ttl=cache_config.default_ttl,
+        endpoint_ttl=cache_config.endpoint_ttl,
+    )
@@ -0,0 +1,5 @@
+from core.config import config
+from modules.workers.ingest_worker import IngestWorkerPool
+
+# 进程内共享的导入任务线程池，由 lifespan 负责启动与关闭
+ingest_pool = IngestWorkerPool(pool_size=config.workers.pool_size, stale_after_seconds=config.workers.stale_after_seconds)
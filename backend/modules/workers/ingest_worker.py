@@ -0,0 +1,144 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.database import SessionLocal
+from core.log import logger
+from models.ingest_job import IngestJob
+from repositories.financial_repo import get_statement_dependencies
+from repositories.ingest_job_repo import IngestJobRepository
+from schemas.financial import FinancialStatementType, SyncMode, ReportPeriod
+from services.statement_sync_service import sync_statement
+
+
+class IngestWorkerPool:
+    """
+    有界线程池，异步执行 (公司, 报表类型) 的拉取与 upsert 任务。
+
+    任务状态持久化在 ingest_jobs 表中；每个任务在自己的数据库会话里执行，
+    吞吐量由 pool_size 决定，而不是由客户端连接数决定。
+    执行前以条件 UPDATE 原子地认领任务，多个进程（多个 uvicorn worker 或重启期间的新旧实例）
+    共享同一张任务表时，每个任务只会被执行一次。
+    """
+
+    def __init__(self, pool_size: int, session_factory: sessionmaker = SessionLocal, stale_after_seconds: int = 3600):
+        self.pool_size = pool_size
+        self.stale_after = timedelta(seconds=stale_after_seconds)
+        self._session_factory = session_factory
+        self._repo = IngestJobRepository()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        """
+        启动线程池，并重新入队未完成的任务：pending 任务直接入队（执行前认领，不会重复执行）；
+        running 任务只有在超过 stale_after 未更新（执行它的进程已退出）时才重置为 pending。
+        """
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="ingest-worker")
+        db = self._session_factory()
+        try:
+            requeued = self._repo.requeue_stale(db, stale_after=self.stale_after)
+            pending = self._repo.list_pending_ids(db)
+        finally:
+            db.close()
+        if requeued:
+            logger.info(f"Requeued {requeued} stale running ingest jobs")
+        if pending:
+            logger.info(f"Resuming {len(pending)} pending ingest jobs")
+            self.submit(pending)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """停止线程池；未开始的任务保持 pending，下次启动时恢复。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, job_ids: Iterable[int]) -> None:
+        if self._executor is None:
+            raise RuntimeError("Ingest worker pool is not running.")
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+
+    def submit_batch(self, job_ids: Iterable[int]) -> None:
+        """
+        Runs LATEST-mode jobs as one batch: a single task fetches every ticker of a statement
+        type concurrently through the shared batch loader, then upserts each job in turn.
+        """
+        if self._executor is None:
+            raise RuntimeError("Ingest worker pool is not running.")
+        self._executor.submit(self._run_batch, list(job_ids))
+
+    def _run(self, job_id: int) -> None:
+        db = self._session_factory()
+        try:
+            # 原子认领：已被其他进程认领或已结束的任务直接跳过
+            job = self._repo.claim(db, job_id)
+            if job is None:
+                return
+            self._execute(db, job)
+        finally:
+            db.close()
+
+    def _run_batch(self, job_ids: List[int]) -> None:
+        db = self._session_factory()
+        try:
+            # 1. 逐个认领，按报表类型分组
+            groups: Dict[str, List[IngestJob]] = defaultdict(list)
+            for job_id in job_ids:
+                job = self._repo.claim(db, job_id)
+                if job is not None:
+                    groups[job.statement_type].append(job)
+
+            for statement_type, jobs in groups.items():
+                # 2. 同一报表类型的所有 ticker 经共享的异步连接池并发拉取
+                try:
+                    for job in jobs:
+                        self._repo.update_progress(db, job, progress=10, message="fetching from vendor (batch)")
+                    loader, _ = get_statement_dependencies(FinancialStatementType(statement_type))
+                    payloads = loader.load_many(job.ticker for job in jobs)
+                except Exception as e:
+                    for job in jobs:
+                        self._fail(db, job, e)
+                    continue
+
+                # 3. 逐个 upsert；拉取失败的 ticker 记为失败，不再单独重试
+                for job in jobs:
+                    payload = payloads.get(job.ticker)
+                    if payload is None:
+                        self._fail(db, job, LookupError(f"Could not fetch financial data for symbol '{job.ticker}'."))
+                    else:
+                        self._execute(db, job, fetched=payload)
+        finally:
+            db.close()
+
+    def _execute(self, db: Session, job: IngestJob, fetched: Optional[Any] = None) -> None:
+        """Syncs a claimed job and records the outcome; `fetched` is its payload from a batch fetch."""
+        try:
+            if fetched is None:
+                self._repo.update_progress(db, job, progress=10, message="fetching from vendor")
+            summary = sync_statement(
+                db,
+                company_id=job.company_id,
+                ticker=job.ticker,
+                statement_type=FinancialStatementType(job.statement_type),
+                mode=SyncMode(job.mode),
+                period=ReportPeriod(job.period),
+                # 拉取完成后再写一次进度，刷新 updated_at，长时间任务不会被其他进程视为失联
+                on_fetched=lambda count: self._repo.update_progress(db, job, progress=60, message=f"upserting {count} records"),
+                fetched=fetched,
+            )
+            if summary is None:
+                raise LookupError(f"Could not fetch financial data for symbol '{job.ticker}'.")
+
+            self._repo.mark_succeeded(db, job, summary=summary)
+        except Exception as e:
+            self._fail(db, job, e)
+
+    def _fail(self, db: Session, job: IngestJob, error: Exception) -> None:
+        db.rollback()
+        logger.error(f"Ingest job {job.id} failed: {error}", exc_info=error)
+        self._repo.mark_failed(db, job, error=str(error))
@@ -1,7 +1,9 @@
 from abc import abstractmethod
 
+from sqlalchemy import and_, bindparam, insert, select, tuple_, update
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.orm import Session
-from typing import Generic, TypeVar, Type, Any, Union, List, Dict
+from typing import Generic, TypeVar, Type, Any, Union, List, Dict, Iterable, Sequence
 from pydantic import BaseModel
 from core.database import Base
 
@@ -11,6 +13,17 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 # EAV (Entity-Attribute-Value) model type
 EAVModelType = TypeVar("EAVModelType", bound=Base)
 
+# Maximum number of rows rendered into a single multi-row INSERT statement.
+# Keeps the bound parameter count well below driver limits (SQLite: 32766).
+BULK_CHUNK_SIZE = 500
+
+
+def chunked(rows: Sequence[Any], size: int = BULK_CHUNK_SIZE) -> Iterable[Sequence[Any]]:
+    """Yields consecutive slices of `rows` with at most `size` elements."""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
 class BaseRepository(Generic[ModelType]):
     def __init__(self, model: Type[ModelType], *, eav_model: Type[EAVModelType] = None, eav_fk_name: str = None):
         self.model = model
@@ -54,6 +67,24 @@ class BaseRepository(Generic[ModelType]):
         """
         raise NotImplementedError
 
+    def _build_eav_row(self, statement_id: int, key: str, value: Any) -> Dict[str, Any]:
+        """
+        Builds the column mapping of a single EAV row.
+        Every row carries both sparse value columns so rows can be written in one multi-row INSERT.
+        """
+        eav_data = {
+            self.eav_fk_name: statement_id,
+            "attribute_name": key,
+            "value_numeric": None,
+            "value_string": None,
+        }
+        # Check for numeric vs. string values
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            eav_data["value_numeric"] = value
+        else:
+            eav_data["value_string"] = str(value) if value is not None else None
+        return eav_data
+
     def _save_eav_attributes(self, db: Session, *, core_obj: ModelType, data: Dict[str, Any], excluded_keys: set):
         """
         A generic helper method to save extra fields into an EAV table.
@@ -64,19 +95,94 @@ class BaseRepository(Generic[ModelType]):
 
         for key, value in data.items():
             if key not in excluded_keys:
-                eav_data = {
-                    "attribute_name": key,
-                    self.eav_fk_name: core_obj.id
-                }
-                # Check for numeric vs. string values
-                if isinstance(value, (int, float)) and not isinstance(value, bool):
-                    eav_data["value_numeric"] = value
-                else:
-                    eav_data["value_string"] = str(value) if value is not None else None
-
-                eav_obj = self.eav_model(**eav_data)
+                eav_obj = self.eav_model(**self._build_eav_row(core_obj.id, key, value))
                 db.add(eav_obj)
 
+    @staticmethod
+    def _bulk_insert(db: Session, model: Type[Base], rows: List[Dict[str, Any]]) -> None:
+        """
+        Writes `rows` with multi-row INSERT statements, `BULK_CHUNK_SIZE` rows per statement.
+        All rows must share the same keys. Does NOT commit.
+        """
+        for chunk in chunked(rows):
+            db.execute(insert(model).values(list(chunk)))
+
+    @staticmethod
+    def _bulk_upsert(
+        db: Session,
+        model: Type[Base],
+        rows: List[Dict[str, Any]],
+        *,
+        update_columns: List[str],
+        conflict_columns: Sequence[str] = ("id",),
+    ) -> None:
+        """
+        Writes `rows` with multi-row `INSERT ... ON DUPLICATE KEY UPDATE` (MySQL)
+        or `INSERT ... ON CONFLICT DO UPDATE` (SQLite), `BULK_CHUNK_SIZE` rows per statement;
+        other dialects use a portable keyed UPDATE plus INSERT (see `_portable_upsert`).
+        Rows that collide with an existing key get `update_columns` overwritten. Does NOT commit.
+        """
+        dialect = db.get_bind().dialect.name
+        for chunk in chunked(rows):
+            if dialect not in ("mysql", "sqlite"):
+                BaseRepository._portable_upsert(db, model, list(chunk), update_columns, conflict_columns)
+                continue
+            if dialect == "mysql":
+                stmt = mysql.insert(model).values(list(chunk))
+                stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+            elif dialect == "sqlite":
+                stmt = sqlite.insert(model).values(list(chunk))
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=list(conflict_columns),
+                    set_={col: stmt.excluded[col] for col in update_columns},
+                )
+            db.execute(stmt)
+
+    @staticmethod
+    def _portable_upsert(
+        db: Session,
+        model: Type[Base],
+        rows: List[Dict[str, Any]],
+        update_columns: List[str],
+        conflict_columns: Sequence[str],
+    ) -> None:
+        """
+        Dialect-independent upsert of one chunk, inside the caller's transaction: selects which
+        conflict keys already exist, then updates those rows with one executemany UPDATE and
+        inserts the others. Conflict keys that are None (e.g. a new autoincrement id) are left
+        to the database. Does NOT commit.
+        """
+        table = model.__table__
+        key_columns = [table.c[name] for name in conflict_columns]
+
+        def key_of(row: Dict[str, Any]) -> tuple:
+            return tuple(row.get(name) for name in conflict_columns)
+
+        # 1. 查出已存在的键
+        keys = [key_of(row) for row in rows if None not in key_of(row)]
+        existing = set()
+        if keys:
+            key_filter = key_columns[0].in_([key[0] for key in keys]) if len(key_columns) == 1 else tuple_(*key_columns).in_(keys)
+            existing = {tuple(row) for row in db.execute(select(*key_columns).where(key_filter)).all()}
+
+        # 2. 已存在的行：按键批量 UPDATE（绑定参数加前缀，避免与 SET 子句的列名冲突）
+        updates = [
+            {**{f"key_{name}": row[name] for name in conflict_columns}, **{f"new_{col}": row[col] for col in update_columns}}
+            for row in rows if key_of(row) in existing
+        ]
+        if updates:
+            stmt = update(table).where(and_(*(column == bindparam(f"key_{column.name}") for column in key_columns))) \
+                .values({col: bindparam(f"new_{col}") for col in update_columns})
+            db.execute(stmt, updates)
+
+        # 3. 其余行插入；值为 None 的冲突键（自增主键）交给数据库生成
+        inserts = [
+            {name: value for name, value in row.items() if not (name in conflict_columns and value is None)}
+            for row in rows if key_of(row) not in existing
+        ]
+        if inserts:
+            db.execute(insert(model), inserts)
+
     def upsert_from_json(self, db: Session, *, data: Union[Dict[str, Any], List[Dict[str, Any]]], **kwargs) -> Union[ModelType, List[ModelType]]:
         """
         Upserts financial data from a JSON object or a list of JSON objects.
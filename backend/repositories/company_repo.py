@@ -1,8 +1,8 @@
 from sqlalchemy.orm import Session, joinedload
-from models.company import Company, IndustryProfile
+from models.company import Company, IndustryProfile, IndustryCategoryEnum
 from schemas.company import CompanyCreate, CompanyUpdate
 from .base import BaseRepository
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional
 
 class CompanyRepository(BaseRepository[Company]):
     def __init__(self):
@@ -59,5 +59,23 @@ class CompanyRepository(BaseRepository[Company]):
     def get_by_code(self, db, code: str):
         return db.query(self.model).filter(self.model.ticker == code).first()
 
+    def get_multi_by_ids_or_industry(
+        self,
+        db: Session,
+        *,
+        ids: Optional[Iterable[int]] = None,
+        industry_category: Optional[IndustryCategoryEnum] = None,
+    ) -> List[Company]:
+        """
+        Returns the companies whose id is in `ids` and/or whose industry profile has
+        `industry_category`, ordered by id.
+        """
+        query = db.query(self.model)
+        if ids is not None:
+            query = query.filter(self.model.id.in_(list(ids)))
+        if industry_category is not None:
+            query = query.join(self.model.industry_profile).filter(IndustryProfile.industry_category == industry_category)
+        return query.order_by(self.model.id).all()
+
 def get_company_repo() -> CompanyRepository:
     return CompanyRepository()
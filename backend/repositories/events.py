@@ -0,0 +1,160 @@
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import config
+from core.database import SessionLocal
+from core.log import logger
+from models.base import now_cst
+from repositories.statement_version_repo import StatementVersionRepository
+from schemas.financial import FinancialStatementType
+
+
+class StatementsChanged(NamedTuple):
+    """
+    Published after an upsert committed new or changed rows of one statement type for a company.
+    `version` is the write version committed with the rows; `remote` marks writes committed by
+    another process, republished here by the StatementVersionWatcher.
+    """
+    statement_type: FinancialStatementType
+    company_id: int
+    version: Optional[int] = None
+    remote: bool = False
+
+
+StatementListener = Callable[[StatementsChanged], None]
+
+
+class StatementEvents:
+    """
+    In-process hook for statement writes. Caches and derived data subscribe here instead of
+    every upsert path knowing about them; a failing listener is logged and never fails the write.
+    """
+
+    def __init__(self):
+        self._listeners: List[StatementListener] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: StatementListener, *, first: bool = False) -> None:
+        """
+        Adds a listener; listeners run in subscription order. `first` puts it ahead of the
+        others, for data sources that must be refreshed before caches built on them are invalidated.
+        """
+        with self._lock:
+            if listener in self._listeners:
+                return
+            if first:
+                self._listeners.insert(0, listener)
+            else:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: StatementListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish(self, event: StatementsChanged) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Statement listener {listener!r} failed for {event}: {e}", exc_info=True)
+
+
+class StatementVersionWatcher:
+    """
+    Republishes the statement writes committed by other processes (other uvicorn workers, or
+    other instances sharing the database) on the in-process bus, so their caches are invalidated
+    too. Every write bumps a per-(company, statement type) version in its own transaction; a
+    background thread reads the versions bumped within the last `lookback_seconds` every
+    `interval_seconds` and publishes those this process has not seen as remote events. Local
+    writes are recorded from their own events, so they are not published twice.
+
+    The lookback covers transactions committed after their version was written, and clock
+    differences between hosts; it only bounds how much is read per poll.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        events: StatementEvents,
+        interval_seconds: float = 1.0,
+        lookback_seconds: float = 300.0,
+    ):
+        self.session_factory = session_factory
+        self.events = events
+        self.interval_seconds = interval_seconds
+        self.lookback = timedelta(seconds=lookback_seconds)
+        self.repo = StatementVersionRepository()
+        # (公司, 报表类型) → 本进程已知的最新版本
+        self._seen: Dict[Tuple[int, FinancialStatementType], int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Records the current versions without publishing, then starts polling. Call it before the
+        caches load, so a write committed while they load is published afterwards.
+        """
+        if self._thread is not None:
+            return
+        self.events.subscribe(self.on_statements_changed)
+        self.poll(publish=False)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="statement-version-watcher", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        thread, self._thread = self._thread, None
+        self._stop.set()
+        self.events.unsubscribe(self.on_statements_changed)
+        if thread is not None:
+            thread.join(timeout=self.interval_seconds + 5)
+
+    def on_statements_changed(self, event: StatementsChanged) -> None:
+        # 本进程的写入：记录版本，轮询时不再作为远程写入发布
+        if not event.remote and event.version is not None:
+            self._record((event.company_id, event.statement_type), event.version)
+
+    def _record(self, key: Tuple[int, FinancialStatementType], version: int) -> bool:
+        """Records a version; returns whether it is newer than the one already known."""
+        with self._lock:
+            if self._seen.get(key, 0) >= version:
+                return False
+            self._seen[key] = version
+            return True
+
+    def poll(self, publish: bool = True) -> int:
+        """Reads the recently bumped versions and publishes the unseen ones. Returns the number published."""
+        db = self.session_factory()
+        try:
+            changed = self.repo.changed_since(db, now_cst() - self.lookback)
+        finally:
+            db.close()
+        published = 0
+        for company_id, statement_type, version in changed:
+            if self._record((company_id, statement_type), version) and publish:
+                self.events.publish(StatementsChanged(statement_type, company_id, version=version, remote=True))
+                published += 1
+        return published
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Polling statement versions failed: {e}", exc_info=True)
+
+
+statement_events = StatementEvents()
+statement_version_watcher = StatementVersionWatcher(
+    SessionLocal,
+    statement_events,
+    interval_seconds=config.statement_versions.poll_interval_seconds,
+    lookback_seconds=config.statement_versions.lookback_seconds,
+)
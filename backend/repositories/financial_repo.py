@@ -1,112 +1,268 @@
-from typing import Dict, List, Union, Any
+import math
+from collections import defaultdict
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Union, Any, Iterable, Optional, Tuple, Type
 from pydantic import BaseModel
 from fastapi import HTTPException, status
 from pandas.core.interchange.dataframe_protocol import Column
+import numpy as np
+import pandas as pd
 from pydantic.alias_generators import to_camel
 
 from repositories import BaseRepository
+from sqlalchemy import Date, Float, Select, delete, func, literal, select, tuple_, type_coerce, union_all, update
 from sqlalchemy.orm import Session
 from models import BalanceSheetStatementCore,BalanceSheetStatementEAV
 from models import IncomeSheetStatementCore, IncomeSheetStatementEAV
 from models import CashSheetStatementCore, CashSheetStatementEAV
-from repositories.base import BaseRepository, ModelType
-from schemas.financial import FinancialStatementType
+from models.base import now_cst
+from repositories.base import BaseRepository, ModelType, EAVModelType, chunked
+from repositories.metric_catalog import metric_catalog
+from repositories.statement_store import statement_store
+from repositories.events import statement_events, StatementsChanged
+from repositories.statement_version_repo import StatementVersionRepository
+from schemas.financial import FinancialStatementType, Granularity, SeriesWindow, StatementUpsertSummary
 from schemas.fmp_schemas import FMPBalanceSheetSchema, FMPIncomeStatementSchema, FMPCashFlowStatementSchema
+from schemas.fmp_codec import get_codec
 from modules.data_loader.base import DataLoader
-from modules.data_loader.fmp_loader import FMPBalanceSheetLoader, FMPIncomeSheetLoader, FMPCashFlowLoader
+from modules.data_loader.fmp_batch_loader import FMPBatchLoader
+from modules.data_loader.fmp_loader import FMPBaseLoader, FMPBalanceSheetLoader, FMPIncomeSheetLoader, FMPCashFlowLoader
 from core.config import config
-from utils.case_converter import convert_keys_to_snake_case
+from core.database import SessionLocal
 
 
-def get_statement_dependencies(statement_type: FinancialStatementType) -> tuple[DataLoader, BaseRepository]:
+@lru_cache(maxsize=1)
+def _statement_dependency_map() -> Dict[FinancialStatementType, tuple[DataLoader, "FinancialStatementRepository"]]:
     """
-    通用工厂函数，根据报表类型返回对应的 Loader 和 Repository。
+    构建一次并在进程内共享：三个 Loader 共用同一个 FMPBaseLoader（同一个连接池）
+    与同一个批量 Loader，二者共用同一个响应缓存。
     """
-    # 映射表，用于配置不同报表类型对应的依赖
-    dependency_map = {
-        FinancialStatementType.BALANCE: (FMPBalanceSheetLoader(config=config), BalanceStatementRepository()),
-        FinancialStatementType.INCOME: (FMPIncomeSheetLoader(config=config), IncomeStatementRepository()),
-        FinancialStatementType.CASH: (FMPCashFlowLoader(config=config), CashStatementRepository()),
+    batch_loader = get_fmp_batch_loader()
+    fmp_loader = FMPBaseLoader.from_config(config, cache=batch_loader.cache)
+    shared = {"config": config, "fmp_loader": fmp_loader, "batch_loader": batch_loader}
+    return {
+        FinancialStatementType.BALANCE: (FMPBalanceSheetLoader(**shared), BalanceStatementRepository()),
+        FinancialStatementType.INCOME: (FMPIncomeSheetLoader(**shared), IncomeStatementRepository()),
+        FinancialStatementType.CASH: (FMPCashFlowLoader(**shared), CashStatementRepository()),
     }
 
-    dependencies = dependency_map.get(statement_type)
+
+@lru_cache(maxsize=1)
+def get_fmp_batch_loader() -> FMPBatchLoader:
+    """
+    进程内共享的批量 Loader：一个 AsyncClient 连接池与一个事件循环线程，首次请求时创建，由 lifespan 关闭。
+    """
+    return FMPBatchLoader.from_config(config)
+
+
+def get_statement_dependencies(statement_type: FinancialStatementType) -> tuple[DataLoader, BaseRepository]:
+    """
+    通用工厂函数，根据报表类型返回对应的 Loader 和 Repository。
+    """
+    dependencies = _statement_dependency_map().get(statement_type)
     if dependencies is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported financial statement type: {statement_type}")
 
     return dependencies
 
+# 同一指标出现在多张报表时的查找优先级
+METRIC_LOOKUP_ORDER = (FinancialStatementType.INCOME, FinancialStatementType.BALANCE, FinancialStatementType.CASH)
+
+# 年报与季报在 period 列中的取值
+ANNUAL_PERIOD = "FY"
+QUARTER_PERIODS = ("Q1", "Q2", "Q3", "Q4")
+
+
+def granularity_periods(granularity: Granularity) -> Tuple[str, ...]:
+    """The `period` values read for a granularity (TTM is computed from quarterly rows)."""
+    return (ANNUAL_PERIOD,) if granularity == Granularity.ANNUAL else QUARTER_PERIODS
+
+
+def lookback_periods(granularity: Granularity) -> int:
+    """
+    Periods read before the first one shown: one for the growth rate of the first point,
+    plus the three earlier quarters summed into the first TTM value.
+    """
+    return 4 if granularity == Granularity.TTM else 1
+
+
+def period_label(fiscal_year: str, period: str) -> str:
+    """Category of a series point: the fiscal year for annual rows, e.g. `2024Q3` for quarterly rows."""
+    return fiscal_year if period == ANNUAL_PERIOD else f"{fiscal_year}{period}"
+
+
+def get_metric_repositories() -> List["FinancialStatementRepository"]:
+    """The shared statement repositories in metric lookup priority order."""
+    dependency_map = _statement_dependency_map()
+    return [dependency_map[statement_type][1] for statement_type in METRIC_LOOKUP_ORDER]
+
+
+def load_metric_catalog(db: Session) -> None:
+    """(Re)builds the in-memory metric catalog from the statement tables."""
+    metric_catalog.load(db, get_metric_repositories())
+
+
+def refresh_metric_catalog(event: StatementsChanged) -> None:
+    """
+    Adds the EAV attributes written by another process to the metric catalog (the local upsert
+    path registers its own). Subscribed to the statement events at startup.
+    """
+    if not event.remote or not metric_catalog.loaded:
+        return
+    _, repo = get_statement_dependencies(event.statement_type)
+    db = SessionLocal()
+    try:
+        metric_catalog.load_company_attributes(db, repo, event.company_id)
+    finally:
+        db.close()
+
+
+# 报表写入版本号（跨进程缓存失效）
+_statement_versions = StatementVersionRepository()
+
+
+def _values_equal(old: Any, new: Any) -> bool:
+    """
+    Compares a stored column value with an incoming one.
+    Floats are compared with a relative tolerance, since MySQL FLOAT columns are single precision.
+    """
+    if isinstance(old, float) or isinstance(new, float):
+        if old is None or new is None:
+            return old is new
+        return math.isclose(old, new, rel_tol=1e-6)
+    return old == new
+
 class FinancialStatementRepository(BaseRepository[ModelType]):
     """
     A specialized base repository for financial statement models that supports
     querying metrics from both core and EAV tables.
     """
-    def get_metric_time_series(self, db: Session, company_id: int, metric_name: str) -> List[Dict[str, Any]]:
+    statement_type: FinancialStatementType = None
+    # 流量表（利润表、现金流量表）的季度值可滚动四季加总为 TTM；资产负债表是时点值
+    flow_statement: bool = False
+
+    def __init__(self, model: Type[ModelType], *, schema: Type[BaseModel], eav_model: Type[EAVModelType] = None, eav_fk_name: str = None):
+        super().__init__(model, eav_model=eav_model, eav_fk_name=eav_fk_name)
+        # The FMP schema whose declared fields map 1:1 onto the core table columns
+        self.schema = schema
+        self.codec = get_codec(schema)
+
+    def _split_record(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Fetches time series data for a given financial metric from the repository's
-        core and EAV tables.
+        Validates one raw FMP record and splits it into core column values and EAV attributes.
+        Core columns the record does not set are left out.
         """
-        query_results = []
-        core_model = self.model
-        eav_model = self.eav_model
+        core_values, eav_pairs = self.codec.decode(data)
+        return core_values, dict(eav_pairs)
 
-        # Check if the metric is a column in the core model
-        if hasattr(core_model, metric_name):
-            results = db.query(
-                core_model.fiscal_year.label("year"),
-                getattr(core_model, metric_name).label("value")
-            ).filter(core_model.company_id == company_id).order_by(core_model.fiscal_year).all()
-            query_results.extend([{"year": r.year, "value": r.value} for r in results])
+    def _resolve_statement_ids(self, db: Session, keys: Iterable[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], int]:
+        """
+        Resolves (symbol, fiscal_year, period) keys to existing core row ids with a single keyed query.
+        """
+        return {key: row["id"] for key, row in self._load_existing_statements(db, keys).items()}
 
-        # If not a core attribute, check if the metric is in the EAV table
-        elif self.eav_model and self.eav_fk_name:
-            results = db.query(
-                core_model.fiscal_year.label("year"),
-                eav_model.value_numeric.label("value")
-            ).join(eav_model, core_model.id == getattr(eav_model, self.eav_fk_name)) \
-            .filter(
-                core_model.company_id == company_id,
-                eav_model.attribute_name == metric_name
-            ).order_by(core_model.fiscal_year).all()
-            query_results.extend([{"year": r.year, "value": r.value} for r in results])
-
-        if not query_results:
-            return []
-
-        # Deduplicate by year and sort
-        final_results = list({(r['year']): r for r in query_results}.values())
-        final_results.sort(key=lambda x: x['year'])
-        
-        return final_results
+    def _load_existing_statements(self, db: Session, keys: Iterable[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """
+        Loads the existing core rows for (symbol, fiscal_year, period) keys with a single keyed query.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        table = self.model.__table__
+        rows = db.execute(
+            select(table).where(
+                # symbol 前缀条件让优化器走 (symbol, fiscal_year, period) 唯一索引，而不是全表扫描
+                table.c.symbol.in_({key[0] for key in keys}),
+                tuple_(table.c.symbol, table.c.fiscal_year, table.c.period).in_(keys),
+            )
+        ).mappings().all()
+        return {(r["symbol"], r["fiscal_year"], r["period"]): dict(r) for r in rows}
 
-class BalanceStatementRepository(FinancialStatementRepository[BalanceSheetStatementCore]):
-    def __init__(self):
-        super().__init__(
-            BalanceSheetStatementCore,
-            eav_model=BalanceSheetStatementEAV,
-            eav_fk_name="balance_statement_id"
-        )
+    def _coerce_core_values(self, core_fields: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Converts ISO date strings to `date` objects for Date columns, as Core inserts
+        (unlike the MySQL driver) do not accept strings on every dialect.
+        """
+        for column in self.model.__table__.columns:
+            value = core_fields.get(column.name)
+            if isinstance(column.type, Date) and isinstance(value, str):
+                core_fields[column.name] = date.fromisoformat(value[:10])
+        return core_fields
 
-    def _upsert_single(self, db: Session, *, data: Dict[str, Any], **kwargs) -> BalanceSheetStatementCore:
+    def _sync_eav_attributes(self, db: Session, eav_by_statement: Dict[int, Dict[str, Any]], summary: StatementUpsertSummary) -> None:
+        """
+        Diff-based EAV write for a batch of statements. Does NOT commit.
+
+        Loads the current attribute map of every statement in one query, then applies only
+        the difference: new attributes are inserted, changed ones updated by primary key and
+        vanished ones deleted, each in batched statements. Rows whose `value_numeric` and
+        `value_string` are unchanged are left untouched and counted as skipped.
+        """
+        if not self.eav_model or not self.eav_fk_name or not eav_by_statement:
+            return
+
+        eav_table = self.eav_model.__table__
+        fk_column = eav_table.c[self.eav_fk_name]
+
+        # 1️⃣ 一次查询加载当前属性表 {statement_id: {attribute_name: row}}
+        current: Dict[int, Dict[str, Any]] = defaultdict(dict)
+        for ids in chunked(list(eav_by_statement.keys())):
+            rows = db.execute(
+                select(eav_table.c.id, fk_column, eav_table.c.attribute_name,
+                       eav_table.c.value_numeric, eav_table.c.value_string)
+                .where(fk_column.in_(ids))
+            ).all()
+            for row in rows:
+                current[row._mapping[self.eav_fk_name]][row.attribute_name] = row
+
+        # 2️⃣ 计算插入 / 更新 / 删除集合
+        now = now_cst()
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+        deletes: List[int] = []
+        numeric_attributes = set()
+        for statement_id, eav_data in eav_by_statement.items():
+            existing = current.get(statement_id, {})
+            for attr, value in eav_data.items():
+                row = self._build_eav_row(statement_id, attr, value)
+                if row["value_numeric"] is not None:
+                    numeric_attributes.add(attr)
+                old = existing.pop(attr, None)
+                if old is None:
+                    inserts.append({**row, "created_at": now, "updated_at": now})
+                elif _values_equal(old.value_numeric, row["value_numeric"]) and old.value_string == row["value_string"]:
+                    summary.eav_skipped += 1
+                else:
+                    updates.append({"id": old.id, "value_numeric": row["value_numeric"],
+                                    "value_string": row["value_string"], "updated_at": now})
+            # 本次数据中已不存在的属性
+            deletes.extend(old.id for old in existing.values())
+
+        # 3️⃣ 分批执行
+        self._bulk_insert(db, self.eav_model, inserts)
+        for chunk in chunked(updates):
+            db.execute(update(self.eav_model), list(chunk))
+        for chunk in chunked(deletes):
+            db.execute(delete(self.eav_model).where(eav_table.c.id.in_(list(chunk))))
+
+        summary.eav_inserted += len(inserts)
+        summary.eav_updated += len(updates)
+        summary.eav_deleted += len(deletes)
+        metric_catalog.add_attributes(self.statement_type, numeric_attributes)
+
+    def _upsert_single(self, db: Session, *, data: Dict[str, Any], **kwargs) -> ModelType:
         """
-        Upserts a single balance sheet record from a dictionary without committing.
+        Upserts a single statement record from a dictionary without committing.
         The company_id is expected to be passed via kwargs.
         """
         company_id = kwargs.get("company_id")
 
-        snake_case_data = convert_keys_to_snake_case(data)
-        parsed_data = FMPBalanceSheetSchema.model_validate(snake_case_data)
-
         # 1️⃣ 区分核心字段和 EAV 字段
-        # 获取在 FMPBalanceSheetSchema 中明确定义的核心字段
-        core_field_names = set(FMPBalanceSheetSchema.model_fields.keys())
-        # 从验证过的数据中只提取核心字段的值
-        core_data_dict = parsed_data.model_dump(include=core_field_names, exclude_unset=True)
-
-        # 核心字段
+        core_data_dict, eav_data = self._split_record(data)
         core_fields = {"company_id": company_id, **core_data_dict}
 
         # 2️⃣ 查找或创建核心表记录 (Upsert)
-        # 使用 .get() 安全地访问唯一键，并提供更明确的错误处理
         symbol = core_fields.get("symbol")
         fiscal_year = core_fields.get("fiscal_year")
         period = core_fields.get("period")
@@ -123,8 +279,6 @@ class BalanceStatementRepository(FinancialStatementRepository[BalanceSheetStatem
             # 更新已存在的记录
             for key, value in core_fields.items():
                 setattr(core_obj, key, value)
-            # 删除旧的 EAV 记录
-            db.query(BalanceSheetStatementEAV).filter_by(balance_statement_id=core_obj.id).delete()
         else:
             # 创建新记录
             core_obj = self.model(**core_fields)
@@ -132,110 +286,427 @@ class BalanceStatementRepository(FinancialStatementRepository[BalanceSheetStatem
             # 立即刷新以获取 core_obj.id
             db.flush()
 
-        # 3️⃣ 保存 EAV 可变字段
-        # 从已验证的数据中排除核心字段，剩下的就是 EAV 字段
-        eav_data = parsed_data.model_dump(exclude=core_field_names, exclude_unset=True)
-        if eav_data:
-            self._save_eav_attributes(db, core_obj=core_obj, data=eav_data, excluded_keys=set())
+        # 3️⃣ 差量同步 EAV 可变字段
+        self._sync_eav_attributes(db, {core_obj.id: eav_data}, StatementUpsertSummary())
 
         return core_obj
 
-class IncomeStatementRepository(FinancialStatementRepository[IncomeSheetStatementCore]):
-    def __init__(self):
-        super().__init__(
-            IncomeSheetStatementCore,
-            eav_model=IncomeSheetStatementEAV,
-            eav_fk_name="income_statement_id"
-        )
+    def upsert_from_json(self, db: Session, *, data: Union[Dict[str, Any], List[Dict[str, Any]]], **kwargs) -> Union[ModelType, List[ModelType]]:
+        result = super().upsert_from_json(db, data=data, **kwargs)
+        # 逐条 upsert 路径在父类中已提交，版本号单独提交
+        version = _statement_versions.bump(db, kwargs.get("company_id"), self.statement_type)
+        db.commit()
+        statement_events.publish(StatementsChanged(self.statement_type, kwargs.get("company_id"), version=version))
+        return result
 
-    def _upsert_single(self, db: Session, *, data: Dict[str, Any], **kwargs) -> IncomeSheetStatementCore:
+    def bulk_upsert_from_json(self, db: Session, *, data: Union[Dict[str, Any], List[Dict[str, Any]]], company_id: int) -> StatementUpsertSummary:
         """
-        Upserts a single income statement record from a dictionary without committing.
-        The company_id is expected to be passed via kwargs.
+        Set-based upsert of one or many statements and commits the transaction.
+
+        Existing core rows are resolved with one keyed query and compared in memory; only new
+        or changed core rows are written, with multi-row `INSERT ... ON DUPLICATE KEY UPDATE`.
+        EAV rows are synced by diff, so re-syncing an unchanged filing writes nothing.
         """
-        company_id = kwargs.get("company_id")
+        if isinstance(data, dict):
+            data = [data]
+        elif not isinstance(data, list):
+            raise TypeError("Data must be a dictionary or a list of dictionaries")
+
+        # 1️⃣ 解析并按 (symbol, fiscal_year, period) 去重，后出现的记录覆盖先出现的
+        records: Dict[Tuple[str, str, str], Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        for item in data:
+            core_data_dict, eav_data = self._split_record(item)
+            key = (core_data_dict.get("symbol"), core_data_dict.get("fiscal_year"), core_data_dict.get("period"))
+            if not all(key):
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Incomplete data: 'symbol', 'fiscal_year', and 'period' are required for upsert."
+                )
+            records[key] = (self._coerce_core_values({"company_id": company_id, **core_data_dict}), eav_data)
+
+        summary = StatementUpsertSummary(statements=len(records))
+        if not records:
+            return summary
+
+        # 2️⃣ 一次查询加载已存在的核心记录，并在内存中比较（只比较记录中出现的字段）
+        existing = self._load_existing_statements(db, records.keys())
+        now = now_cst()
+        # 按列集合分组：多行 INSERT 要求同一语句的各行列相同，未出现的列不写入
+        core_rows: Dict[Tuple[str, ...], List[Dict[str, Any]]] = defaultdict(list)
+        for key, (core_fields, _) in records.items():
+            old = existing.get(key)
+            if old is None:
+                summary.inserted += 1
+            elif all(_values_equal(old[col], value) for col, value in core_fields.items()):
+                summary.unchanged += 1
+                continue
+            else:
+                summary.updated += 1
+            core_rows[tuple(core_fields)].append(
+                {"id": old["id"] if old else None, **core_fields, "created_at": now, "updated_at": now}
+            )
 
-        snake_case_data = convert_keys_to_snake_case(data)
-        parsed_data = FMPIncomeStatementSchema.model_validate(snake_case_data)
+        # 3️⃣ 核心表：多行 INSERT ... ON DUPLICATE KEY UPDATE（已存在的行携带主键，冲突即更新）
+        for columns, rows in core_rows.items():
+            self._bulk_upsert(db, self.model, rows, update_columns=[*columns, "updated_at"])
 
-        core_field_names = set(FMPIncomeStatementSchema.model_fields.keys())
-        core_data_dict = parsed_data.model_dump(include=core_field_names, exclude_unset=True)
+        # 新插入的行需要再查一次以获得自增主键
+        statement_ids = {key: row["id"] for key, row in existing.items()}
+        if summary.inserted:
+            new_keys = [key for key in records if key not in existing]
+            statement_ids.update(self._resolve_statement_ids(db, new_keys))
 
-        core_fields = {"company_id": company_id, **core_data_dict}
+        # 4️⃣ EAV 表：差量写入
+        self._sync_eav_attributes(
+            db, {statement_ids[key]: eav_data for key, (_, eav_data) in records.items()}, summary
+        )
 
-        symbol = core_fields.get("symbol")
-        fiscal_year = core_fields.get("fiscal_year")
-        period = core_fields.get("period")
+        # 5️⃣ 写入版本号与数据在同一事务提交，其他进程据此失效各自的缓存
+        version = _statement_versions.bump(db, company_id, self.statement_type) if summary.rows_touched else None
+        db.commit()
+        # 6️⃣ 提交后通知订阅者（缓存失效等）；没有任何写入时不通知
+        if summary.rows_touched:
+            statement_events.publish(StatementsChanged(self.statement_type, company_id, version=version))
+        return summary
+
+    def stream_upsert_from_json(
+        self,
+        db: Session,
+        *,
+        records: Iterable[Dict[str, Any]],
+        company_id: int,
+        batch_size: int = 500,
+        summary: Optional[StatementUpsertSummary] = None,
+    ) -> StatementUpsertSummary:
+        """
+        Upserts an iterable of raw records in bounded batches, committing after each batch,
+        so memory stays proportional to `batch_size` whatever the size of the source.
 
-        if not all([symbol, fiscal_year, period]):
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Incomplete data: 'symbol', 'fiscal_year', and 'period' are required for upsert."
+        Pass `summary` to keep the counters of the batches already committed when a later
+        batch fails.
+        """
+        summary = summary if summary is not None else StatementUpsertSummary()
+        batch: List[Dict[str, Any]] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                summary.merge(self.bulk_upsert_from_json(db, data=batch, company_id=company_id))
+                batch = []
+        if batch:
+            summary.merge(self.bulk_upsert_from_json(db, data=batch, company_id=company_id))
+        return summary
+
+    def get_period_filing_dates(self, db: Session, company_id: int) -> Dict[Tuple[str, str], Optional[date]]:
+        """
+        Returns {(fiscal_year, period): filing_date} of every stored statement of a company,
+        the watermark used by incremental syncs.
+        """
+        rows = db.query(self.model.fiscal_year, self.model.period, self.model.filing_date) \
+            .filter(self.model.company_id == company_id).all()
+        return {(r.fiscal_year, r.period): r.filing_date for r in rows}
+
+    def metric_series_selects(
+        self,
+        company_ids: Union[None, int, Iterable[int]],
+        metric_names: Iterable[str],
+        source: int,
+        periods: Iterable[str] = (ANNUAL_PERIOD,),
+        first_year: Optional[int] = None,
+        last_year: Optional[int] = None,
+    ) -> List[Select]:
+        """
+        Builds the selects returning (source, company_id, metric, year, period, value) rows for
+        `metric_names` of one company, of a list of companies or of every company (None): one per requested core
+        column, plus a single EAV join covering every other name. Only statements whose
+        `period` is in `periods` and whose fiscal year is within [first_year, last_year] are read.
+        `source` tags the rows so callers can tell the statement tables apart in a UNION.
+        """
+        core_model, columns = self.model, self.model.__table__.columns
+        core_names = [name for name in metric_names if name in columns]
+        eav_names = [name for name in metric_names if name not in columns]
+        periods = list(periods)
+        statement_filters = [core_model.period == periods[0] if len(periods) == 1 else core_model.period.in_(periods)]
+        if isinstance(company_ids, int):
+            statement_filters.append(core_model.company_id == company_ids)
+        elif company_ids is not None:
+            statement_filters.append(core_model.company_id.in_(list(company_ids)))
+        # fiscal_year 为四位年份字符串，按字符串比较即按年份比较，可以走 (company_id, fiscal_year) 索引
+        if first_year is not None:
+            statement_filters.append(core_model.fiscal_year >= str(first_year))
+        if last_year is not None:
+            statement_filters.append(core_model.fiscal_year <= str(last_year))
+
+        selects = [
+            select(
+                literal(source).label("source"),
+                core_model.company_id.label("company_id"),
+                literal(name).label("metric"),
+                core_model.fiscal_year.label("year"),
+                core_model.period.label("period"),
+                type_coerce(getattr(core_model, name), Float).label("value"),
+            ).where(*statement_filters)
+            for name in core_names
+        ]
+        if eav_names and self.eav_model is not None and self.eav_fk_name:
+            eav_model = self.eav_model
+            selects.append(
+                select(
+                    literal(source).label("source"),
+                    core_model.company_id.label("company_id"),
+                    eav_model.attribute_name.label("metric"),
+                    core_model.fiscal_year.label("year"),
+                    core_model.period.label("period"),
+                    type_coerce(eav_model.value_numeric, Float).label("value"),
+                )
+                .join(eav_model, core_model.id == getattr(eav_model, self.eav_fk_name))
+                .where(*statement_filters, eav_model.attribute_name.in_(eav_names))
             )
+        return selects
+
+    def get_metric_time_series(
+        self,
+        db: Session,
+        company_id: int,
+        metric_name: str,
+        granularity: Granularity = Granularity.ANNUAL,
+        window: SeriesWindow = SeriesWindow(),
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetches time series data for a given financial metric from the repository's
+        core and EAV tables, restricted to `window` in SQL.
+        """
+        series = fetch_metric_time_series(db, [self], company_id, [metric_name], granularity, window).get(metric_name, [])
+        return series[window.slice([point["year"] for point in series])]
 
-        core_obj = db.query(self.model).filter_by(symbol=symbol, fiscal_year=fiscal_year, period=period).first()
 
-        if core_obj:
-            for key, value in core_fields.items():
-                setattr(core_obj, key, value)
-            db.query(IncomeSheetStatementEAV).filter_by(income_statement_id=core_obj.id).delete()
-        else:
-            core_obj = self.model(**core_fields)
-            db.add(core_obj)
-            db.flush()
+# UNION 查询返回的列
+_FRAME_COLUMNS = ["source", "company_id", "metric", "year", "period", "value"]
 
-        eav_data = parsed_data.model_dump(exclude=core_field_names, exclude_unset=True)
-        if eav_data:
-            self._save_eav_attributes(db, core_obj=core_obj, data=eav_data, excluded_keys=set())
 
-        return core_obj
+def _metric_series_query(
+    repos: List[FinancialStatementRepository],
+    company_ids: Union[None, int, Iterable[int]],
+    metric_names: List[str],
+    granularity: Granularity = Granularity.ANNUAL,
+    window: SeriesWindow = SeriesWindow(),
+) -> Optional[Select]:
+    """
+    UNION ALL of every repository's metric selects, or None when no table may hold the metrics.
+    Once the metric catalog is loaded, only the tables that may hold a metric are queried.
 
-class CashStatementRepository(FinancialStatementRepository[CashSheetStatementCore]):
-    def __init__(self):
-        super().__init__(
-            CashSheetStatementCore,
-            eav_model=CashSheetStatementEAV,
-            eav_fk_name="cash_statement_id"
-        )
+    The window is applied in SQL together with the lookback periods needed before its first
+    period: the fiscal year bounds in the WHERE clause (starting one fiscal year early), and
+    `last_n` as a per-series ROW_NUMBER() limit.
+    """
+    periods = granularity_periods(granularity)
+    first_year = window.start_year - 1 if window.start_year is not None else None
+    selects = []
+    for source, repo in enumerate(repos):
+        names = metric_names
+        if metric_catalog.loaded:
+            names = [name for name in metric_names if metric_catalog.contains(repo.statement_type, name)]
+        if names:
+            selects.extend(repo.metric_series_selects(company_ids, names, source, periods, first_year, window.end_year))
+    if not selects:
+        return None
+    query = selects[0] if len(selects) == 1 else union_all(*selects)
+    if window.last_n is None:
+        return query
+
+    # 每个 (来源, 公司, 指标) 序列只保留最近的 last_n + 回看期数行
+    rows = query.subquery()
+    recency = func.row_number().over(
+        partition_by=[rows.c.source, rows.c.company_id, rows.c.metric],
+        order_by=[rows.c.year.desc(), rows.c.period.desc()],
+    ).label("recency")
+    ranked = select(rows, recency).subquery()
+    return select(*[ranked.c[column] for column in _FRAME_COLUMNS]) \
+        .where(ranked.c.recency <= window.last_n + lookback_periods(granularity))
+
+
+def _prioritized_frame(rows: List[Any]) -> pd.DataFrame:
+    """
+    Long frame of the UNION rows keeping, per (company, metric), only the rows of the
+    first repository holding data, deduplicated by (company_id, metric, year, period).
+    """
+    frame = pd.DataFrame(rows, columns=_FRAME_COLUMNS)
+    if frame.empty:
+        return frame
+    frame["value"] = pd.to_numeric(frame["value"], errors="coerce")
 
-    def _upsert_single(self, db: Session, *, data: Dict[str, Any], **kwargs) -> CashSheetStatementCore:
-        """
-        Upserts a single cash flow statement record from a dictionary without committing.
-        The company_id is expected to be passed via kwargs.
-        """
-        company_id = kwargs.get("company_id")
+    # 每个 (公司, 指标) 只保留优先级最高（source 最小）的报表来源
+    first_source = frame.groupby(["company_id", "metric"])["source"].transform("min")
+    frame = frame[frame["source"] == first_source]
+    return frame.drop_duplicates(["company_id", "metric", "year", "period"], keep="last")
 
-        snake_case_data = convert_keys_to_snake_case(data)
-        parsed_data = FMPCashFlowStatementSchema.model_validate(snake_case_data)
 
-        core_field_names = set(FMPCashFlowStatementSchema.model_fields.keys())
-        core_data_dict = parsed_data.model_dump(include=core_field_names, exclude_unset=True)
+def _trailing_twelve_months(frame: pd.DataFrame, repos: List[FinancialStatementRepository]) -> pd.DataFrame:
+    """
+    Turns the quarterly rows of a prioritized frame into trailing-twelve-months values,
+    vectorized over every (company, metric) series at once.
 
-        core_fields = {"company_id": company_id, **core_data_dict}
+    Flow statement values are summed over a rolling window of four consecutive quarters;
+    the first three quarters of a series and windows spanning a missing quarter are dropped.
+    Balance sheet values are point-in-time, so the quarter-end value is kept as is.
+    """
+    if frame.empty:
+        return frame
+    quarter = pd.to_numeric(frame["year"], errors="coerce") * 4 + frame["period"].str[1:].astype(int) - 1
+    frame = frame.assign(quarter=quarter).sort_values(["company_id", "metric", "quarter"])
+
+    series_id = frame.groupby(["company_id", "metric"], sort=False).ngroup().to_numpy()
+    quarters = frame["quarter"].to_numpy(dtype=np.float64)
+    values = frame["value"].to_numpy(dtype=np.float64)
+    window = np.full(len(values), np.nan)
+    if len(values) >= 4:
+        window[3:] = values[3:] + values[2:-1] + values[1:-2] + values[:-3]
+        # 窗口内四行属于同一序列，且恰好是连续的四个季度
+        consecutive = (series_id[3:] == series_id[:-3]) & (quarters[3:] - quarters[:-3] == 3)
+        window[3:][~consecutive] = np.nan
+
+    flow_sources = [source for source, repo in enumerate(repos) if repo.flow_statement]
+    frame["value"] = np.where(frame["source"].isin(flow_sources).to_numpy(), window, values)
+    return frame.drop(columns="quarter").dropna(subset=["value"])
+
+
+def _label_periods(frame: pd.DataFrame) -> pd.DataFrame:
+    """Replaces the `year` column by the period label of each row (see `period_label`)."""
+    return frame.assign(year=frame["year"].where(frame["period"] == ANNUAL_PERIOD, frame["year"] + frame["period"]))
+
+
+def _fetch_series_rows(
+    db: Session,
+    repos: List[FinancialStatementRepository],
+    company_ids: Union[None, int, Iterable[int]],
+    metric_names: List[str],
+    granularity: Granularity = Granularity.ANNUAL,
+    window: SeriesWindow = SeriesWindow(),
+) -> List[Any]:
+    """
+    The (source, company_id, metric, year, period, value) rows of `_metric_series_query`,
+    read from the in-memory statement store when it is loaded, from the database otherwise.
+    """
+    first_year = window.start_year - 1 if window.start_year is not None else None
+    limit = window.last_n + lookback_periods(granularity) if window.last_n is not None else None
+    rows = statement_store.series_rows(
+        [repo.statement_type for repo in repos],
+        [company_ids] if isinstance(company_ids, int) else company_ids,
+        metric_names, granularity_periods(granularity), first_year, window.end_year, limit,
+    )
+    if rows is not None:
+        return rows
+    query = _metric_series_query(repos, company_ids, metric_names, granularity, window)
+    return db.execute(query).all() if query is not None else []
+
+
+def fetch_metric_time_series(
+    db: Session,
+    repos: List[FinancialStatementRepository],
+    company_id: int,
+    metric_names: Iterable[str],
+    granularity: Granularity = Granularity.ANNUAL,
+    window: SeriesWindow = SeriesWindow(),
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetches the series of several metrics of one company in a single UNION ALL query
+    over every statement table, at the given granularity (annual by default).
 
-        symbol = core_fields.get("symbol")
-        fiscal_year = core_fields.get("fiscal_year")
-        period = core_fields.get("period")
+    With a bounded `window`, only its periods plus the lookback periods before them are
+    read (see `_metric_series_query`); callers trim the lookback once growth rates are computed.
 
-        if not all([symbol, fiscal_year, period]):
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Incomplete data: 'symbol', 'fiscal_year', and 'period' are required for upsert."
-            )
+    A metric found in several tables is taken from the first repository in `repos` that has
+    data for it (the order is the lookup priority). Each series is deduplicated by
+    (year, period) and sorted ascending; its `year` is the period label (`2024`, `2024Q3`).
+    Metrics without any data are absent from the result.
+    """
+    metric_names = list(dict.fromkeys(metric_names))
+    rows = _fetch_series_rows(db, repos, company_id, metric_names, granularity, window)
+
+    if granularity == Granularity.TTM:
+        frame = _label_periods(_trailing_twelve_months(_prioritized_frame(rows), repos))
+        ttm_series = {
+            name: [{"year": year, "value": value} for year, value in zip(group["year"], group["value"].tolist())]
+            for name, group in frame.sort_values("year").groupby("metric", sort=False)
+        }
+        return {name: ttm_series[name] for name in metric_names if name in ttm_series}
+
+    # metric -> source -> {(year, period): value}
+    found: Dict[str, Dict[int, Dict[Tuple[str, str], Any]]] = defaultdict(lambda: defaultdict(dict))
+    for source, _, metric, year, period, value in rows:
+        found[metric][source][(year, period)] = value
+
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for name in metric_names:
+        if name not in found:
+            continue
+        by_period = found[name][min(found[name])]
+        series[name] = [{"year": period_label(*key), "value": by_period[key]} for key in sorted(by_period)]
+    return series
+
+
+def fetch_metric_frame(
+    db: Session,
+    repos: List[FinancialStatementRepository],
+    company_ids: Optional[Iterable[int]],
+    metric_names: Iterable[str],
+    granularity: Granularity = Granularity.ANNUAL,
+) -> pd.DataFrame:
+    """
+    Multi-company counterpart of `fetch_metric_time_series`: one UNION ALL query returning
+    the series of `metric_names` for every company in `company_ids` (every company when None)
+    as a long DataFrame with columns (company_id, metric, year, value), `year` being the period label.
 
-        core_obj = db.query(self.model).filter_by(symbol=symbol, fiscal_year=fiscal_year, period=period).first()
+    The same lookup priority applies per (company, metric): only rows of the first repository
+    holding data are kept. Rows are deduplicated by (company_id, metric, year, period) and sorted.
+    """
+    columns = ["company_id", "metric", "year", "value"]
+    if company_ids is not None:
+        company_ids = list(dict.fromkeys(company_ids))
+    metric_names = list(dict.fromkeys(metric_names))
+    rows = _fetch_series_rows(db, repos, company_ids, metric_names, granularity) if company_ids != [] else []
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    frame = _prioritized_frame(rows)
+    if granularity == Granularity.TTM:
+        frame = _trailing_twelve_months(frame, repos)
+    if frame.empty:
+        return frame[columns].reset_index(drop=True)
+    frame = _label_periods(frame)
+    return frame.sort_values(["company_id", "metric", "year"])[columns].reset_index(drop=True)
 
-        if core_obj:
-            for key, value in core_fields.items():
-                setattr(core_obj, key, value)
-            db.query(CashSheetStatementEAV).filter_by(cash_statement_id=core_obj.id).delete()
-        else:
-            core_obj = self.model(**core_fields)
-            db.add(core_obj)
-            db.flush()
 
-        eav_data = parsed_data.model_dump(exclude=core_field_names, exclude_unset=True)
-        if eav_data:
-            self._save_eav_attributes(db, core_obj=core_obj, data=eav_data, excluded_keys=set())
+class BalanceStatementRepository(FinancialStatementRepository[BalanceSheetStatementCore]):
+    statement_type = FinancialStatementType.BALANCE
 
-        return core_obj
+    def __init__(self):
+        super().__init__(
+            BalanceSheetStatementCore,
+            schema=FMPBalanceSheetSchema,
+            eav_model=BalanceSheetStatementEAV,
+            eav_fk_name="balance_statement_id"
+        )
+
+class IncomeStatementRepository(FinancialStatementRepository[IncomeSheetStatementCore]):
+    statement_type = FinancialStatementType.INCOME
+    flow_statement = True
+
+    def __init__(self):
+        super().__init__(
+            IncomeSheetStatementCore,
+            schema=FMPIncomeStatementSchema,
+            eav_model=IncomeSheetStatementEAV,
+            eav_fk_name="income_statement_id"
+        )
+
+class CashStatementRepository(FinancialStatementRepository[CashSheetStatementCore]):
+    statement_type = FinancialStatementType.CASH
+    flow_statement = True
+
+    def __init__(self):
+        super().__init__(
+            CashSheetStatementCore,
+            schema=FMPCashFlowStatementSchema,
+            eav_model=CashSheetStatementEAV,
+            eav_fk_name="cash_statement_id"
+        )
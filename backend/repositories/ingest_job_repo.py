@@ -0,0 +1,95 @@
+import json
+from datetime import timedelta
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models.base import now_cst
+from models.ingest_job import IngestJob, IngestJobStatus
+from schemas.financial import StatementUpsertSummary, SyncMode
+from .base import BaseRepository
+
+
+class IngestJobRepository(BaseRepository[IngestJob]):
+    def __init__(self):
+        super().__init__(IngestJob)
+
+    def create_jobs(self, db: Session, *, targets: List[tuple], mode: str = SyncMode.INCREMENTAL.value, period: str = "annual") -> List[IngestJob]:
+        """
+        Creates one pending job per (company_id, ticker, statement_type) target and commits.
+        """
+        jobs = [
+            self.model(company_id=company_id, ticker=ticker, statement_type=statement_type,
+                       mode=mode, period=period,
+                       status=IngestJobStatus.PENDING, progress=0, message="queued")
+            for company_id, ticker, statement_type in targets
+        ]
+        db.add_all(jobs)
+        db.commit()
+        return jobs
+
+    def list_jobs(self, db: Session, *, status: Optional[IngestJobStatus] = None, skip: int = 0, limit: int = 100) -> List[IngestJob]:
+        query = db.query(self.model)
+        if status is not None:
+            query = query.filter(self.model.status == status)
+        return query.order_by(self.model.id.desc()).offset(skip).limit(limit).all()
+
+    def list_pending_ids(self, db: Session) -> List[int]:
+        rows = db.query(self.model.id).filter(self.model.status == IngestJobStatus.PENDING).order_by(self.model.id).all()
+        return [row.id for row in rows]
+
+    def requeue_stale(self, db: Session, *, stale_after: timedelta) -> int:
+        """
+        Resets RUNNING jobs whose last update is older than `stale_after` (their worker died)
+        to PENDING and commits. Returns the number of requeued jobs.
+        """
+        result = db.execute(
+            update(self.model)
+            .where(self.model.status == IngestJobStatus.RUNNING, self.model.updated_at < now_cst() - stale_after)
+            .values(status=IngestJobStatus.PENDING, progress=0, message="requeued after worker stopped", updated_at=now_cst())
+        )
+        db.commit()
+        return result.rowcount
+
+    def claim(self, db: Session, job_id: int) -> Optional[IngestJob]:
+        """
+        Atomically moves a PENDING job to RUNNING and commits. Returns the job, or None when it
+        is not pending anymore (e.g. another worker process claimed it first).
+        """
+        now = now_cst()
+        result = db.execute(
+            update(self.model)
+            .where(self.model.id == job_id, self.model.status == IngestJobStatus.PENDING)
+            .values(status=IngestJobStatus.RUNNING, started_at=now, progress=0, message="running", error=None, updated_at=now)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            return None
+        return self.get(db, id=job_id)
+
+    def update_progress(self, db: Session, job: IngestJob, *, progress: int, message: str) -> None:
+        """Records the progress of a running job; also refreshes `updated_at`, the heartbeat checked by `requeue_stale`."""
+        job.progress = progress
+        job.message = message
+        job.updated_at = now_cst()
+        db.commit()
+
+    def mark_succeeded(self, db: Session, job: IngestJob, *, summary: StatementUpsertSummary) -> None:
+        job.status = IngestJobStatus.SUCCEEDED
+        job.progress = 100
+        job.message = "done"
+        job.result = json.dumps(summary.model_dump())
+        job.finished_at = now_cst()
+        db.commit()
+
+    def mark_failed(self, db: Session, job: IngestJob, *, error: str) -> None:
+        job.status = IngestJobStatus.FAILED
+        job.message = "failed"
+        job.error = error
+        job.finished_at = now_cst()
+        db.commit()
+
+
+def get_ingest_job_repo() -> IngestJobRepository:
+    return IngestJobRepository()
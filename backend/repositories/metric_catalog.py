@@ -0,0 +1,122 @@
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import Float, Integer, Numeric, select
+from sqlalchemy.orm import Session
+
+from core.log import logger
+from schemas.financial import FinancialStatementType
+
+# 核心表中不作为指标的数值列
+_NON_METRIC_COLUMNS = frozenset({"id", "company_id"})
+
+
+def numeric_columns(model) -> List[str]:
+    """The numeric core columns of a statement model that hold metrics."""
+    return [
+        column.name for column in model.__table__.columns
+        if column.name not in _NON_METRIC_COLUMNS and isinstance(column.type, (Integer, Float, Numeric))
+    ]
+
+
+class MetricLocation(NamedTuple):
+    """Where a metric is stored: a core column (`column`) or an EAV attribute (`attribute`)."""
+    statement_type: FinancialStatementType
+    column: Optional[str] = None
+    attribute: Optional[str] = None
+
+
+class MetricCatalog:
+    """
+    In-memory index of where every metric lives.
+
+    Core columns come from the model metadata; EAV attribute names are loaded once with a
+    `SELECT DISTINCT` per statement table and then kept up to date by the repositories on
+    every upsert (and, for writes of other processes, from the statement version watcher). Lookups never touch the database, so unknown metrics are rejected from
+    memory and known ones are routed straight to their table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # 查找优先级：income → balance → cash
+        self._order: List[FinancialStatementType] = []
+        self._core_columns: Dict[FinancialStatementType, Set[str]] = {}
+        self._eav_attributes: Dict[FinancialStatementType, Set[str]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session, repos: Iterable) -> None:
+        """Builds the index from the given statement repositories, in lookup priority order."""
+        order, core_columns, eav_attributes = [], {}, {}
+        for repo in repos:
+            statement_type = repo.statement_type
+            order.append(statement_type)
+            core_columns[statement_type] = set(numeric_columns(repo.model))
+            eav_attributes[statement_type] = set()
+            if repo.eav_model is not None:
+                eav_attributes[statement_type] = set(db.scalars(
+                    select(repo.eav_model.attribute_name)
+                    .where(repo.eav_model.value_numeric.is_not(None))
+                    .distinct()
+                ))
+
+        with self._lock:
+            # 加载期间由 upsert 新增的属性不能丢
+            for statement_type, names in self._eav_attributes.items():
+                eav_attributes.setdefault(statement_type, set()).update(names)
+            self._order, self._core_columns, self._eav_attributes = order, core_columns, eav_attributes
+            self._loaded = True
+        logger.info(
+            "Metric catalog loaded: "
+            + ", ".join(f"{t.value}={len(core_columns[t])}+{len(eav_attributes[t])}" for t in order)
+        )
+
+    def ensure_loaded(self, db: Session, repos: Iterable) -> None:
+        if not self._loaded:
+            self.load(db, repos)
+
+    def add_attributes(self, statement_type: FinancialStatementType, names: Iterable[str]) -> None:
+        """Registers EAV attributes written by an upsert."""
+        with self._lock:
+            self._eav_attributes.setdefault(statement_type, set()).update(names)
+
+    def load_company_attributes(self, db: Session, repo, company_id: int) -> None:
+        """Registers the numeric EAV attributes of one company's statements, e.g. after another process wrote them."""
+        if repo.eav_model is None:
+            return
+        foreign_key = getattr(repo.eav_model, repo.eav_fk_name)
+        names = db.scalars(
+            select(repo.eav_model.attribute_name)
+            .join(repo.model, repo.model.id == foreign_key)
+            .where(repo.model.company_id == company_id, repo.eav_model.value_numeric.is_not(None))
+            .distinct()
+        )
+        self.add_attributes(repo.statement_type, names)
+
+    def locate(self, metric_name: str) -> List[MetricLocation]:
+        """Every place the metric may be stored, in lookup priority order (empty when unknown)."""
+        locations = []
+        for statement_type in self._order:
+            if metric_name in self._core_columns[statement_type]:
+                locations.append(MetricLocation(statement_type, column=metric_name))
+            elif metric_name in self._eav_attributes.get(statement_type, ()):
+                locations.append(MetricLocation(statement_type, attribute=metric_name))
+        return locations
+
+    def contains(self, statement_type: FinancialStatementType, metric_name: str) -> bool:
+        return (metric_name in self._core_columns.get(statement_type, ())
+                or metric_name in self._eav_attributes.get(statement_type, ()))
+
+    def metric_names(self) -> Dict[FinancialStatementType, List[str]]:
+        """All known metric names per statement type (core columns and EAV attributes)."""
+        with self._lock:
+            return {
+                statement_type: sorted(self._core_columns[statement_type] | self._eav_attributes.get(statement_type, set()))
+                for statement_type in self._order
+            }
+
+
+metric_catalog = MetricCatalog()
@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models.metric_formula import MetricFormula
+from schemas.metric_formula import MetricFormulaCreate
+from .base import BaseRepository
+
+
+class MetricFormulaRepository(BaseRepository[MetricFormula]):
+    def __init__(self):
+        super().__init__(MetricFormula)
+
+    def get_by_name(self, db: Session, name: str) -> Optional[MetricFormula]:
+        return db.query(self.model).filter(self.model.name == name).first()
+
+    def list_all(self, db: Session) -> List[MetricFormula]:
+        return db.query(self.model).order_by(self.model.id).all()
+
+    def upsert(self, db: Session, *, obj_in: MetricFormulaCreate) -> MetricFormula:
+        """Creates the formula, or replaces the definition of an existing one with the same name."""
+        db_obj = self.get_by_name(db, obj_in.name)
+        if db_obj is None:
+            db_obj = self.model(name=obj_in.name)
+            db.add(db_obj)
+        db_obj.formula = obj_in.formula
+        db_obj.title = obj_in.title
+        db_obj.unit = obj_in.unit
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def delete_by_name(self, db: Session, name: str) -> Optional[MetricFormula]:
+        db_obj = self.get_by_name(db, name)
+        if db_obj:
+            db.delete(db_obj)
+            db.commit()
+        return db_obj
+
+
+def get_metric_formula_repo() -> MetricFormulaRepository:
+    return MetricFormulaRepository()
@@ -0,0 +1,82 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from models.metric_series import MetricSeriesPoint
+from schemas.financial import Granularity, SeriesWindow
+from .base import BaseRepository, chunked
+
+
+class MaterializedSeries(NamedTuple):
+    """The stored chart points of one metric: period labels, display values and growth rates (%)."""
+    periods: List[str]
+    values: List[Optional[float]]
+    growth_rates: List[Optional[float]]
+
+
+class MetricSeriesRepository(BaseRepository[MetricSeriesPoint]):
+    def __init__(self):
+        super().__init__(MetricSeriesPoint)
+
+    def get_series(
+        self,
+        db: Session,
+        company_id: int,
+        metric_names: Iterable[str],
+        granularity: Granularity,
+        window: SeriesWindow = SeriesWindow(),
+    ) -> Dict[str, MaterializedSeries]:
+        """
+        Reads the materialized series of several metrics of one company with a single range scan
+        of the (company_id, metric_name, granularity, period) key. The window is applied in SQL;
+        growth rates are stored, so no lookback period is needed. Metrics without rows are absent.
+        """
+        table = self.model.__table__
+        filters = [
+            table.c.company_id == company_id,
+            table.c.metric_name.in_(list(metric_names)),
+            table.c.granularity == granularity.value,
+        ]
+        # 报告期标签以四位财年开头（2024、2024Q3），按字符串比较即可限定财年范围
+        if window.start_year is not None:
+            filters.append(table.c.period >= str(window.start_year))
+        if window.end_year is not None:
+            filters.append(table.c.period < str(window.end_year + 1))
+        query = select(table.c.metric_name, table.c.period, table.c.value, table.c.growth).where(*filters)
+        if window.last_n is not None:
+            rows = query.subquery()
+            recency = func.row_number().over(partition_by=rows.c.metric_name, order_by=rows.c.period.desc()).label("recency")
+            ranked = select(rows, recency).subquery()
+            query = select(ranked.c.metric_name, ranked.c.period, ranked.c.value, ranked.c.growth) \
+                .where(ranked.c.recency <= window.last_n)
+
+        points: Dict[str, List[Any]] = defaultdict(list)
+        for row in db.execute(query).all():
+            points[row.metric_name].append(row)
+        series = {}
+        for name, rows in points.items():
+            rows.sort(key=lambda r: r.period)
+            series[name] = MaterializedSeries([r.period for r in rows], [r.value for r in rows], [r.growth for r in rows])
+        return series
+
+    def replace_company_series(self, db: Session, company_id: int, metric_names: List[str], rows: List[Dict[str, Any]]) -> None:
+        """Replaces every stored point of `metric_names` for a company with `rows`. Does NOT commit."""
+        table = self.model.__table__
+        for names in chunked(metric_names):
+            db.execute(delete(table).where(table.c.company_id == company_id, table.c.metric_name.in_(list(names))))
+        self._bulk_insert(db, self.model, rows)
+
+    def delete_company(self, db: Session, company_id: int) -> None:
+        """Drops the materialized series of a company, so its charts are computed live. Does NOT commit."""
+        db.execute(delete(self.model).where(self.model.company_id == company_id))
+
+    def delete_metrics(self, db: Session, metric_names: Iterable[str]) -> None:
+        """Drops the materialized series of metrics for every company. Does NOT commit."""
+        for names in chunked(list(metric_names)):
+            db.execute(delete(self.model).where(self.model.metric_name.in_(list(names))))
+
+
+def get_metric_series_repo() -> MetricSeriesRepository:
+    return MetricSeriesRepository()
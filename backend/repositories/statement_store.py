@@ -0,0 +1,285 @@
+import math
+import threading
+from itertools import repeat
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import config
+from core.database import SessionLocal
+from core.log import logger
+from repositories.base import chunked
+from repositories.events import StatementsChanged
+from repositories.metric_catalog import numeric_columns
+from schemas.financial import FinancialStatementType
+
+# 批量加载时每次读取的公司数，临时 DataFrame 的大小与之成正比
+LOAD_BATCH_COMPANIES = 500
+
+
+class _CompanyBlock(NamedTuple):
+    """One company's statements of one type, rows sorted by (fiscal_year, period)."""
+    fiscal_years: np.ndarray  # <U4
+    periods: np.ndarray       # <U2（FY / Q1–Q4）
+    # statements × attributes（建块时已知的属性数）；NULL 或缺失为 NaN
+    values: np.ndarray
+
+
+class _StatementTable:
+    """
+    Columnar copy of one statement type: a (period × attribute) float64 block per company,
+    with a dictionary-encoded attribute index shared by all blocks. Core columns come first
+    and exist on every statement row; EAV numeric attributes are appended as they appear, so
+    blocks built earlier are narrower and lack the attributes added after them.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        core_columns = numeric_columns(repo.model)
+        self.attributes: Dict[str, int] = {name: i for i, name in enumerate(core_columns)}
+        self.core_width = len(core_columns)
+        self.blocks: Dict[int, _CompanyBlock] = {}
+
+    def estimate_nbytes(self, db: Session) -> int:
+        """
+        Upper bound of the size of a full load, from two count queries: every statement row
+        at the width of all core columns plus every distinct numeric EAV attribute.
+        """
+        core_model = self.repo.model
+        rows = db.execute(select(func.count(core_model.id))).scalar_one()
+        width = len(self.attributes)
+        if self.repo.eav_model is not None and self.repo.eav_fk_name:
+            eav_model = self.repo.eav_model
+            width += db.execute(
+                select(func.count(eav_model.attribute_name.distinct())).where(eav_model.value_numeric.is_not(None))
+            ).scalar_one()
+        return rows * width * np.dtype(np.float64).itemsize
+
+    def company_ranges(self, db: Session, batch_size: int = LOAD_BATCH_COMPANIES) -> List[Tuple[int, int]]:
+        """Splits the companies having statements into inclusive id ranges of at most `batch_size` companies."""
+        core_model = self.repo.model
+        company_ids = db.execute(select(core_model.company_id).distinct().order_by(core_model.company_id)).scalars().all()
+        return [(batch[0], batch[-1]) for batch in chunked(company_ids, batch_size)]
+
+    def load_blocks(self, db: Session, first_company_id: int, last_company_id: int) -> Dict[int, _CompanyBlock]:
+        """Reads the statements of the companies in an inclusive id range into blocks: one core and one EAV query."""
+        repo, core_model = self.repo, self.repo.model
+        core_names = list(self.attributes)[:self.core_width]
+        query = select(
+            core_model.id, core_model.company_id, core_model.fiscal_year, core_model.period,
+            *[getattr(core_model, name) for name in core_names],
+        )
+        query = query.where(core_model.company_id.between(first_company_id, last_company_id))
+        core = pd.DataFrame(db.execute(query).all(), columns=["id", "company_id", "fiscal_year", "period", *core_names])
+        if core.empty:
+            return {}
+        core = core.sort_values(["company_id", "fiscal_year", "period"], kind="stable")
+
+        # 1. EAV 数值属性（字符串属性不进入列存）
+        eav = pd.DataFrame(columns=["statement_id", "attribute", "value"])
+        if repo.eav_model is not None and repo.eav_fk_name:
+            eav_model = repo.eav_model
+            foreign_key = getattr(eav_model, repo.eav_fk_name)
+            eav_query = select(foreign_key, eav_model.attribute_name, eav_model.value_numeric) \
+                .join(core_model, core_model.id == foreign_key) \
+                .where(eav_model.value_numeric.is_not(None), core_model.company_id.between(first_company_id, last_company_id))
+            eav = pd.DataFrame(db.execute(eav_query).all(), columns=["statement_id", "attribute", "value"])
+        for name in eav["attribute"].unique():
+            self.attributes.setdefault(name, len(self.attributes))
+
+        # 2. 核心列与 EAV 属性散射进同一个 statements × attributes 矩阵
+        values = np.full((len(core), len(self.attributes)), np.nan)
+        values[:, :self.core_width] = core[core_names].to_numpy(dtype=np.float64)
+        if not eav.empty:
+            rows = pd.Index(core["id"]).get_indexer(eav["statement_id"])
+            columns = eav["attribute"].map(self.attributes).to_numpy()
+            found = rows >= 0
+            values[rows[found], columns[found]] = eav["value"].to_numpy(dtype=np.float64)[found]
+
+        # 3. 按公司切分（各块为大矩阵的视图）
+        company_ids = core["company_id"].to_numpy()
+        fiscal_years = core["fiscal_year"].to_numpy().astype(str)
+        periods = core["period"].to_numpy().astype(str)
+        starts = np.flatnonzero(np.r_[True, company_ids[1:] != company_ids[:-1]])
+        ends = np.r_[starts[1:], len(company_ids)]
+        return {
+            int(company_ids[start]): _CompanyBlock(fiscal_years[start:end], periods[start:end], values[start:end])
+            for start, end in zip(starts, ends)
+        }
+
+
+class StatementStore:
+    """
+    Optional in-process columnar copy of the statement tables serving metric series reads.
+
+    Bulk-loaded once, in batches of companies after checking an upper bound of its size against
+    `max_bytes`, then kept current by the statement events: each committed upsert reloads the
+    blocks of that company and statement type.
+    Reads return the same rows as the SQL series query and never touch the database; until
+    the store is loaded, or once it outgrows `max_bytes`, callers fall back to SQL.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_bytes: int):
+        self.session_factory = session_factory
+        self.max_bytes = max_bytes
+        # 写入（加载 / 刷新）串行；读取不加锁，只读取已发布的块
+        self._lock = threading.Lock()
+        self._tables: Dict[FinancialStatementType, _StatementTable] = {}
+        self._nbytes = 0
+        self._ready = False
+        self._loading = False
+        # 加载期间收到的写入事件，加载完成后补刷
+        self._pending: Set[Tuple[FinancialStatementType, int]] = set()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def _load_tables(self, db: Session, repos: Iterable) -> Optional[Tuple[Dict[FinancialStatementType, _StatementTable], int]]:
+        """Loads every statement table in company-id batches; None when the budget would be exceeded."""
+        tables = {repo.statement_type: _StatementTable(repo) for repo in repos}
+        # 1. 先按行数 × 属性数估算上限，超出预算时不加载任何数据
+        estimate = sum(table.estimate_nbytes(db) for table in tables.values())
+        if estimate > self.max_bytes:
+            logger.warning(f"Statement store not enabled: an estimated {estimate / 2**20:.0f} MiB exceeds the {self.max_bytes / 2**20:.0f} MiB budget")
+            return None
+
+        # 2. 按公司 id 区间分批加载，临时数据只与批大小相关；每批之后检查预算（加载期间可能有新写入）
+        nbytes = 0
+        for table in tables.values():
+            for first_company_id, last_company_id in table.company_ranges(db):
+                blocks = table.load_blocks(db, first_company_id, last_company_id)
+                table.blocks.update(blocks)
+                nbytes += sum(block.values.nbytes for block in blocks.values())
+                if nbytes > self.max_bytes:
+                    logger.warning(f"Statement store not enabled: loading exceeded the {self.max_bytes / 2**20:.0f} MiB budget")
+                    return None
+        return tables, nbytes
+
+    def load(self, repos: Iterable) -> bool:
+        """Bulk-loads every company of the given statement repositories. Returns whether the store is ready."""
+        with self._lock:
+            self._loading = True
+            self._pending.clear()
+        db = self.session_factory()
+        try:
+            loaded = self._load_tables(db, repos)
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        finally:
+            db.close()
+
+        with self._lock:
+            self._loading = False
+            pending, self._pending = self._pending, set()
+            if loaded is None:
+                return False
+            tables, nbytes = loaded
+            self._tables, self._nbytes, self._ready = tables, nbytes, True
+        logger.info(
+            f"Statement store loaded ({nbytes / 2**20:.1f} MiB): "
+            + ", ".join(f"{t.value}={len(table.blocks)} companies × {len(table.attributes)} attributes" for t, table in tables.items())
+        )
+        for statement_type, company_id in pending:
+            self.on_statements_changed(StatementsChanged(statement_type, company_id))
+        return self._ready
+
+    def refresh(self, db: Session, statement_type: FinancialStatementType, company_id: int) -> None:
+        """Reloads one company's statements of one type from the database."""
+        with self._lock:
+            table = self._tables.get(statement_type)
+            if not self._ready or table is None:
+                return
+            blocks = table.load_blocks(db, company_id, company_id)
+            old, new = table.blocks.get(company_id), blocks.get(company_id)
+            self._nbytes += (new.values.nbytes if new is not None else 0) - (old.values.nbytes if old is not None else 0)
+            if new is None:
+                table.blocks.pop(company_id, None)
+            else:
+                table.blocks[company_id] = new
+            if self._nbytes > self.max_bytes:
+                # 超出内存预算时整体停用，读取回退到数据库
+                logger.warning(f"Statement store disabled: {self._nbytes / 2**20:.0f} MiB exceeds the {self.max_bytes / 2**20:.0f} MiB budget")
+                self._ready, self._tables, self._nbytes = False, {}, 0
+
+    def on_statements_changed(self, event: StatementsChanged) -> None:
+        with self._lock:
+            if self._loading:
+                self._pending.add((event.statement_type, event.company_id))
+                return
+        if not self._ready:
+            return
+        db = self.session_factory()
+        try:
+            self.refresh(db, event.statement_type, event.company_id)
+        except Exception:
+            # 刷新失败时停用，避免继续提供过期数据
+            with self._lock:
+                self._ready, self._tables, self._nbytes = False, {}, 0
+            raise
+        finally:
+            db.close()
+
+    def series_rows(
+        self,
+        statement_types: Sequence[FinancialStatementType],
+        company_ids: Optional[Iterable[int]],
+        metric_names: List[str],
+        periods: Sequence[str],
+        first_year: Optional[int] = None,
+        last_year: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Optional[List[tuple]]:
+        """
+        The (source, company_id, metric, year, period, value) rows of the SQL series query, or
+        None when the store is not ready. `source` is the position of the statement type in
+        `statement_types`; `limit` keeps the latest rows of each (source, company, metric) series.
+        """
+        tables = self._tables
+        if not self._ready or any(statement_type not in tables for statement_type in statement_types):
+            return None
+        periods = np.asarray(periods, dtype=str)
+        rows: List[tuple] = []
+        for source, statement_type in enumerate(statement_types):
+            table = tables[statement_type]
+            columns = [(name, table.attributes[name]) for name in metric_names if name in table.attributes]
+            if not columns:
+                continue
+            blocks = table.blocks
+            for company_id in (list(blocks) if company_ids is None else company_ids):
+                block = blocks.get(company_id)
+                if block is None:
+                    continue
+                keep = np.isin(block.periods, periods)
+                if first_year is not None:
+                    keep &= block.fiscal_years >= str(first_year)
+                if last_year is not None:
+                    keep &= block.fiscal_years <= str(last_year)
+                statements = np.flatnonzero(keep)
+                if not len(statements):
+                    continue
+                for name, column in columns:
+                    if column >= block.values.shape[1]:
+                        continue
+                    selected = statements
+                    values = block.values[selected, column]
+                    if column >= table.core_width:
+                        # EAV 属性只在有值的报表上存在
+                        present = ~np.isnan(values)
+                        selected, values = selected[present], values[present]
+                    if limit is not None:
+                        selected, values = selected[-limit:], values[-limit:]
+                    rows.extend(zip(
+                        repeat(source), repeat(company_id), repeat(name),
+                        block.fiscal_years[selected].tolist(), block.periods[selected].tolist(),
+                        [None if math.isnan(value) else value for value in values.tolist()],
+                    ))
+        return rows
+
+
+statement_store = StatementStore(SessionLocal, max_bytes=config.statement_store.max_megabytes * 2**20)
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.base import now_cst
+from models.statement_version import StatementVersion
+from schemas.financial import FinancialStatementType
+from .base import BaseRepository
+
+
+class StatementVersionRepository(BaseRepository[StatementVersion]):
+    def __init__(self):
+        super().__init__(StatementVersion)
+
+    def bump(self, db: Session, company_id: int, statement_type: FinancialStatementType) -> int:
+        """
+        Increments the write version of a company's statement type inside the caller's
+        transaction, creating the row on its first write. Returns the new version. Does NOT commit.
+        """
+        key = (self.model.company_id == company_id, self.model.statement_type == statement_type.value)
+        values = {"version": self.model.version + 1, "updated_at": now_cst()}
+        if db.execute(update(self.model).where(*key).values(values)).rowcount == 0:
+            try:
+                # 首次写入：在保存点中插入，并发插入同一行时退回 UPDATE
+                with db.begin_nested():
+                    db.add(self.model(company_id=company_id, statement_type=statement_type.value,
+                                      version=1, materialized_version=0, updated_at=now_cst()))
+            except IntegrityError:
+                db.execute(update(self.model).where(*key).values(values))
+        return db.execute(select(self.model.version).where(*key)).scalar_one()
+
+    def changed_since(self, db: Session, since: datetime) -> List[Tuple[int, FinancialStatementType, int]]:
+        """The (company_id, statement_type, version) of every row written at or after `since`."""
+        rows = db.execute(
+            select(self.model.company_id, self.model.statement_type, self.model.version)
+            .where(self.model.updated_at >= since)
+        ).all()
+        return [(row.company_id, FinancialStatementType(row.statement_type), row.version) for row in rows]
+
+    def company_versions(self, db: Session, company_id: int) -> Dict[FinancialStatementType, int]:
+        """The current write version of each statement type of a company (absent when never written)."""
+        rows = db.execute(
+            select(self.model.statement_type, self.model.version).where(self.model.company_id == company_id)
+        ).all()
+        return {FinancialStatementType(row.statement_type): row.version for row in rows}
+
+    def is_materialized(self, db: Session, company_id: int) -> bool:
+        """Whether the materialized series of a company were computed from its latest writes."""
+        behind = db.execute(
+            select(self.model.company_id)
+            .where(self.model.company_id == company_id, self.model.materialized_version < self.model.version)
+            .limit(1)
+        ).first()
+        return behind is None
+
+    def mark_materialized(self, db: Session, company_id: int, versions: Dict[FinancialStatementType, int]) -> None:
+        """Records the versions the company's series were computed from (never moves backwards). Does NOT commit."""
+        for statement_type, version in versions.items():
+            db.execute(
+                update(self.model)
+                .where(self.model.company_id == company_id, self.model.statement_type == statement_type.value,
+                       self.model.materialized_version < version)
+                .values(materialized_version=version)
+            )
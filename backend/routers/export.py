@@ -0,0 +1,75 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from models.company import IndustryCategoryEnum
+from repositories.company_repo import CompanyRepository
+from schemas.export import ExportFormat
+from schemas.financial import FinancialStatementType, Granularity
+from services.export_service import Export, ExportError, export_metrics, export_statements
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+def _resolve_company_ids(
+    db: Session,
+    company_ids: Optional[List[int]],
+    industry_category: Optional[IndustryCategoryEnum],
+) -> Optional[List[int]]:
+    """The companies to export; None means every company."""
+    if not company_ids and industry_category is None:
+        return None
+    companies = CompanyRepository().get_multi_by_ids_or_industry(db, ids=company_ids or None, industry_category=industry_category)
+    return [company.id for company in companies]
+
+
+def _streaming_response(export: Export, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        export.body,
+        media_type=export.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/statements")
+def export_financial_statements(
+    statement_types: List[FinancialStatementType] = Query(list(FinancialStatementType), description="要导出的报表类型（可重复）"),
+    company_ids: List[int] = Query(None, description="公司ID（可重复）；不传且不传行业时导出全部公司"),
+    industry_category: Optional[IndustryCategoryEnum] = Query(None, description="导出该行业的全部公司"),
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv 或 parquet"),
+    chunk_size: int = Query(1000, ge=100, le=20000, description="每批从游标读取的报表数"),
+    db: Session = Depends(get_db),
+):
+    """
+    Export statements as CSV or Parquet, one row per statement with the EAV attributes
+    pivoted into columns. Rows are streamed from server-side cursors in chunks, so the
+    whole universe exports in constant memory.
+    """
+    try:
+        export = export_statements(db, statement_types, _resolve_company_ids(db, company_ids, industry_category), format, chunk_size)
+    except ExportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _streaming_response(export, f"statements.{format.value}")
+
+
+@router.get("/metrics")
+def export_financial_metrics(
+    metric_names: List[str] = Query(..., description="要导出的指标名（可重复）"),
+    company_ids: List[int] = Query(None, description="公司ID（可重复）；不传且不传行业时导出全部公司"),
+    industry_category: Optional[IndustryCategoryEnum] = Query(None, description="导出该行业的全部公司"),
+    granularity: Granularity = Query(Granularity.ANNUAL, description="annual（年报）、quarterly（单季）或 ttm（滚动四季）"),
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv 或 parquet"),
+    db: Session = Depends(get_db),
+):
+    """
+    Export metric series as CSV or Parquet, one row per (company, period) with a column per
+    metric. Companies are computed and streamed in chunks.
+    """
+    try:
+        export = export_metrics(db, metric_names, _resolve_company_ids(db, company_ids, industry_category), format, granularity)
+    except ExportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _streaming_response(export, f"metrics.{format.value}")
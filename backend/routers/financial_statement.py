@@ -1,38 +1,61 @@
-import json
-from typing import List
+from typing import List, Literal, Optional, Union
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from core.database import get_db
 from repositories import CompanyRepository, get_company_repo
 from repositories.financial_repo import get_statement_dependencies
-from schemas.chart import ChartData
-from schemas.financial import FinancialSheetUpsert, StatementUploadForm, FinancialStatementType
+from models.company import IndustryCategoryEnum
+from schemas.chart import ChartData, ChartCacheStats, MetricChartBatch, MetricComparison
+from schemas.financial import FinancialSheetUpsert, StatementUploadForm, FinancialStatementType, StatementUpsertSummary, FinancialMetricInfo, Granularity, SeriesWindow
+from schemas.pagination import Page
 from schemas.response import ApiResponse
+from schemas.screener import ScreenerMatch
+from services.chart_cache import chart_cache
 from services.financial_service import FinancialMetricService
+from services.screener_service import MetricScreenerService
+from services.statement_sync_service import sync_statement
 from services.metrics import get_metric_names
+from services.metrics.formula import FormulaError
+from utils.json_stream import iter_json_records
 
 router = APIRouter(prefix="/financial-statements", tags=["Financial Statements"])
 
 
-@router.get("/financial-metric-list", response_model=ApiResponse[List[str]])
+@router.get("/financial-metric-list", response_model=ApiResponse[Union[List[str], List[FinancialMetricInfo]]])
 def list_financial_metric(
-
+    detail: bool = Query(False, description="返回指标依赖及其存储位置，而不仅是指标名"),
+    db: Session = Depends(get_db),
 ):
-    return ApiResponse.success(data=get_metric_names())
+    if not detail:
+        return ApiResponse.success(data=get_metric_names())
+    return ApiResponse.success(data=FinancialMetricService(db).list_metric_details())
 
 @router.get("/financial-metric", response_model=ApiResponse[ChartData])
 def get_financial_metric(
     company_id: int = Query(..., description="The ID of the company"),
     metric_name: str = Query(..., description="The name of the financial metric (e.g., 'total_revenue')"),
+    granularity: Granularity = Query(Granularity.ANNUAL, description="annual（年报）、quarterly（单季）或 ttm（滚动四季）"),
+    start_year: Optional[int] = Query(None, ge=1900, le=9999, description="只返回该财年及之后的数据"),
+    end_year: Optional[int] = Query(None, ge=1900, le=9999, description="只返回该财年及之前的数据"),
+    last_n: Optional[int] = Query(None, ge=1, description="只返回最近 N 期"),
     service: FinancialMetricService = Depends(FinancialMetricService),
 ):
     """
     Get financial metric data for a company, formatted for charting.
+    `start_year`, `end_year` and `last_n` limit the periods read from the database.
     """
+    if start_year is not None and end_year is not None and start_year > end_year:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_year must not be greater than end_year."
+        )
     try:
-        chart_data = service.get_metric_chart_data(company_id, metric_name)
+        window = SeriesWindow(start_year, end_year, last_n)
+        chart_data = service.get_metric_chart_data(company_id, metric_name, granularity, window)
         return ApiResponse.success(data=chart_data)
     except ValueError as e:
         # 配置未找到
@@ -55,7 +78,88 @@ def get_financial_metric(
         )
 
 
-@router.post("/upload", response_model=ApiResponse)
+@router.get("/financial-metrics", response_model=ApiResponse[MetricChartBatch])
+def get_financial_metrics(
+    company_id: int = Query(..., description="The ID of the company"),
+    metric_names: List[str] = Query(None, description="Metric names to chart; all registered metrics when omitted"),
+    granularity: Granularity = Query(Granularity.ANNUAL, description="annual（年报）、quarterly（单季）或 ttm（滚动四季）"),
+    service: FinancialMetricService = Depends(FinancialMetricService),
+):
+    """
+    Get several financial metric charts of a company in one response.
+    Shared dependencies are fetched once; metrics that cannot be built are listed in `errors`.
+    """
+    return ApiResponse.success(data=service.get_metrics_chart_data(company_id, metric_names, granularity))
+
+
+@router.get("/financial-metric-comparison", response_model=ApiResponse[MetricComparison])
+def compare_financial_metric(
+    metric_name: str = Query(..., description="The name of the financial metric to compare"),
+    company_ids: List[int] = Query(None, description="Company IDs to compare (repeatable)"),
+    industry_category: Optional[IndustryCategoryEnum] = Query(None, description="Compare every company of this industry"),
+    view: Literal["chart", "matrix"] = Query("chart", description="多序列图表或按年份对齐的矩阵"),
+    granularity: Granularity = Query(Granularity.ANNUAL, description="annual（年报）、quarterly（单季）或 ttm（滚动四季）"),
+    service: FinancialMetricService = Depends(FinancialMetricService),
+):
+    """
+    Compare one metric across many companies in a single request.
+    All companies' dependencies are fetched in one query and computed together.
+    """
+    if not company_ids and industry_category is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either company_ids or industry_category is required."
+        )
+    try:
+        return ApiResponse.success(data=service.get_metric_comparison(metric_name, company_ids, industry_category, view, granularity))
+    except (ValueError, LookupError) as e:
+        # 配置或数据未找到
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
+@router.get("/financial-metric-screener", response_model=ApiResponse[Page[ScreenerMatch]])
+def screen_financial_metrics(
+    where: str = Query(..., description="筛选条件，如 all_last(free_cash_flow_to_net_income_ratio > 1, 3) and asset_liability_ratio < 0.5"),
+    sort_by: Optional[str] = Query(None, description="排序表达式（指标名或公式），取各公司最近一期的值"),
+    order: Literal["asc", "desc"] = Query("desc", description="排序方向"),
+    industry_category: Optional[IndustryCategoryEnum] = Query(None, description="只筛选该行业的公司"),
+    granularity: Granularity = Query(Granularity.ANNUAL, description="annual（年报）、quarterly（单季）或 ttm（滚动四季）"),
+    page: int = Query(1, ge=1, description="页码（从 1 开始）"),
+    limit: int = Query(50, ge=1, le=500, description="每页条数"),
+    service: MetricScreenerService = Depends(MetricScreenerService),
+):
+    """
+    Screen every company with a predicate over registered metrics.
+
+    Comparisons (`>`, `<`, `==` ...) hold formula expressions on both sides and combine with
+    `and` / `or` / `not`; `all_last(condition, n)` and `any_last(condition, n)` require the
+    condition in every / any of the last n periods. Conditions without a window apply to each
+    company's latest period. Matches are ranked by `sort_by` and paginated.
+    """
+    try:
+        return ApiResponse.success(data=service.screen(
+            where, sort_by=sort_by, descending=order == "desc", industry_category=industry_category,
+            granularity=granularity, page=page, limit=limit,
+        ))
+    except FormulaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/chart-cache/stats", response_model=ApiResponse[ChartCacheStats])
+def get_chart_cache_stats():
+    """
+    图表缓存的命中 / 未命中 / 淘汰计数。
+    """
+    return ApiResponse.success(data=ChartCacheStats(**chart_cache.stats()))
+
+
+@router.post("/upload", response_model=ApiResponse[StatementUpsertSummary])
 async def upload_and_upsert_financial_statement(
     db: Session = Depends(get_db),
     company_repo: CompanyRepository = Depends(get_company_repo),
@@ -64,40 +168,71 @@ async def upload_and_upsert_financial_statement(
 ):
     """
     通过上传JSON文件来更新或插入（upsert）财务报表数据。
-    """
-    # 1. 校验公司是否存在
-    company = company_repo.get(db, id=form_data.company_id)
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Company with id {form_data.company_id} not found."
-        )
 
-    # 2. 校验文件类型
+    文件以流式方式增量解析，按 `batch_size` 分批校验、upsert 并提交；
+    数据库操作在线程池中执行，不阻塞事件循环。
+    """
+    # 1. 校验文件类型
     if not file.filename.endswith('.json'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid file type. Please upload a .json file."
         )
 
+    # 2. 校验公司是否存在
+    company = await run_in_threadpool(company_repo.get, db, id=form_data.company_id)
+    if not company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with id {form_data.company_id} not found."
+        )
+
     # 3. 获取报表类型对应的 repo
     try:
         _, repo = get_statement_dependencies(form_data.type)
     except HTTPException as e:
         raise e
 
-    # 4. 读取并解析JSON文件
-    contents = await file.read()
+    # 4. 流式解析并分批 upsert（每批提交一次）
+    summary = StatementUpsertSummary()
     try:
-        data = json.loads(contents)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON format in the uploaded file.")
-
-    # 5. 执行 upsert 操作
-    new_financial_data = repo.upsert_from_json(db=db, company_id=form_data.company_id, data=data)
-    return ApiResponse.success(data=new_financial_data)
+        await run_in_threadpool(
+            repo.stream_upsert_from_json,
+            db,
+            records=iter_json_records(file.file),
+            company_id=form_data.company_id,
+            batch_size=form_data.batch_size,
+            summary=summary,
+        )
+    except ValueError as e:
+        # JSON 格式错误或记录校验失败；此前的批次已提交
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid data in the uploaded file after {summary.statements} committed records: {e}"
+        )
+    except HTTPException as e:
+        # 记录缺少 symbol / fiscal_year / period 等；回滚当前批次并报告已提交的记录数
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Upload stopped after {summary.statements} committed records: {e.detail}"
+        )
+    except IntegrityError as e:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload stopped after {summary.statements} committed records: conflicting data ({e.orig})"
+        )
+    except SQLAlchemyError as e:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Upload stopped after {summary.statements} committed records: database error ({type(e).__name__})"
+        )
+    return ApiResponse.success(data=summary)
 
-@router.post("/", response_model=ApiResponse)
+@router.post("/", response_model=ApiResponse[StatementUpsertSummary])
 def upsert_financial_statement(
     financial_statement_in: FinancialSheetUpsert,
     db: Session = Depends(get_db),
@@ -105,6 +240,8 @@ def upsert_financial_statement(
 ):
     """
     Fetches financial data from an external API and upserts it into the database.
+    `mode` selects the latest period only, the full history, or an incremental sync
+    that only writes periods newer than (or amended since) what is already stored.
     """
     company = company_repo.get(db, id=financial_statement_in.company_id)
     if not company or not company.ticker:
@@ -113,21 +250,19 @@ def upsert_financial_statement(
             detail=f"Company with id {financial_statement_in.company_id} not found or has no ticker symbol."
         )
 
-    # 2. 获取报表类型对应的 loader 和 repo
-    try:
-        loader, repo = get_statement_dependencies(financial_statement_in.type)
-    except HTTPException as e:
-        raise e
-
-
-    data = loader.load(company.ticker)
-    if not data:
+    # 2. 按同步模式拉取（最新一期 / 全部历史 / 增量）并批量 upsert
+    summary = sync_statement(
+        db,
+        company_id=financial_statement_in.company_id,
+        ticker=company.ticker,
+        statement_type=financial_statement_in.type,
+        mode=financial_statement_in.mode,
+        period=financial_statement_in.period,
+    )
+    if summary is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Could not fetch financial data for symbol '{company.ticker}'. "
                    f"The symbol might be invalid or the API is unavailable."
         )
-
-    # 4. 执行 upsert 操作
-    new_financial_data = repo.upsert_from_json(db=db, company_id=financial_statement_in.company_id, data=data)
-    return ApiResponse.success(data=new_financial_data)
+    return ApiResponse.success(data=summary)
@@ -0,0 +1,68 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from models.ingest_job import IngestJobStatus
+from modules.workers import ingest_pool
+from repositories import CompanyRepository, get_company_repo
+from repositories.ingest_job_repo import IngestJobRepository, get_ingest_job_repo
+from schemas.financial import SyncMode
+from schemas.ingest_job import IngestJobCreate, IngestJobInDB
+from schemas.response import ApiResponse
+
+router = APIRouter(prefix="/ingest-jobs", tags=["Ingest Jobs"])
+
+
+@router.post("/", response_model=ApiResponse[List[IngestJobInDB]])
+def enqueue_ingest_jobs(
+    job_in: IngestJobCreate,
+    db: Session = Depends(get_db),
+    company_repo: CompanyRepository = Depends(get_company_repo),
+    job_repo: IngestJobRepository = Depends(get_ingest_job_repo),
+):
+    """
+    为每个 (公司, 报表类型) 创建一个后台导入任务并立即返回，任务由后台线程池执行。
+    latest 模式下多个任务作为一批，经共享的异步连接池并发拉取。
+    """
+    targets = []
+    for company_id in dict.fromkeys(job_in.company_ids):
+        company = company_repo.get(db, id=company_id)
+        if not company or not company.ticker:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Company with id {company_id} not found or has no ticker symbol."
+            )
+        targets.extend((company.id, company.ticker, t.value) for t in dict.fromkeys(job_in.types))
+
+    jobs = job_repo.create_jobs(db, targets=targets, mode=job_in.mode.value, period=job_in.period.value)
+    if job_in.mode == SyncMode.LATEST and len(jobs) > 1:
+        ingest_pool.submit_batch(job.id for job in jobs)
+    else:
+        ingest_pool.submit(job.id for job in jobs)
+    return ApiResponse.success(data=[IngestJobInDB.model_validate(job) for job in jobs])
+
+
+@router.get("/{job_id}", response_model=ApiResponse[IngestJobInDB])
+def get_ingest_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    job_repo: IngestJobRepository = Depends(get_ingest_job_repo),
+):
+    job = job_repo.get(db, id=job_id)
+    if not job:
+        return ApiResponse.error(msg="Ingest job not found", status=404)
+    return ApiResponse.success(data=IngestJobInDB.model_validate(job))
+
+
+@router.get("/", response_model=ApiResponse[List[IngestJobInDB]])
+def list_ingest_jobs(
+    status_filter: Optional[IngestJobStatus] = Query(None, alias="status", description="按任务状态过滤"),
+    skip: int = 1,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    job_repo: IngestJobRepository = Depends(get_ingest_job_repo),
+):
+    jobs = job_repo.list_jobs(db, status=status_filter, skip=(skip - 1) * limit, limit=limit)
+    return ApiResponse.success(data=[IngestJobInDB.model_validate(job) for job in jobs])
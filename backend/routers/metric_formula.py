@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from schemas.metric_formula import MetricFormulaCreate, MetricFormulaInDB
+from schemas.response import ApiResponse
+from services.metric_formula_service import MetricFormulaService
+from services.metrics.formula import FormulaError
+
+router = APIRouter(prefix="/metric-formulas", tags=["Metric Formulas"])
+
+
+@router.get("/", response_model=ApiResponse[List[MetricFormulaInDB]])
+def list_metric_formulas(service: MetricFormulaService = Depends(MetricFormulaService)):
+    """
+    已注册的公式指标（配置文件与数据库中的定义）。
+    """
+    return ApiResponse.success(data=service.list_formulas())
+
+
+@router.post("/", response_model=ApiResponse[MetricFormulaInDB])
+def save_metric_formula(
+    formula_in: MetricFormulaCreate,
+    service: MetricFormulaService = Depends(MetricFormulaService),
+):
+    """
+    新增或更新一个公式指标，例如 `free_cash_flow / net_income`。
+    公式在保存前完成解析、引用校验与循环依赖检查，保存后立即可用于图表与对比接口，无需重启。
+    """
+    try:
+        return ApiResponse.success(data=service.save_formula(formula_in))
+    except FormulaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.delete("/{name}", response_model=ApiResponse[bool])
+def delete_metric_formula(name: str, service: MetricFormulaService = Depends(MetricFormulaService)):
+    try:
+        deleted = service.delete_formula(name)
+    except FormulaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Metric formula '{name}' not found."
+        )
+    return ApiResponse.success(data=True)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from modules.data_loader.resilience import get_fmp_guard
+from schemas.response import ApiResponse
+from schemas.vendor import VendorClientStats
+
+router = APIRouter(prefix="/vendors", tags=["Vendors"])
+
+
+@router.get("/fmp/stats", response_model=ApiResponse[VendorClientStats])
+def get_fmp_client_stats():
+    """
+    FMP 客户端的限流、重试与熔断计数。
+    """
+    return ApiResponse.success(data=VendorClientStats(**get_fmp_guard().stats()))
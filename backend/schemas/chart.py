@@ -25,7 +25,7 @@ class ChartAxis(BaseModel):
 class ChartSeries(BaseModel):
     name: str
     type: str
-    data: List[Union[float, int]]
+    data: List[Optional[Union[float, int]]]
     y_axis_index: Optional[int] = Field(None, alias="yAxisIndex")
     smooth: Optional[bool] = None
     bar_width: Optional[str] = Field('40%', alias="barWidth")
@@ -36,4 +36,39 @@ class ChartData(BaseModel):
     legend: ChartLegend = Field(default_factory=ChartLegend)
     x_axis: List[ChartAxis] = Field([], alias="xAxis")
     y_axis: List[ChartAxis] = Field([], alias="yAxis")
-    series: List[ChartSeries] = []
\ No newline at end of file
+    series: List[ChartSeries] = []
+
+
+class MetricChartBatch(BaseModel):
+    """批量指标图表：成功的图表与失败原因分开返回"""
+    charts: Dict[str, ChartData] = {}
+    errors: Dict[str, str] = {}
+
+
+class MetricComparisonRow(BaseModel):
+    """对比矩阵中的一行：某公司按年份对齐的指标值与增长率（缺失年份为 null）"""
+    company_id: int
+    name: str
+    ticker: Optional[str] = None
+    values: List[Optional[float]]
+    growth_rates: List[Optional[float]]
+
+
+class MetricComparison(BaseModel):
+    """多公司同一指标对比，按 view 返回多序列图表或矩阵"""
+    metric_name: str
+    years: List[str] = []
+    rows: List[MetricComparisonRow] = []
+    chart: Optional[ChartData] = None
+    missing: List[int] = Field([], description="没有该指标数据（或不存在）的公司ID")
+
+
+class ChartCacheStats(BaseModel):
+    """图表缓存计数"""
+    hits: int
+    misses: int
+    evictions: int = Field(..., description="容量超限被 LRU 淘汰的条目数")
+    expirations: int = Field(..., description="TTL 过期的条目数")
+    invalidations: int = Field(..., description="因报表写入而失效的条目数")
+    size: int
+    max_entries: int
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ExportFormat(str, Enum):
+    """File format of a bulk export."""
+    CSV = "csv"
+    PARQUET = "parquet"  # 需要安装 pyarrow
@@ -1,8 +1,8 @@
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, NamedTuple
 
 from fastapi import Form
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 
 
 class FinancialStatementType(str, Enum):
@@ -12,6 +12,52 @@ class FinancialStatementType(str, Enum):
     INCOME = "income"
 
 
+class SyncMode(str, Enum):
+    """How much history a statement sync pulls from the vendor."""
+    LATEST = "latest"            # 只拉取最新一期
+    FULL = "full"                # 拉取接口返回的全部历史
+    INCREMENTAL = "incremental"  # 以已入库的最新报表为水位，只写入新增或修订的报表
+
+
+class ReportPeriod(str, Enum):
+    ANNUAL = "annual"
+    QUARTER = "quarter"
+
+
+class Granularity(str, Enum):
+    """Time granularity of the metric series read from the statement tables."""
+    ANNUAL = "annual"        # 年报（period = FY）
+    QUARTERLY = "quarterly"  # 单季报（period = Q1–Q4）
+    TTM = "ttm"              # 滚动四季合计；资产负债表取季末值
+
+
+class SeriesWindow(NamedTuple):
+    """
+    Time window of a metric series: the periods of fiscal years `start_year`–`end_year`
+    (both inclusive, open when None), then only the last `last_n` of them.
+    """
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    last_n: Optional[int] = None
+
+    @property
+    def bounded(self) -> bool:
+        return any(bound is not None for bound in self)
+
+    def slice(self, labels: List[str]) -> slice:
+        """The positions of the sorted period labels (`2024`, `2024Q3`) falling in the window."""
+        start, stop = 0, len(labels)
+        if self.start_year is not None:
+            while start < stop and int(labels[start][:4]) < self.start_year:
+                start += 1
+        if self.end_year is not None:
+            while stop > start and int(labels[stop - 1][:4]) > self.end_year:
+                stop -= 1
+        if self.last_n is not None:
+            start = max(start, stop - self.last_n)
+        return slice(start, stop)
+
+
 class FinancialBase(BaseModel):
     company_id: Optional[int] = None
 
@@ -19,6 +65,8 @@ class FinancialBase(BaseModel):
 class FinancialSheetUpsert(FinancialBase):
     type: FinancialStatementType
     fiscalYear: Optional[str] = None
+    mode: SyncMode = SyncMode.LATEST
+    period: ReportPeriod = ReportPeriod.ANNUAL
 
 
 class StatementUploadForm:
@@ -27,6 +75,56 @@ class StatementUploadForm:
         self,
         company_id: int = Form(...),
         type: FinancialStatementType = Form(...),
+        batch_size: int = Form(500, ge=1, le=5000, description="每批 upsert 并提交的记录数"),
     ):
         self.company_id = company_id
-        self.type = type
\ No newline at end of file
+        self.type = type
+        self.batch_size = batch_size
+
+class StatementUpsertSummary(BaseModel):
+    """Lightweight result of a bulk statement upsert (no ORM objects are refreshed)."""
+    statements: int = 0
+    # 核心表
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # EAV 表
+    eav_inserted: int = 0
+    eav_updated: int = 0
+    eav_deleted: int = 0
+    eav_skipped: int = 0
+
+    def merge(self, other: "StatementUpsertSummary") -> "StatementUpsertSummary":
+        """Accumulates the counters of another summary (e.g. of the next chunk) into this one."""
+        for name in type(self).model_fields:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    @computed_field
+    @property
+    def rows_touched(self) -> int:
+        """Core and EAV rows actually written or deleted."""
+        return self.inserted + self.updated + self.eav_inserted + self.eav_updated + self.eav_deleted
+
+    @computed_field
+    @property
+    def rows_skipped(self) -> int:
+        """Core and EAV rows left untouched because their values did not change."""
+        return self.unchanged + self.eav_skipped
+
+
+class MetricLocationInfo(BaseModel):
+    """指标的存储位置：核心表列（column）或 EAV 属性（attribute）"""
+    statement_type: FinancialStatementType
+    column: Optional[str] = None
+    attribute: Optional[str] = None
+
+
+class FinancialMetricInfo(BaseModel):
+    """financial-metric-list?detail=true 返回的指标详情"""
+    name: str
+    dependencies: List[str]
+    # 所有依赖都能在报表数据中找到
+    available: bool
+    # 依赖 → 可能的存储位置（按查找优先级）
+    locations: Dict[str, List[MetricLocationInfo]]
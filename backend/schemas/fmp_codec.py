@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Type
+
+from pydantic import BaseModel
+
+from utils.case_converter import to_snake_case
+
+
+class FMPStatementCodec:
+    """
+    Precompiled decoder for one FMP statement schema.
+
+    The core/EAV field split is computed once per schema and camelCase → snake_case key
+    translations are cached, so decoding a record is a single pass over its keys followed
+    by one validation of the core fields only.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        # 核心字段（与核心表列一一对应），顺序即 decode 返回的元组顺序
+        self.core_columns: Tuple[str, ...] = tuple(schema.model_fields.keys())
+        self._core_column_set = frozenset(self.core_columns)
+        self._key_cache: Dict[str, str] = {}
+
+    def snake_key(self, key: str) -> str:
+        """Returns the cached snake_case form of an FMP key."""
+        name = self._key_cache.get(key)
+        if name is None:
+            name = self._key_cache[key] = to_snake_case(key)
+        return name
+
+    def peek(self, record: Dict[str, Any], *names: str) -> Tuple[Any, ...]:
+        """Returns the raw values of the given snake_case fields without validating the record."""
+        found = {self.snake_key(key): value for key, value in record.items()}
+        return tuple(found.get(name) for name in names)
+
+    def decode(self, record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Tuple[str, Any]]]:
+        """
+        Splits a raw FMP record into the validated core column values and the list of
+        (attribute_name, value) EAV pairs. Only the core fields present in the record are
+        returned (ordered as `core_columns`), so an upsert never overwrites the others.
+        """
+        key_cache = self._key_cache
+        core_column_set = self._core_column_set
+        core: Dict[str, Any] = {}
+        eav: List[Tuple[str, Any]] = []
+        for key, value in record.items():
+            name = key_cache.get(key)
+            if name is None:
+                name = self.snake_key(key)
+            if name in core_column_set:
+                core[name] = value
+            else:
+                eav.append((name, value))
+
+        validated = self.schema.model_validate(core)
+        # 仅保留记录中出现的字段（等价于 model_dump(exclude_unset=True)）
+        fields_set, values = validated.model_fields_set, validated.__dict__
+        return {column: values[column] for column in self.core_columns if column in fields_set}, eav
+
+
+@lru_cache(maxsize=None)
+def get_codec(schema: Type[BaseModel]) -> FMPStatementCodec:
+    """Returns the shared codec of an FMP schema, compiling it on first use."""
+    return FMPStatementCodec(schema)
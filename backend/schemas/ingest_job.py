@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from models.ingest_job import IngestJobStatus
+from schemas.financial import FinancialStatementType, SyncMode, ReportPeriod
+
+
+class IngestJobCreate(BaseModel):
+    """批量创建导入任务：每个 (公司, 报表类型) 组合生成一个任务"""
+    company_ids: List[int] = Field(..., min_length=1)
+    types: List[FinancialStatementType] = Field(
+        default_factory=lambda: list(FinancialStatementType), min_length=1
+    )
+    mode: SyncMode = SyncMode.INCREMENTAL
+    period: ReportPeriod = ReportPeriod.ANNUAL
+
+
+class IngestJobInDB(BaseModel):
+    id: int
+    company_id: int
+    ticker: str
+    statement_type: FinancialStatementType
+    mode: SyncMode
+    period: ReportPeriod
+    status: IngestJobStatus
+    progress: int
+    message: Optional[str] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        from_attributes=True  # 允许从 ORM 模型直接转换
+    )
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+MetricUnit = Literal["one", "thousand", "ten_thousand", "million", "hundred_million", "billion"]
+
+
+class MetricFormulaCreate(BaseModel):
+    """新增或更新一个公式指标"""
+    name: str = Field(..., pattern=r"^[a-z][a-z0-9_]*$", max_length=100, description="指标名")
+    formula: str = Field(..., min_length=1, description="例如 `free_cash_flow / net_income` 或 `pct_change(net_income) * 100`")
+    title: Optional[str] = Field(None, max_length=100, description="图表标题，默认使用指标名")
+    unit: Optional[MetricUnit] = Field(None, description="图表展示单位")
+
+
+class MetricFormulaInDB(MetricFormulaCreate):
+    id: Optional[int] = None
+    source: Literal["config", "database"] = "database"
+    dependencies: List[str] = []
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        from_attributes=True  # 允许从 ORM 模型直接转换
+    )
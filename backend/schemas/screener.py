@@ -0,0 +1,13 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ScreenerMatch(BaseModel):
+    """筛选命中的公司：其最近一期的期间标签，以及条件与排序所用指标在该期的值（图表单位）"""
+    company_id: int
+    name: str
+    ticker: Optional[str] = None
+    period: str
+    values: Dict[str, Optional[float]]
+    score: Optional[float] = Field(None, description="排序表达式在最近一期的值")
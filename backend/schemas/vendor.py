@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+
+
+class VendorClientStats(BaseModel):
+    """外部数据供应商客户端的运行计数"""
+    requests: int = Field(..., description="发出的请求数（含重试）")
+    retries: int = Field(..., description="重试次数")
+    throttled: int = Field(..., description="收到 429 限流响应的次数")
+    failures: int = Field(..., description="5xx 或网络错误次数")
+    short_circuited: int = Field(..., description="熔断期间被直接拒绝的请求数")
+    circuit_state: str = Field(..., description="熔断器状态：closed / open / half_open")
+    circuit_opens: int = Field(..., description="熔断器打开的次数")
+    circuit_open_seconds: float = Field(..., description="熔断器累计打开时长（秒）")
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Set, Tuple
+
+from core.config import config
+from repositories.events import statement_events, StatementsChanged
+from schemas.chart import ChartData
+from schemas.financial import FinancialStatementType, Granularity, SeriesWindow
+
+# (company_id, metric_name, granularity, window)
+CacheKey = Tuple[int, str, Granularity, SeriesWindow]
+
+
+class _Entry(NamedTuple):
+    chart: ChartData
+    expires_at: float
+    statement_types: FrozenSet[FinancialStatementType]
+
+
+class ChartCache:
+    """
+    Bounded LRU/TTL cache of computed ChartData keyed by (company_id, metric_name, granularity, window).
+
+    Each entry remembers the statement types its metric reads from, so a write to one
+    statement type of a company evicts only that company's charts depending on it.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        # company_id → 该公司已缓存的 key，失效时无需扫描整个缓存
+        self._by_company: Dict[int, Set[CacheKey]] = {}
+        # 每次失效递增；计算期间发生写入的图表不会被写回缓存
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(
+        self,
+        company_id: int,
+        metric_name: str,
+        granularity: Granularity = Granularity.ANNUAL,
+        window: SeriesWindow = SeriesWindow(),
+    ) -> Optional[ChartData]:
+        if not self.enabled:
+            return None
+        key = (company_id, metric_name, granularity, window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry.chart
+
+    def generation(self, company_id: int) -> int:
+        """Read before computing a chart and pass to `put`, so a chart raced by a write is dropped."""
+        with self._lock:
+            return self._generations.get(company_id, 0)
+
+    def put(
+        self,
+        company_id: int,
+        metric_name: str,
+        chart: ChartData,
+        statement_types: Iterable[FinancialStatementType],
+        generation: Optional[int] = None,
+        granularity: Granularity = Granularity.ANNUAL,
+        window: SeriesWindow = SeriesWindow(),
+    ) -> None:
+        if not self.enabled:
+            return
+        key = (company_id, metric_name, granularity, window)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(company_id, 0):
+                return
+            self._entries[key] = _Entry(chart, time.monotonic() + self.ttl_seconds, frozenset(statement_types))
+            self._entries.move_to_end(key)
+            self._by_company.setdefault(company_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, company_id: int, statement_type: Optional[FinancialStatementType] = None) -> int:
+        """Evicts the company's charts that read `statement_type` (all of them when None)."""
+        with self._lock:
+            self._generations[company_id] = self._generations.get(company_id, 0) + 1
+            keys = [
+                key for key in self._by_company.get(company_id, ())
+                if statement_type is None or statement_type in self._entries[key].statement_types
+            ]
+            for key in keys:
+                self._remove(key)
+            self._counters["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_company.clear()
+            self._generations.clear()
+
+    def on_statements_changed(self, event: StatementsChanged) -> None:
+        self.invalidate(event.company_id, event.statement_type)
+
+    def _remove(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+        company_keys = self._by_company.get(key[0])
+        if company_keys is not None:
+            company_keys.discard(key)
+            if not company_keys:
+                del self._by_company[key[0]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "size": len(self._entries), "max_entries": self.max_entries}
+
+
+chart_cache = ChartCache(
+    max_entries=config.chart_cache.max_entries,
+    ttl_seconds=config.chart_cache.ttl_seconds,
+    enabled=config.chart_cache.enabled,
+)
+statement_events.subscribe(chart_cache.on_statements_changed)
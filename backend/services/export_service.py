@@ -0,0 +1,316 @@
+import csv
+import io
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import Engine, Float, Integer, Numeric, func, select
+from sqlalchemy.orm import Session
+
+from repositories.company_repo import CompanyRepository
+from repositories.financial_repo import FinancialStatementRepository, get_metric_repositories
+from repositories.metric_catalog import metric_catalog
+from schemas.export import ExportFormat
+from schemas.financial import FinancialStatementType, Granularity
+from services.financial_service import compute_metric_frame
+from services.metrics import METRIC_REGISTRY
+
+# 列类型：整数 / 浮点 / 字符串
+INTEGER, NUMBER, STRING = "integer", "number", "string"
+
+# 报表导出时排在最前的标识列；核心表中不导出的列
+_KEY_COLUMNS = ("symbol", "fiscal_year", "period", "date")
+_SKIPPED_CORE_COLUMNS = frozenset({"id", "company_id", "created_at", "updated_at"})
+
+# 一批列式数据：列名 → 该批各行的值
+Chunk = Dict[str, List[Any]]
+
+
+class ExportColumn(NamedTuple):
+    name: str
+    kind: str
+
+
+class ExportError(ValueError):
+    """Raised when an export request cannot be served (unknown metrics, missing pyarrow...)."""
+
+
+def _column_kind(column) -> str:
+    if isinstance(column.type, Integer):
+        return INTEGER
+    if isinstance(column.type, (Float, Numeric)):
+        return NUMBER
+    return STRING
+
+
+# ---------- 输出格式 ----------
+
+class _CsvWriter:
+    media_type = "text/csv"
+
+    def __init__(self, columns: List[ExportColumn]):
+        self.columns = columns
+
+    def _encode(self, rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def begin(self) -> bytes:
+        return self._encode([[column.name for column in self.columns]])
+
+    def write(self, chunk: Chunk) -> bytes:
+        return self._encode(zip(*(chunk[column.name] for column in self.columns)))
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object handing out the bytes written since the last `drain`."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class _ParquetWriter:
+    """Writes every chunk as one Parquet row group; the footer is emitted on close."""
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, columns: List[ExportColumn]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportError("Parquet export requires pyarrow (pip install pyarrow)") from None
+        types = {INTEGER: pa.int64(), NUMBER: pa.float64(), STRING: pa.string()}
+        self.pa = pa
+        self.schema = pa.schema([(column.name, types[column.kind]) for column in columns])
+        self.sink = _ChunkSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    def begin(self) -> bytes:
+        return self.sink.drain()
+
+    def write(self, chunk: Chunk) -> bytes:
+        self.writer.write_table(self.pa.Table.from_pydict(chunk, schema=self.schema))
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+_WRITERS = {ExportFormat.CSV: _CsvWriter, ExportFormat.PARQUET: _ParquetWriter}
+
+
+class Export(NamedTuple):
+    """A prepared export: the response media type and the generator of its bytes."""
+    media_type: str
+    body: Iterator[bytes]
+
+
+def _export(export_format: ExportFormat, columns: List[ExportColumn], chunks: Callable[[], Iterator[Chunk]]) -> Export:
+    # writer 在生成响应之前创建，缺少 pyarrow 等错误可以直接返回 4xx
+    writer = _WRITERS[export_format](columns)
+
+    def body() -> Iterator[bytes]:
+        yield writer.begin()
+        for chunk in chunks():
+            data = writer.write(chunk)
+            if data:
+                yield data
+        yield writer.close()
+
+    return Export(writer.media_type, body())
+
+
+# ---------- 报表导出 ----------
+
+def _eav_attribute_kinds(db: Session, repo: FinancialStatementRepository, company_ids: Optional[List[int]]) -> Dict[str, str]:
+    """EAV attribute name → column kind (number when any row holds a numeric value)."""
+    if repo.eav_model is None or not repo.eav_fk_name:
+        return {}
+    eav_model = repo.eav_model
+    query = select(eav_model.attribute_name, func.count(eav_model.value_numeric)).group_by(eav_model.attribute_name)
+    if company_ids is not None:
+        query = query.join(repo.model, repo.model.id == getattr(eav_model, repo.eav_fk_name)) \
+            .where(repo.model.company_id.in_(company_ids))
+    return {name: NUMBER if numeric else STRING for name, numeric in db.execute(query).all()}
+
+
+def _statement_chunks(
+    engine: Engine,
+    repo: FinancialStatementRepository,
+    columns: List[ExportColumn],
+    eav_kinds: Dict[str, str],
+    company_ids: Optional[List[int]],
+    chunk_size: int,
+) -> Iterator[Chunk]:
+    """
+    Streams the statements of one type as column chunks, EAV attributes pivoted into columns.
+
+    Core rows and EAV rows are read through two server-side cursors, both ordered by
+    (company_id, statement id), and merged chunk by chunk, so memory stays bounded by
+    `chunk_size` statements whatever the size of the export.
+    """
+    core_model = repo.model
+    names = [column.name for column in columns]
+    kinds = {column.name: column.kind for column in columns}
+    core_columns = [column for column in core_model.__table__.columns if column.name in names and column.name != "company_id"]
+    core_query = select(core_model.id, core_model.company_id, *core_columns).order_by(core_model.company_id, core_model.id)
+    if company_ids is not None:
+        core_query = core_query.where(core_model.company_id.in_(company_ids))
+
+    with engine.connect() as core_connection, engine.connect() as eav_connection:
+        core_result = core_connection.execution_options(stream_results=True, yield_per=chunk_size).execute(core_query)
+        eav_rows = iter(())
+        if eav_kinds:
+            eav_model = repo.eav_model
+            foreign_key = getattr(eav_model, repo.eav_fk_name)
+            eav_query = select(
+                core_model.company_id, foreign_key, eav_model.attribute_name, eav_model.value_numeric, eav_model.value_string,
+            ).join(core_model, core_model.id == foreign_key).order_by(core_model.company_id, foreign_key)
+            if company_ids is not None:
+                eav_query = eav_query.where(core_model.company_id.in_(company_ids))
+            eav_rows = iter(eav_connection.execution_options(stream_results=True, yield_per=chunk_size).execute(eav_query))
+        pending = next(eav_rows, None)
+
+        for rows in core_result.partitions(chunk_size):
+            # 1. 核心列（按列转置；Numeric 转 float，日期等转字符串）
+            chunk: Chunk = {name: [None] * len(rows) for name in names}
+            chunk["statement_type"] = [repo.statement_type.value] * len(rows)
+            statement_ids, chunk["company_id"], *core_values = map(list, zip(*rows))
+            for column, values in zip(core_columns, core_values):
+                kind = kinds[column.name]
+                if kind == NUMBER:
+                    values = [None if value is None else float(value) for value in values]
+                elif kind == STRING:
+                    values = [None if value is None else str(value) for value in values]
+                chunk[column.name] = values
+
+            # 2. 合并本批报表的 EAV 行（两个游标按同一顺序读取）
+            positions = {statement_id: i for i, statement_id in enumerate(statement_ids)}
+            last_key = (chunk["company_id"][-1], statement_ids[-1])
+            while pending is not None and (pending[0], pending[1]) <= last_key:
+                _, statement_id, name, value_numeric, value_string = pending
+                i = positions.get(statement_id)
+                kind = kinds.get(name) if name in eav_kinds else None
+                if i is not None and kind == NUMBER:
+                    chunk[name][i] = None if value_numeric is None else float(value_numeric)
+                elif i is not None and kind == STRING:
+                    chunk[name][i] = value_string
+                pending = next(eav_rows, None)
+            yield chunk
+
+
+def export_statements(
+    db: Session,
+    statement_types: List[FinancialStatementType],
+    company_ids: Optional[List[int]],
+    export_format: ExportFormat,
+    chunk_size: int = 1000,
+) -> Export:
+    """
+    Exports the statements of `statement_types` for `company_ids` (every company when None),
+    one row per statement with the core columns and every EAV attribute as a column.
+    Statement types are exported one after another; columns missing from a type are empty.
+    """
+    repos = [repo for repo in get_metric_repositories() if repo.statement_type in statement_types]
+    # 1. 标识列在前，其后依次为各报表核心列、EAV 属性列（按名称排序）
+    column_kinds = {"statement_type": STRING, "company_id": INTEGER}
+    for repo in repos:
+        table_columns = repo.model.__table__.columns
+        ordered = [table_columns[name] for name in _KEY_COLUMNS] + [c for c in table_columns if c.name not in _KEY_COLUMNS]
+        for column in ordered:
+            if column.name not in _SKIPPED_CORE_COLUMNS:
+                column_kinds.setdefault(column.name, _column_kind(column))
+
+    eav_kinds = {repo.statement_type: _eav_attribute_kinds(db, repo, company_ids) for repo in repos}
+    eav_columns: Dict[str, str] = {}
+    for kinds in eav_kinds.values():
+        for name, kind in kinds.items():
+            if name in column_kinds:
+                # 与另一张报表的整数核心列同名的数值属性（如现金流量表的 inventory）：该列放宽为浮点
+                if column_kinds[name] == INTEGER and kind == NUMBER:
+                    column_kinds[name] = NUMBER
+            else:
+                # 同名属性在任一报表中为数值即按数值列导出
+                eav_columns[name] = NUMBER if NUMBER in (kind, eav_columns.get(name)) else STRING
+    column_kinds.update(sorted(eav_columns.items()))
+    columns = [ExportColumn(name, kind) for name, kind in column_kinds.items()]
+
+    engine = db.get_bind()
+
+    def chunks() -> Iterator[Chunk]:
+        for repo in repos:
+            yield from _statement_chunks(engine, repo, columns, eav_kinds[repo.statement_type], company_ids, chunk_size)
+
+    return _export(export_format, columns, chunks)
+
+
+# ---------- 指标导出 ----------
+
+def export_metrics(
+    db: Session,
+    metric_names: List[str],
+    company_ids: Optional[List[int]],
+    export_format: ExportFormat,
+    granularity: Granularity = Granularity.ANNUAL,
+    chunk_size: int = 200,
+) -> Export:
+    """
+    Exports the series of registered metrics, one row per (company, period) with a column
+    per metric (chart units). Companies are computed `chunk_size` at a time, each chunk with
+    one grouped query, so memory is bounded by the chunk rather than the universe.
+    """
+    metric_names = list(dict.fromkeys(metric_names))
+    unknown = [name for name in metric_names if name not in METRIC_REGISTRY]
+    if unknown:
+        raise ExportError(f"Unknown metrics: {', '.join(unknown)}")
+    repos = get_metric_repositories()
+    metric_catalog.ensure_loaded(db, repos)
+    columns = [ExportColumn("company_id", INTEGER), ExportColumn("ticker", STRING), ExportColumn("period", STRING)]
+    columns.extend(ExportColumn(name, NUMBER) for name in metric_names)
+    company_repo = CompanyRepository()
+    if company_ids is None:
+        company_ids = [company.id for company in company_repo.get_multi_by_ids_or_industry(db)]
+
+    def chunks() -> Iterator[Chunk]:
+        session = Session(bind=db.get_bind())
+        try:
+            for start in range(0, len(company_ids), chunk_size):
+                ids = company_ids[start:start + chunk_size]
+                frame = compute_metric_frame(session, repos, ids, metric_names, granularity)
+                frame = frame.dropna(how="all").round(2)
+                if frame.empty:
+                    continue
+                tickers = {company.id: company.ticker for company in company_repo.get_multi_by_ids_or_industry(session, ids=ids)}
+                frame = frame.reset_index()
+                chunk: Chunk = {
+                    "company_id": frame["company_id"].astype(int).tolist(),
+                    "ticker": [tickers.get(company_id) for company_id in frame["company_id"].tolist()],
+                    "period": frame["year"].astype(str).tolist(),
+                }
+                for name in metric_names:
+                    chunk[name] = frame[name].astype(object).where(frame[name].notna(), None).tolist()
+                yield chunk
+        finally:
+            session.close()
+
+    return _export(export_format, columns, chunks)
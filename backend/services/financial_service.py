@@ -1,60 +1,289 @@
+import pandas as pd
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List, Type
+from typing import Dict, Any, List, Literal, Optional, Tuple, Type
 from fastapi import Depends
 
-from schemas.chart import ChartData
-from repositories.financial_repo import BalanceStatementRepository, IncomeStatementRepository, CashStatementRepository, FinancialStatementRepository
-from .metrics import get_metric_config
+from models.company import IndustryCategoryEnum
+from schemas.chart import ChartAxis, ChartData, ChartLegend, ChartSeries, ChartTitle, MetricChartBatch, MetricComparison, MetricComparisonRow
+from schemas.financial import FinancialMetricInfo, Granularity, MetricLocationInfo, SeriesWindow
+from repositories.company_repo import CompanyRepository
+from repositories.financial_repo import FinancialStatementRepository, fetch_metric_frame, fetch_metric_time_series, get_metric_repositories
+from repositories.metric_catalog import metric_catalog
+from repositories.metric_series_repo import MetricSeriesRepository
+from repositories.statement_store import statement_store
+from services.chart_cache import chart_cache
+from services.metric_series_service import metric_series_materializer
+from .metrics import get_metric, get_metric_names
+from .metrics.base_metric import grouped_growth_rates
+from .metrics.graph import MetricEvaluator, get_metric_graph
+from core.config import config
 from core.database import get_db
 
+def compute_metric_frame(
+    db: Session,
+    repos: List[FinancialStatementRepository],
+    company_ids: Optional[List[int]],
+    metric_names: List[str],
+    granularity: Granularity = Granularity.ANNUAL,
+) -> pd.DataFrame:
+    """
+    Computes `metric_names` for many companies at once (every company when `company_ids` is
+    None): the leaf series of all metrics are fetched in one grouped query and each metric is
+    evaluated on the (company_id, year) indexed frame. Returns the display values (chart
+    units, not rounded) with one column per metric; empty when no company has data.
+    """
+    graph = get_metric_graph()
+    leaves = graph.leaves(metric_names)
+    long_frame = fetch_metric_frame(db, repos, company_ids, leaves, granularity)
+    if long_frame.empty:
+        return pd.DataFrame(columns=metric_names, dtype=float)
+    wide = long_frame.pivot(index=["company_id", "year"], columns="metric", values="value")
+    wide = wide.reindex(columns=leaves)
+    # 被其他指标依赖的派生中间指标按拓扑顺序逐列加入宽表
+    plan = graph.plan(metric_names)
+    intermediates = {dep for node in plan for dep in graph.inputs(node)}
+    for node in plan:
+        if node in intermediates:
+            wide[node] = graph.metric(node).compute_frame(wide).reindex(wide.index)
+    return pd.DataFrame(
+        {name: graph.metric(name).display_frame(wide).reindex(wide.index) for name in metric_names},
+        index=wide.index,
+    )
+
+
 class FinancialMetricService:
     def __init__(self, db: Session = Depends(get_db)):
         """
         Initializes the service with a database session dependency.
-        Initializes all relevant financial statement repositories.
+        Uses the shared financial statement repositories (income, balance, cash).
         """
         self.db = db
-        self.income_repo = IncomeStatementRepository()
-        self.balance_repo = BalanceStatementRepository()
-        self.cash_repo = CashStatementRepository()
-        # Store all repositories in a list for easy iteration
-        self.all_repos: List[FinancialStatementRepository] = [
-            self.income_repo,
-            self.balance_repo,
-            self.cash_repo
-        ]
+        # Store all repositories in a list for easy iteration (lookup priority order)
+        self.all_repos: List[FinancialStatementRepository] = get_metric_repositories()
+        self.income_repo, self.balance_repo, self.cash_repo = self.all_repos
+        self.metric_series_repo = MetricSeriesRepository()
+        metric_catalog.ensure_loaded(db, self.all_repos)
 
-    def get_metric_chart_data(self, company_id: int, metric_name: str) -> ChartData:
+    def get_metric_chart_data(
+        self,
+        company_id: int,
+        metric_name: str,
+        granularity: Granularity = Granularity.ANNUAL,
+        window: SeriesWindow = SeriesWindow(),
+    ) -> ChartData:
         """
         Generates chart data for a given financial metric. It supports both single-metric
         charts and calculated metrics derived from multiple data series.
+        A bounded `window` reads only its periods (plus one lookback period) from the database.
+        """
+        charts, errors = self._build_charts(company_id, [metric_name], granularity, window)
+        if metric_name in errors:
+            raise errors[metric_name]
+        return charts[metric_name]
+
+    def get_metrics_chart_data(
+        self, company_id: int, metric_names: Optional[List[str]] = None, granularity: Granularity = Granularity.ANNUAL
+    ) -> MetricChartBatch:
+        """
+        Generates the charts of several metrics (every registered metric when `metric_names`
+        is empty). The union of their dependencies is fetched once, so a series shared by
+        several metrics (e.g. `net_income`) is read a single time.
+        """
+        metric_names = list(dict.fromkeys(metric_names or get_metric_names()))
+        charts, errors = self._build_charts(company_id, metric_names, granularity)
+        return MetricChartBatch(charts=charts, errors={name: str(error) for name, error in errors.items()})
+
+    def _build_charts(
+        self,
+        company_id: int,
+        metric_names: List[str],
+        granularity: Granularity = Granularity.ANNUAL,
+        window: SeriesWindow = SeriesWindow(),
+    ) -> Tuple[Dict[str, ChartData], Dict[str, Exception]]:
         """
-        # 1. Get the specific metric configuration class
-        metric_config_class = get_metric_config(metric_name)
-        if not metric_config_class:
+        Builds the charts of `metric_names` at the given granularity and window, returning
+        ({metric: chart}, {metric: error}).
+        Errors are ValueError for unknown metrics and LookupError for missing data.
+        """
+        charts: Dict[str, ChartData] = {}
+        errors: Dict[str, Exception] = {}
+        pending = {}
+        generation = chart_cache.generation(company_id)
+        graph = get_metric_graph()
+
+        for metric_name in metric_names:
+            # 1. Get the shared metric configuration instance
+            metric_config_instance = get_metric(metric_name)
+            if not metric_config_instance:
+                errors[metric_name] = ValueError(f"No chart configuration found for metric: '{metric_name}'")
+                continue
+
+            # 2. Serve from the per-company chart cache (invalidated by statement upserts)
+            cached = chart_cache.get(company_id, metric_name, granularity, window)
+            if cached is not None:
+                charts[metric_name] = cached
+                continue
+
+            # 3. Determine the required stored series (the metric itself, or the leaves of its
+            # dependency DAG when it is derived, possibly from other derived metrics)
+            metric_dependencies = graph.leaves([metric_name])
+
+            # 4. Unknown dependencies are rejected from the in-memory catalog without a query
+            statement_types = set()
+            for dep_metric_name in metric_dependencies:
+                locations = metric_catalog.locate(dep_metric_name)
+                if not locations:
+                    errors[metric_name] = LookupError(f"Data not found for dependency '{dep_metric_name}' of metric '{metric_name}' in any repository.")
+                    break
+                statement_types.update(location.statement_type for location in locations)
+            else:
+                pending[metric_name] = (metric_config_instance, metric_dependencies, statement_types)
+
+        if not pending:
+            return charts, errors
+
+        # 5. Serve the series materialized at write time (one indexed range scan for all metrics);
+        # metrics without stored points are computed live from the statement tables below, as are
+        # companies whose latest writes (committed by any process) are not materialized yet.
+        # With the in-memory statement store loaded, live computation needs no query at all.
+        if config.metric_series.enabled and not statement_store.ready and not metric_series_materializer.is_stale(company_id, self.db):
+            materialized = self.metric_series_repo.get_series(self.db, company_id, list(pending), granularity, window)
+            for metric_name, points in materialized.items():
+                metric_config_instance, _, statement_types = pending.pop(metric_name)
+                chart_data = metric_config_instance.build_chart(points.periods, points.values, points.growth_rates)
+                chart_cache.put(
+                    company_id, metric_name, chart_data, statement_types,
+                    generation=generation, granularity=granularity, window=window,
+                )
+                charts[metric_name] = chart_data
+            if not pending:
+                return charts, errors
+
+        # 6. Fetch the union of all dependencies in one query
+        # (income → balance → cash priority when a metric exists in several statements)
+        all_dependencies = [dep for _, deps, _ in pending.values() for dep in deps]
+        time_series_data_map: Dict[str, List[Dict[str, Any]]] = fetch_metric_time_series(
+            self.db, self.all_repos, company_id, all_dependencies, granularity, window
+        )
+
+        # 7. Generate the chart data using the fetched data
+        # Derived inputs are evaluated in topological order and memoized for the whole batch,
+        # so an intermediate metric shared by several charts is computed once.
+        evaluator = MetricEvaluator(graph, time_series_data_map)
+        for metric_name, (metric_config_instance, metric_dependencies, statement_types) in pending.items():
+            missing = evaluator.missing(metric_name)
+            if missing:
+                errors[metric_name] = LookupError(f"Data not found for dependency '{missing}' of metric '{metric_name}' in any repository.")
+                continue
+            chart_data = metric_config_instance.get_chart_data(evaluator.inputs(metric_name))
+            if window.bounded:
+                # 增长率已基于回看期计算，裁掉窗口之外的点
+                chart_data = self._apply_window(chart_data, window)
+            chart_cache.put(
+                company_id, metric_name, chart_data, statement_types,
+                generation=generation, granularity=granularity, window=window,
+            )
+            charts[metric_name] = chart_data
+
+        return charts, errors
+
+    @staticmethod
+    def _apply_window(chart: ChartData, window: SeriesWindow) -> ChartData:
+        """Keeps the categories of a metric chart inside `window`, with the matching points of every series."""
+        if not chart.x_axis or chart.x_axis[0].data is None:
+            return chart
+        keep = window.slice(chart.x_axis[0].data)
+        chart.x_axis[0].data = chart.x_axis[0].data[keep]
+        for series in chart.series:
+            series.data = series.data[keep]
+        return chart
+
+    def get_metric_comparison(
+        self,
+        metric_name: str,
+        company_ids: Optional[List[int]] = None,
+        industry_category: Optional[IndustryCategoryEnum] = None,
+        view: Literal["chart", "matrix"] = "chart",
+        granularity: Granularity = Granularity.ANNUAL,
+    ) -> MetricComparison:
+        """
+        Compares one metric across many companies (the given ids and/or every company of an
+        industry). The dependencies of all companies are fetched in one grouped query and the
+        metric is computed for every company at once on a (company_id, year) indexed frame.
+        """
+        # 1. 指标配置与依赖（未知依赖直接由目录拒绝，不查询数据库）
+        metric = get_metric(metric_name)
+        if not metric:
             raise ValueError(f"No chart configuration found for metric: '{metric_name}'")
-        
-        metric_config_instance = metric_config_class()
-        
-        # 2. Determine the required metrics (either the metric itself or its dependencies)
-        metric_dependencies = metric_config_instance.dependencies or [metric_name]
-        
-        # 3. Fetch time series data for all required metrics
-        time_series_data_map: Dict[str, List[Dict[str, Any]]] = {}
-        for dep_metric_name in metric_dependencies:
-            found_data = False
-            for repository in self.all_repos:
-                time_series_data = repository.get_metric_time_series(self.db, company_id, dep_metric_name)
-                if time_series_data:
-                    time_series_data_map[dep_metric_name] = time_series_data
-                    found_data = True
-                    break # Data found for this dependency, move to the next one
-            
-            if not found_data:
+        graph = get_metric_graph()
+        dependencies = graph.leaves([metric_name])
+        for dep_metric_name in dependencies:
+            if not metric_catalog.locate(dep_metric_name):
                 raise LookupError(f"Data not found for dependency '{dep_metric_name}' of metric '{metric_name}' in any repository.")
 
-        # 4. Generate the chart data using the fetched data
-        # For single metrics, the map will have one entry. For calculated metrics, it will have multiple.
-        chart_data = metric_config_instance.get_chart_data(time_series_data_map)
-        
-        return chart_data
+        # 2. 解析要对比的公司
+        companies = CompanyRepository().get_multi_by_ids_or_industry(
+            self.db, ids=company_ids, industry_category=industry_category
+        )
+        requested_ids = list(dict.fromkeys(company_ids)) if company_ids else [c.id for c in companies]
+
+        # 3. 一次查询取回所有公司的全部依赖序列，向量化计算指标值与逐公司增长率
+        values = compute_metric_frame(self.db, self.all_repos, [c.id for c in companies], [metric_name], granularity)
+        values = values[metric_name].dropna().round(2)
+        if values.empty:
+            return MetricComparison(metric_name=metric_name, missing=requested_ids)
+        growth_rates = grouped_growth_rates(values)
+
+        # 4. 按年份对齐成矩阵（缺失年份为 None）
+        value_matrix = values.unstack("year").sort_index(axis=1)
+        growth_matrix = growth_rates.unstack("year").reindex(columns=value_matrix.columns)
+        value_matrix = value_matrix.astype(object).where(value_matrix.notna(), None)
+        growth_matrix = growth_matrix.astype(object).where(growth_matrix.notna(), None)
+        years = [str(year) for year in value_matrix.columns]
+
+        rows = [
+            MetricComparisonRow(
+                company_id=company.id,
+                name=company.name,
+                ticker=company.ticker,
+                values=value_matrix.loc[company.id].tolist(),
+                growth_rates=growth_matrix.loc[company.id].tolist(),
+            )
+            for company in companies if company.id in value_matrix.index
+        ]
+        found = {row.company_id for row in rows}
+        missing = [company_id for company_id in requested_ids if company_id not in found]
+
+        if view == "matrix":
+            return MetricComparison(metric_name=metric_name, years=years, rows=rows, missing=missing)
+
+        labels = [row.ticker or row.name for row in rows]
+        chart = ChartData(
+            title=ChartTitle(text=getattr(metric, "chart_title", metric_name)),
+            legend=ChartLegend(data=labels, bottom=2, left=150),
+            xAxis=[ChartAxis(type="category", data=years, name="", nameLocation="middle", nameGap=30)],
+            yAxis=[ChartAxis(type="value", axisLabel={"formatter": "{value}"})],
+            series=[ChartSeries(name=label, type="line", data=row.values) for label, row in zip(labels, rows)],
+        )
+        return MetricComparison(metric_name=metric_name, years=years, chart=chart, missing=missing)
+
+    def list_metric_details(self) -> List[FinancialMetricInfo]:
+        """
+        Describes every registered metric: its dependencies and where each stored series it
+        needs (the leaves of its dependency DAG) lives, answered from the in-memory metric catalog.
+        """
+        details = []
+        graph = get_metric_graph()
+        for name in get_metric_names():
+            dependencies = list(graph.inputs(name) or [name])
+            locations = {
+                dep: [MetricLocationInfo(**location._asdict()) for location in metric_catalog.locate(dep)]
+                for dep in graph.leaves([name])
+            }
+            details.append(FinancialMetricInfo(
+                name=name,
+                dependencies=dependencies,
+                available=all(locations.values()),
+                locations=locations,
+            ))
+        return details
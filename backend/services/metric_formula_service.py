@@ -0,0 +1,223 @@
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from core.config import config
+from core.database import get_db
+from core.log import logger
+from repositories.financial_repo import get_metric_repositories
+from repositories.metric_catalog import metric_catalog
+from repositories.metric_formula_repo import MetricFormulaRepository
+from schemas.metric_formula import MetricFormulaCreate, MetricFormulaInDB
+from services.chart_cache import chart_cache
+from services.metrics import METRIC_REGISTRY
+from services.metrics.formula import FormulaError, make_formula_metric
+from services.metrics.graph import MetricGraph, get_metric_graph
+from services.metrics.registry import MetricRegistry
+from services.metric_series_service import metric_series_materializer
+
+_lock = threading.Lock()
+# 已注册的公式指标 → 来源（config / database）
+_formula_sources: Dict[str, str] = {}
+
+
+def _check_definition(definition: MetricFormulaCreate, registry: MetricRegistry) -> type:
+    """Compiles a definition and validates its name and references against the registry and the metric catalog."""
+    if registry.is_builtin(definition.name):
+        raise FormulaError(f"'{definition.name}' is a built-in metric")
+    if metric_catalog.loaded and metric_catalog.locate(definition.name):
+        raise FormulaError(f"'{definition.name}' is a stored statement series")
+
+    metric_class = make_formula_metric(definition.name, definition.formula, title=definition.title, unit=definition.unit)
+    for name in metric_class().dependencies:
+        if name not in registry and metric_catalog.loaded and not metric_catalog.locate(name):
+            raise FormulaError(f"Unknown metric '{name}' in formula of '{definition.name}'")
+
+    try:
+        candidate = registry.copy()
+        candidate.register(definition.name, metric_class)
+        MetricGraph(candidate)
+    except ValueError as e:
+        raise FormulaError(str(e)) from None
+    return metric_class
+
+
+def register_formula_metrics(definitions: Iterable[MetricFormulaCreate], source: str) -> Dict[str, str]:
+    """
+    Compiles, validates and registers formula metrics, returning {name: error} for the rejected
+    ones. Formulas may reference each other in any order; the dependency graph is rebuilt once.
+    """
+    pending = list(definitions)
+    errors: Dict[str, str] = {}
+    with _lock:
+        registry = METRIC_REGISTRY.copy()
+        registered: List[Tuple[str, type]] = []
+        # 公式之间可以互相引用：反复尝试，直到一轮中没有新的公式注册成功
+        while pending:
+            retry = []
+            for definition in pending:
+                try:
+                    metric_class = _check_definition(definition, registry)
+                    registry.register(definition.name, metric_class)
+                    registered.append((definition.name, metric_class))
+                except FormulaError as e:
+                    errors[definition.name] = str(e)
+                    retry.append(definition)
+            if len(retry) == len(pending):
+                break
+            pending = retry
+
+        redefined = [name for name, _ in registered if name in _formula_sources]
+        for name, metric_class in registered:
+            errors.pop(name, None)
+            METRIC_REGISTRY.register(name, metric_class)
+            _formula_sources[name] = source
+        if registered:
+            get_metric_graph.cache_clear()
+            # 同名公式被重新定义时，已缓存的旧图表与物化序列（含依赖它的指标）不再有效
+            chart_cache.clear()
+            _forget_materialized_series(redefined)
+    return errors
+
+
+def _forget_materialized_series(names: List[str]) -> None:
+    """Drops the materialized series of `names` and of every metric depending on them."""
+    if not names or not config.metric_series.enabled:
+        return
+    graph = get_metric_graph()
+    affected = [other for other in METRIC_REGISTRY if any(name in graph.plan([other]) for name in names)]
+    metric_series_materializer.forget_metrics(list(dict.fromkeys([*names, *affected])))
+
+
+def _check_unused(name: str) -> None:
+    """Raises FormulaError while another registered metric depends on `name`."""
+    graph = get_metric_graph()
+    dependents = [other for other in METRIC_REGISTRY if name in graph.inputs(other)]
+    if dependents:
+        raise FormulaError(f"'{name}' is used by: {', '.join(dependents)}")
+
+
+def unregister_formula_metric(name: str) -> None:
+    """Removes a formula metric; rejected while another metric still depends on it."""
+    with _lock:
+        _check_unused(name)
+        METRIC_REGISTRY.unregister(name)
+        _formula_sources.pop(name, None)
+        get_metric_graph.cache_clear()
+        chart_cache.clear()
+        if config.metric_series.enabled:
+            metric_series_materializer.forget_metrics([name])
+
+
+def load_metric_formulas(db: Session) -> int:
+    """
+    Registers the formulas of the config file and of the `metric_formulas` table at startup.
+    Invalid formulas are logged and skipped. Returns the number of registered formulas.
+    """
+    definitions = [(MetricFormulaCreate(**item.model_dump()), "config") for item in config.metric_formulas]
+    definitions += [
+        (MetricFormulaCreate(name=row.name, formula=row.formula, title=row.title, unit=row.unit), "database")
+        for row in MetricFormulaRepository().list_all(db)
+    ]
+    errors = {}
+    for source in ("config", "database"):
+        errors.update(register_formula_metrics([d for d, s in definitions if s == source], source))
+    for name, error in errors.items():
+        logger.warning(f"Metric formula '{name}' not registered: {error}")
+    return len(_formula_sources)
+
+
+class MetricFormulaService:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+        self.repo = MetricFormulaRepository()
+
+    def list_formulas(self) -> List[MetricFormulaInDB]:
+        stored = {row.name: row for row in self.repo.list_all(self.db)}
+        formulas = []
+        for name, source in _formula_sources.items():
+            metric = METRIC_REGISTRY.get(name)
+            row = stored.get(name) if source == "database" else None
+            formulas.append(MetricFormulaInDB(
+                id=row.id if row else None,
+                name=name,
+                formula=metric.formula,
+                title=metric.chart_title,
+                unit=metric.unit,
+                source=source,
+                dependencies=metric.dependencies,
+                created_at=row.created_at if row else None,
+                updated_at=row.updated_at if row else None,
+            ))
+        return formulas
+
+    def save_formula(self, definition: MetricFormulaCreate) -> MetricFormulaInDB:
+        """
+        Validates a formula, stores it so it is registered again at startup, then registers it.
+        The process never serves a formula that is not stored: nothing is registered when the
+        write fails, and the stored definition is restored when the registration fails.
+        """
+        if _formula_sources.get(definition.name) == "config":
+            raise FormulaError(f"'{definition.name}' is defined in the config file")
+        metric_catalog.ensure_loaded(self.db, get_metric_repositories())
+        # 1. 先校验（不注册），无效公式不写入数据库
+        with _lock:
+            _check_definition(definition, METRIC_REGISTRY.copy())
+
+        # 2. 写入数据库；失败时注册表保持不变
+        previous = self.repo.get_by_name(self.db, definition.name)
+        if previous is not None:
+            previous = MetricFormulaCreate(name=previous.name, formula=previous.formula, title=previous.title, unit=previous.unit)
+        try:
+            row = self.repo.upsert(self.db, obj_in=definition)
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # 3. 注册；期间注册表被并发修改导致失败时，恢复数据库中的旧定义
+        errors = register_formula_metrics([definition], "database")
+        if errors:
+            if previous is None:
+                self.repo.delete_by_name(self.db, definition.name)
+            else:
+                self.repo.upsert(self.db, obj_in=previous)
+            raise FormulaError(errors[definition.name])
+        info = MetricFormulaInDB.model_validate(row)
+        metric = METRIC_REGISTRY.get(definition.name)
+        info.formula = metric.formula
+        info.dependencies = metric.dependencies
+        return info
+
+    def delete_formula(self, name: str) -> bool:
+        """
+        Deletes a stored formula, then unregisters it. When the delete fails the formula stays
+        registered; when unregistering fails afterwards the stored row is restored.
+        """
+        if _formula_sources.get(name) == "config":
+            raise FormulaError(f"'{name}' is defined in the config file")
+        if _formula_sources.get(name) != "database":
+            return False
+        # 1. 先检查是否仍被其他指标引用（不注销）
+        with _lock:
+            _check_unused(name)
+
+        # 2. 删除数据库记录；失败时注册表保持不变
+        row = self.repo.get_by_name(self.db, name)
+        previous = MetricFormulaCreate(name=row.name, formula=row.formula, title=row.title, unit=row.unit) if row else None
+        try:
+            self.repo.delete_by_name(self.db, name)
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # 3. 注销；期间有新公式引用了它导致失败时，恢复数据库记录
+        try:
+            unregister_formula_metric(name)
+        except FormulaError:
+            if previous is not None:
+                self.repo.upsert(self.db, obj_in=previous)
+            raise
+        return True
+
@@ -0,0 +1,224 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import config
+from core.database import SessionLocal
+from core.log import logger
+from repositories.events import StatementsChanged
+from repositories.financial_repo import fetch_metric_time_series, get_metric_repositories
+from repositories.metric_catalog import metric_catalog
+from repositories.metric_series_repo import MetricSeriesRepository
+from repositories.statement_version_repo import StatementVersionRepository
+from schemas.financial import FinancialStatementType, Granularity
+from services.chart_cache import chart_cache
+from services.metrics import get_metric, get_metric_names
+from services.metrics.graph import MetricEvaluator, get_metric_graph
+
+
+def _affected_metrics(statement_type: Optional[FinancialStatementType]) -> List[str]:
+    """The registered metrics reading (transitively) a series of `statement_type`; every metric when None."""
+    names = get_metric_names()
+    if statement_type is None:
+        return names
+    graph = get_metric_graph()
+    return [
+        name for name in names
+        if any(location.statement_type == statement_type for leaf in graph.leaves([name]) for location in metric_catalog.locate(leaf))
+    ]
+
+
+def compute_company_series(db: Session, company_id: int, metric_names: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Computes the chart points of `metric_names` for one company at every granularity, as
+    `metric_series` rows. The points are taken from the metrics' own charts, so a chart rebuilt
+    from the stored rows is identical to one computed live.
+    """
+    metric_names = list(metric_names)
+    repos = get_metric_repositories()
+    graph = get_metric_graph()
+    leaves = graph.leaves(metric_names)
+    rows = []
+    for granularity in Granularity:
+        # 每个粒度一次查询取回所有指标的叶子序列，派生中间指标只计算一次
+        evaluator = MetricEvaluator(graph, fetch_metric_time_series(db, repos, company_id, leaves, granularity))
+        for name in metric_names:
+            if evaluator.missing(name):
+                continue
+            chart = get_metric(name).get_chart_data(evaluator.inputs(name))
+            if not chart.series:
+                continue
+            rows.extend(
+                {"company_id": company_id, "metric_name": name, "granularity": granularity.value,
+                 "period": period, "value": value, "growth": growth}
+                for period, value, growth in zip(chart.x_axis[0].data, chart.series[0].data, chart.series[1].data)
+            )
+    return rows
+
+
+class MetricSeriesMaterializer:
+    """
+    Recomputes the materialized metric series of a company after its statements change.
+
+    Subscribed to the statement events at startup. Events only queue the company: a background
+    thread recomputes it once no further write arrived for `debounce_seconds`, so a chunked
+    upload (one event per committed chunk) is materialized once, off the request thread. Until
+    then the company is reported as stale and its charts are computed live. If the
+    recomputation fails, the company's materialized rows are dropped so that its charts keep
+    falling back to live computation instead of serving stale values.
+
+    Only the process that committed a write materializes it. Each materialization records the
+    statement versions it was computed from, so every process can tell from `statement_versions`
+    that a company's stored series lag behind a write committed elsewhere.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], debounce_seconds: float = 1.0):
+        self.session_factory = session_factory
+        self.debounce_seconds = debounce_seconds
+        self.repo = MetricSeriesRepository()
+        self.versions = StatementVersionRepository()
+        # 同一进程内串行写入，避免并发导入同一公司时的删除/插入交错
+        self._lock = threading.Lock()
+        # 待物化的公司 → (到期时间, 变更的报表类型；None 表示全部指标)
+        self._pending: Dict[int, Tuple[float, Set[Optional[FinancialStatementType]]]] = {}
+        self._running: Optional[int] = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Starts the background thread draining the queued companies."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._drain, name="metric-series-materializer", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stops the background thread; companies still queued are left to the next write or backfill."""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None and wait:
+            thread.join()
+
+    def is_stale(self, company_id: int, db: Optional[Session] = None) -> bool:
+        """
+        Whether the company has statement writes that are not materialized yet: queued in this
+        process, or, when `db` is given, committed by any process after the last materialization.
+        """
+        with self._condition:
+            if company_id in self._pending or company_id == self._running:
+                return True
+        return db is not None and not self.versions.is_materialized(db, company_id)
+
+    def materialize(
+        self,
+        db: Session,
+        company_id: int,
+        metric_names: Optional[List[str]] = None,
+        statement_types: Optional[Iterable[Optional[FinancialStatementType]]] = None,
+    ) -> int:
+        """
+        Recomputes and stores the series of `metric_names` (every registered metric when None)
+        for a company and commits. Returns the number of stored points.
+        `statement_types` are the writes the recomputation covers (None in it: all of them); when
+        omitted, every statement type is covered only if every metric is recomputed.
+        """
+        metric_catalog.ensure_loaded(db, get_metric_repositories())
+        # 计算前读取版本号快照：计算期间提交的写入仍视为未物化
+        versions = self.versions.company_versions(db, company_id)
+        if statement_types is not None:
+            statement_types = set(statement_types)
+            if None not in statement_types:
+                versions = {t: v for t, v in versions.items() if t in statement_types}
+        elif metric_names is not None:
+            versions = {}
+        metric_names = metric_names if metric_names is not None else get_metric_names()
+        rows = compute_company_series(db, company_id, metric_names)
+        with self._lock:
+            self.repo.replace_company_series(db, company_id, metric_names, rows)
+            self.versions.mark_materialized(db, company_id, versions)
+            db.commit()
+        # 物化完成后再失效一次图表缓存，避免写入与物化之间读到的旧值被缓存
+        chart_cache.invalidate(company_id)
+        return len(rows)
+
+    def on_statements_changed(self, event: StatementsChanged) -> None:
+        # 其他进程的写入由写入进程物化；本进程只通过版本号得知其尚未物化
+        if event.remote:
+            return
+        # 只入队；同一公司在静默期内的多次写入合并为一次物化
+        with self._condition:
+            _, statement_types = self._pending.get(event.company_id, (0.0, set()))
+            statement_types.add(event.statement_type)
+            self._pending[event.company_id] = (time.monotonic() + self.debounce_seconds, statement_types)
+            self._condition.notify_all()
+
+    def _next_due(self) -> Optional[Tuple[int, Set[Optional[FinancialStatementType]]]]:
+        """Blocks until a queued company is due and takes it off the queue; None once stopping."""
+        with self._condition:
+            while not self._stopping:
+                now = time.monotonic()
+                company_id = min(self._pending, key=lambda c: self._pending[c][0], default=None)
+                if company_id is not None and self._pending[company_id][0] <= now:
+                    self._running = company_id
+                    return company_id, self._pending.pop(company_id)[1]
+                self._condition.wait(None if company_id is None else self._pending[company_id][0] - now)
+            return None
+
+    def _drain(self) -> None:
+        while True:
+            due = self._next_due()
+            if due is None:
+                return
+            company_id, statement_types = due
+            try:
+                self.refresh_company(company_id, statement_types)
+            except Exception as e:
+                logger.error(f"Materializing the metric series of company {company_id} failed: {e}", exc_info=True)
+            finally:
+                with self._condition:
+                    self._running = None
+
+    def refresh_company(self, company_id: int, statement_types: Iterable[Optional[FinancialStatementType]]) -> None:
+        """Recomputes the metrics of a company reading any of the changed statement types, in a session of its own."""
+        db = self.session_factory()
+        try:
+            metric_catalog.ensure_loaded(db, get_metric_repositories())
+            statement_types = list(statement_types)
+            affected = {name: None for statement_type in statement_types for name in _affected_metrics(statement_type)}
+            self.materialize(db, company_id, list(affected), statement_types)
+        except Exception:
+            db.rollback()
+            self.repo.delete_company(db, company_id)
+            db.commit()
+            chart_cache.invalidate(company_id)
+            raise
+        finally:
+            db.close()
+
+    def forget_metrics(self, metric_names: Iterable[str]) -> None:
+        """
+        Drops the stored series of redefined or removed metrics for every company; their charts
+        are computed live until the next write or backfill.
+        """
+        metric_names = list(metric_names)
+        if not metric_names:
+            return
+        db = self.session_factory()
+        try:
+            with self._lock:
+                self.repo.delete_metrics(db, metric_names)
+                db.commit()
+        except Exception as e:
+            logger.error(f"Could not drop the materialized series of {metric_names}: {e}", exc_info=True)
+        finally:
+            db.close()
+
+
+metric_series_materializer = MetricSeriesMaterializer(SessionLocal, debounce_seconds=config.metric_series.debounce_seconds)
@@ -1,44 +1,44 @@
-import pkgutil
-import inspect
-from pathlib import Path
-from typing import Dict, Type, List
+from typing import List, Optional, Type
+
+from core.log import logger
 from .base_metric import BaseMetric
-# No explicit import needed for TotalOperatingExpensesMetric,
-# as _discover_metrics will find it dynamically.
+from .registry import MetricRegistry, load_manifest
 
-# A registry to hold all the discovered metric classes
-METRIC_REGISTRY: Dict[str, Type[BaseMetric]] = {}
 
-def _discover_metrics():
+def _load_registry() -> MetricRegistry:
     """
-    Dynamically discovers and registers all metric classes in this directory.
-    It skips abstract base classes like BaseMetric and RatioMetric.
+    Builds the registry from the generated manifest; metric modules are imported on first use.
+    Falls back to discovering the metric classes when the manifest is missing.
     """
-    package_path = Path(__file__).parent
-    for _, name, _ in pkgutil.iter_modules([str(package_path)]):
-        module = __import__(f"{__name__}.{name}", fromlist=["*"])
-        for _, cls in inspect.getmembers(module, inspect.isclass):
-            # Check if the class is a subclass of BaseMetric, but not BaseMetric itself,
-            # and importantly, is not an abstract class.
-            if issubclass(cls, BaseMetric) and cls is not BaseMetric and not inspect.isabstract(cls):
-                # Instantiate the class to get the metric_name
-                instance = cls()
-                # Only register the metric if register_metric is True
-                if instance.register_metric:
-                    METRIC_REGISTRY[instance.metric_name] = cls
-    print("Discovered Metrics:", METRIC_REGISTRY)
+    try:
+        return MetricRegistry(load_manifest())
+    except FileNotFoundError:
+        from .manifest import build_manifest
+
+        logger.warning("Metric manifest not found, discovering metric modules; run `python -m services.metrics.manifest`")
+        return MetricRegistry(build_manifest())
+
 
-# Run discovery when the package is imported
-_discover_metrics()
+# Registry of every metric: the built-in classes of this package plus runtime formula metrics
+METRIC_REGISTRY: MetricRegistry = _load_registry()
 
-def get_metric_config(metric_name: str) -> Type[BaseMetric]:
+
+def get_metric_config(metric_name: str) -> Optional[Type[BaseMetric]]:
     """
     Returns the metric configuration class for the given metric name.
     """
+    return METRIC_REGISTRY.get_class(metric_name)
+
+
+def get_metric(metric_name: str) -> Optional[BaseMetric]:
+    """
+    Returns the shared instance of the given metric.
+    """
     return METRIC_REGISTRY.get(metric_name)
 
+
 def get_metric_names() -> List[str]:
     """
     Returns a list of all registered metric names.
     """
-    return list(METRIC_REGISTRY.keys())
+    return METRIC_REGISTRY.names()
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+
+class AlignedSeries(NamedTuple):
+    """
+    Several yearly series aligned on one year index.
+    `values` has one column per series (float64), with NaN where a series has no value.
+    """
+    years: List[Any]
+    values: np.ndarray
+
+    @property
+    def mask(self) -> np.ndarray:
+        """True where a value is present."""
+        return ~np.isnan(self.values)
+
+    def complete(self) -> "AlignedSeries":
+        """Keeps only the years where every series has a value."""
+        keep = self.mask.all(axis=1)
+        return AlignedSeries([year for year, k in zip(self.years, keep) if k], self.values[keep])
+
+
+def series_arrays(data: List[Dict[str, Any]]) -> Tuple[List[Any], np.ndarray]:
+    """Splits `[{"year", "value"}, ...]` into the year list and a float64 array (missing → NaN)."""
+    years = [point["year"] for point in data]
+    values = np.array([point.get("value") for point in data], dtype=np.float64)
+    return years, values
+
+
+def series_from_arrays(years: List[Any], values: np.ndarray) -> List[Dict[str, Any]]:
+    """Inverse of `series_arrays`: rebuilds `[{"year", "value"}, ...]` from a year list and an array."""
+    return [{"year": year, "value": value} for year, value in zip(years, values.tolist())]
+
+
+def align(series: Sequence[List[Dict[str, Any]]], *, sort: bool = True) -> AlignedSeries:
+    """
+    Aligns several `[{"year", "value"}, ...]` series on the union of their years.
+    Follows pandas index alignment: identical year lists keep their order when `sort` is
+    False, anything else is aligned on the sorted union.
+    """
+    arrays = [series_arrays(data) for data in series]
+    first_years = arrays[0][0]
+    if all(years == first_years for years, _ in arrays) and (not sort or first_years == sorted(first_years)):
+        return AlignedSeries(list(first_years), np.column_stack([values for _, values in arrays]))
+
+    years = sorted(set().union(*(years for years, _ in arrays)))
+    position = {year: i for i, year in enumerate(years)}
+    matrix = np.full((len(years), len(arrays)), np.nan)
+    for column, (series_years, values) in enumerate(arrays):
+        matrix[[position[year] for year in series_years], column] = values
+    return AlignedSeries(years, matrix)
+
+
+def growth_rates(values: np.ndarray) -> np.ndarray:
+    """
+    Period-over-period growth in percent, rounded to 2 decimals: missing values are carried
+    forward, and the first period, divisions by zero and other non-finite results are 0.
+    """
+    if values.size == 0:
+        return values.astype(np.float64)
+    filled = values.astype(np.float64)
+    missing = np.isnan(filled)
+    if missing.any():
+        # 与 pandas pct_change 的默认行为一致：缺失值沿用上一期
+        index = np.where(missing, 0, np.arange(filled.size))
+        np.maximum.accumulate(index, out=index)
+        filled = filled[index]
+    growth = np.zeros_like(filled)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth[1:] = (filled[1:] / filled[:-1] - 1) * 100
+    growth[~np.isfinite(growth)] = 0
+    return np.round(growth, 2)
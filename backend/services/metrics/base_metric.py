@@ -2,7 +2,8 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 import pandas as pd
 import numpy as np
-from schemas.chart import ChartData
+from schemas.chart import ChartAxis, ChartData, ChartLegend, ChartSeries, ChartTitle
+from .aligned_series import growth_rates, series_arrays
 
 # --- Unit Constants ---
 # Using descriptive names for divisors to avoid magic numbers.
@@ -44,6 +45,15 @@ value_label = {
 }
 
 
+def grouped_growth_rates(values: pd.Series) -> pd.Series:
+    """
+    Year-over-year growth rates of a (company_id, year) indexed series, computed per company
+    with the same rules as `BaseMetric._calculate_growth_rates`.
+    """
+    growth = values.groupby(level="company_id").pct_change() * 100
+    return growth.replace([np.inf, -np.inf], 0).fillna(0).round(2)
+
+
 class BaseMetric(ABC):
     """
     Abstract base class for defining a financial metric's chart configuration.
@@ -57,6 +67,8 @@ class BaseMetric(ABC):
     value_unit: int = UNIT_ONE
     # If set to False, this metric will not be registered in the METRIC_REGISTRY
     register_metric: bool = True
+    # The name of the value (bar) series in the chart
+    value_series_name: str = "值"
 
     @abstractmethod
     def get_chart_data(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> ChartData:
@@ -67,44 +79,75 @@ class BaseMetric(ABC):
         """
         raise NotImplementedError
 
+    def build_chart(self, categories: List[Any], values: List[float], growth_rates: List[float]) -> ChartData:
+        """
+        Builds the standard chart of the metric from its display values and growth rates:
+        the values as bars, the growth rates as a line on a percentage axis.
+        """
+        return ChartData(
+            title=ChartTitle(text=self.chart_title),
+            legend=ChartLegend(data=[self.value_series_name, "增长率"], bottom=2, left=150),
+            xAxis=[ChartAxis(type="category", data=categories, name="", nameLocation="middle", nameGap=30, axisLabel={"show": False})],
+            yAxis=[
+                ChartAxis(type="value", axisLabel={"formatter": "{value}"}),
+                ChartAxis(type="value", position="right", axisLabel={"formatter": "{value} %"})
+            ],
+            series=[
+                ChartSeries(name=self.value_series_name, type="bar", data=values, label=value_label),
+                ChartSeries(name="增长率", type="line", yAxisIndex=1, data=growth_rates, smooth=True, label=ratio_label),
+            ]
+        )
+
+    def no_data_chart(self) -> ChartData:
+        return ChartData(title=ChartTitle(text=f"{self.chart_title} (No Data)"), series=[])
+
+    def compute_series(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Computes the raw (unrounded) `[{"year", "value"}, ...]` series of a derived metric
+        from its inputs, so that other metrics can depend on it.
+        """
+        raise NotImplementedError(f"Metric '{self.metric_name}' is not a derived metric")
+
+    def compute_frame(self, frame: pd.DataFrame) -> pd.Series:
+        """
+        Vectorized counterpart of `get_chart_data` for many companies at once.
+        Takes a DataFrame indexed by (company_id, year) whose columns are the dependency
+        metrics, and returns the unrounded metric values indexed by (company_id, year).
+        """
+        raise NotImplementedError(f"Metric '{self.metric_name}' does not support multi-company computation")
+
+    def display_frame(self, frame: pd.DataFrame) -> pd.Series:
+        """The `compute_frame` values in the unit shown on charts (identical unless overridden)."""
+        return self.compute_frame(frame)
+
     def _process_time_series_data(
         self,
         time_series_data: List[Dict[str, Any]],
         metric_name: Optional[str] = None
     ) -> (List[str], List[float]):
         """
-        Processes raw time series data using pandas for value extraction and conversion.
+        Processes raw time series data with NumPy for value extraction and conversion.
         Returns categories (years) and processed values.
         If metric_name is provided, it's used for error messaging.
         """
         if not time_series_data:
             return [], []
 
-        df = pd.DataFrame(time_series_data)
+        categories, values = series_arrays(time_series_data)
+        values[np.isnan(values)] = 0
 
-        if 'value' not in df.columns:
-            df['value'] = 0
-        df['value'] = df['value'].fillna(0)
-
-        categories = df["year"].tolist()
-        
         # Use the class attribute for division based on the defined unit constant
         divisor = self.value_unit
         if divisor == 0: # Avoid division by zero
             divisor = 1
-            
-        values = (df["value"] / divisor).round(2).tolist()
-        
-        return categories, values
+
+        return categories, np.round(values / divisor, 2).tolist()
 
     def _calculate_growth_rates(self, values: List[float]) -> List[float]:
         """
-        Calculates year-over-year growth rates using pandas.
+        Calculates year-over-year growth rates on a NumPy array.
+        Divisions by zero and the first year are reported as 0.
         """
         if not values:
             return []
-        s = pd.Series(values)
-        growth = s.pct_change() * 100
-        # Replace inf/-inf with 0 (for divisions by zero) and fill initial NaN with 0
-        growth_rates = growth.replace([np.inf, -np.inf], 0).fillna(0)
-        return growth_rates.round(2).tolist()
+        return growth_rates(np.asarray(values, dtype=np.float64)).tolist()
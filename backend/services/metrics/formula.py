@@ -0,0 +1,245 @@
+import ast
+import re
+from abc import abstractmethod
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+
+from schemas.chart import ChartData
+from .aligned_series import align, series_from_arrays
+from .base_metric import UNITS, BaseMetric
+
+# 公式中引用的指标名 / 新增公式指标的名称
+METRIC_NAME_PATTERN = re.compile(r"^[a-z][a-z0-9_]*$")
+
+# 函数名 → (最少参数个数, 最多参数个数)
+FUNCTIONS: Dict[str, Tuple[int, int]] = {
+    "pct_change": (1, 2),
+    "lag": (1, 2),
+    "diff": (1, 2),
+    "abs": (1, 1),
+    "min": (2, 8),
+    "max": (2, 8),
+}
+
+_Kernel = Callable[[Mapping[str, np.ndarray], np.ndarray], np.ndarray]
+
+
+class FormulaError(ValueError):
+    """Raised when a metric formula cannot be parsed or references unknown names."""
+
+
+def _shift(values: np.ndarray, positions: np.ndarray, periods: int) -> np.ndarray:
+    """`values` shifted `periods` rows down within each series; rows without a predecessor are NaN."""
+    shifted = np.full(values.shape, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    shifted[positions < periods] = np.nan
+    return shifted
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    # 与 RatioMetric 一致：分母为 0 时结果为 NaN
+    return numerator / np.where(denominator == 0, np.nan, denominator)
+
+
+_BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: _divide,
+    ast.Pow: np.power,
+}
+
+
+def _periods_argument(call: ast.Call) -> int:
+    if len(call.args) < 2:
+        return 1
+    node = call.args[1]
+    if not (isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool) and node.value >= 1):
+        raise FormulaError(f"The periods argument of {call.func.id}() must be a positive integer literal")
+    return node.value
+
+
+class CompiledFormula:
+    """
+    A parsed and validated formula, compiled into a tree of NumPy array operations.
+
+    `evaluate` takes one float64 array per referenced metric, all aligned row by row, plus the
+    position of each row within its series (0 for the first year of each company), so the same
+    kernel evaluates one company's series or a stacked multi-company frame.
+    """
+
+    def __init__(self, source: str):
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise FormulaError(f"Invalid formula syntax: {e.msg}") from None
+        self.source = ast.unparse(tree)
+        self._names: Dict[str, None] = {}
+        self._kernel = self._compile(tree.body)
+        # 公式引用的指标名（按首次出现顺序）
+        self.names: Tuple[str, ...] = tuple(self._names)
+        if not self.names:
+            raise FormulaError("A formula must reference at least one metric")
+
+    def _compile(self, node: ast.AST) -> _Kernel:
+        if isinstance(node, ast.Name):
+            name = node.id
+            if not METRIC_NAME_PATTERN.match(name):
+                raise FormulaError(f"Invalid metric name '{name}'")
+            self._names[name] = None
+            return lambda columns, positions: columns[name]
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda columns, positions: np.full(positions.shape, value)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self._compile(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            return lambda columns, positions: np.negative(operand(columns, positions))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            operator = _BINARY_OPERATORS[type(node.op)]
+            left, right = self._compile(node.left), self._compile(node.right)
+            return lambda columns, positions: operator(left(columns, positions), right(columns, positions))
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self._compile_call(node)
+
+        raise FormulaError(f"Unsupported expression: {ast.unparse(node)}")
+
+    def _compile_call(self, call: ast.Call) -> _Kernel:
+        function = call.func.id
+        if function not in FUNCTIONS:
+            raise FormulaError(f"Unknown function '{function}', expected one of: {', '.join(FUNCTIONS)}")
+        min_args, max_args = FUNCTIONS[function]
+        if not min_args <= len(call.args) <= max_args:
+            raise FormulaError(f"{function}() takes {min_args}-{max_args} arguments, got {len(call.args)}")
+
+        if function in ("min", "max"):
+            arguments = [self._compile(arg) for arg in call.args]
+            reduce = np.fmin if function == "min" else np.fmax
+            def kernel(columns, positions):
+                result = arguments[0](columns, positions)
+                for argument in arguments[1:]:
+                    result = reduce(result, argument(columns, positions))
+                return result
+            return kernel
+
+        operand = self._compile(call.args[0])
+        if function == "abs":
+            return lambda columns, positions: np.abs(operand(columns, positions))
+
+        periods = _periods_argument(call)
+        if function == "lag":
+            return lambda columns, positions: _shift(operand(columns, positions), positions, periods)
+        if function == "diff":
+            def kernel(columns, positions):
+                values = operand(columns, positions)
+                return values - _shift(values, positions, periods)
+            return kernel
+        # pct_change：与 pandas 一致，返回比例（非百分比）
+        def kernel(columns, positions):
+            values = operand(columns, positions)
+            return _divide(values, _shift(values, positions, periods)) - 1
+        return kernel
+
+    def evaluate(self, columns: Mapping[str, np.ndarray], positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Evaluates the formula; non-finite results (division by zero, missing inputs) are NaN."""
+        if positions is None:
+            positions = np.arange(len(next(iter(columns.values()))))
+        with np.errstate(all="ignore"):
+            result = np.asarray(self._kernel(columns, positions), dtype=np.float64)
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+
+@lru_cache(maxsize=4096)
+def compile_formula(source: str) -> CompiledFormula:
+    """Parses and compiles a formula once; the compiled plan is cached by its source text."""
+    return CompiledFormula(source)
+
+
+class FormulaMetric(BaseMetric):
+    """
+    Base class of metrics defined by a formula such as `free_cash_flow / net_income`.
+    Concrete classes are created at runtime by `make_formula_metric`.
+    """
+    # 图表数值的展示单位（仅作用于图表，依赖此指标的其他指标使用原始值）
+    value_unit = 1
+    unit: Optional[str] = None
+
+    @property
+    @abstractmethod
+    def formula(self) -> str:
+        """The formula source."""
+        raise NotImplementedError
+
+    @property
+    def chart_title(self) -> str:
+        return self.metric_name
+
+    @property
+    def plan(self) -> CompiledFormula:
+        return compile_formula(self.formula)
+
+    @property
+    def dependencies(self) -> List[str]:
+        return list(self.plan.names)
+
+    def _evaluate(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> Tuple[List[Any], np.ndarray]:
+        names = self.plan.names
+        aligned = align([time_series_data[name] for name in names])
+        result = self.plan.evaluate({name: aligned.values[:, i] for i, name in enumerate(names)})
+        keep = ~np.isnan(result)
+        return [year for year, k in zip(aligned.years, keep) if k], result[keep]
+
+    def compute_series(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        return series_from_arrays(*self._evaluate(time_series_data))
+
+    def compute_frame(self, frame: pd.DataFrame) -> pd.Series:
+        frame = frame.sort_index()
+        positions = frame.groupby(level="company_id").cumcount().to_numpy()
+        columns = {name: frame[name].to_numpy(dtype=np.float64) for name in self.plan.names}
+        return pd.Series(self.plan.evaluate(columns, positions), index=frame.index).dropna()
+
+    def display_frame(self, frame: pd.DataFrame) -> pd.Series:
+        return self.compute_frame(frame) / (self.value_unit or 1)
+
+    def get_chart_data(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> ChartData:
+        if any(not time_series_data.get(name) for name in self.plan.names):
+            return self.no_data_chart()
+
+        categories, values = self._evaluate(time_series_data)
+        if not categories:
+            return self.no_data_chart()
+
+        values = np.round(values / (self.value_unit or 1), 2).tolist()
+        growth_rates = self._calculate_growth_rates(values)
+
+        return self.build_chart(categories, values, growth_rates)
+
+
+def make_formula_metric(name: str, formula: str, *, title: Optional[str] = None, unit: Optional[str] = None) -> Type[FormulaMetric]:
+    """Compiles `formula` and returns a FormulaMetric class registered under `name`."""
+    if not METRIC_NAME_PATTERN.match(name):
+        raise FormulaError(f"Invalid metric name '{name}': use lowercase letters, digits and underscores")
+    if unit is not None and unit not in UNITS:
+        raise FormulaError(f"Unknown unit '{unit}', expected one of: {', '.join(UNITS)}")
+    plan = compile_formula(formula)
+    if name in plan.names:
+        raise FormulaError(f"Formula of '{name}' references itself")
+    return type(f"FormulaMetric[{name}]", (FormulaMetric,), {
+        "metric_name": name,
+        "formula": plan.source,
+        "plan": plan,
+        "chart_title": title or name,
+        "value_unit": UNITS[unit] if unit else 1,
+        "unit": unit,
+        "__module__": __name__,
+    })
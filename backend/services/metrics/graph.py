@@ -0,0 +1,135 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from .base_metric import BaseMetric
+from .registry import MetricRegistry
+
+
+class MetricCycleError(ValueError):
+    """Raised when derived metrics depend on each other in a cycle."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Metric dependency cycle: {' -> '.join(cycle)}")
+
+
+class MetricGraph:
+    """
+    Dependency DAG of the registered metrics.
+
+    A registered metric with dependencies is a derived node; every other name (single
+    metrics and unregistered names) is a leaf, i.e. a series read from the statement tables.
+    Derived metrics may depend on other derived metrics; the graph resolves the stored
+    leaves they need and the topological order in which to evaluate them. The edges come from
+    the registry's manifest, so building the graph imports no metric module.
+    """
+
+    def __init__(self, registry: MetricRegistry):
+        self.registry = registry
+        self._inputs: Dict[str, List[str]] = {}
+        for name in registry:
+            dependencies = registry.dependencies(name)
+            if dependencies:
+                self._inputs[name] = dependencies
+        self.validate()
+
+    def metric(self, name: str) -> Optional[BaseMetric]:
+        """The shared instance of a registered metric."""
+        return self.registry.get(name)
+
+    def is_derived(self, name: str) -> bool:
+        return name in self._inputs
+
+    def inputs(self, name: str) -> List[str]:
+        """Direct dependencies of a derived metric (empty for a leaf)."""
+        return self._inputs.get(name, [])
+
+    def validate(self) -> None:
+        """Raises MetricCycleError if the derived metrics contain a dependency cycle."""
+        state: Dict[str, int] = {}  # 1 = 访问中, 2 = 已完成
+        for root in self._inputs:
+            if state.get(root) == 2:
+                continue
+            path, stack = [root], [iter(self.inputs(root))]
+            state[root] = 1
+            while stack:
+                child = next(stack[-1], None)
+                if child is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state.get(child) == 1:
+                    raise MetricCycleError(path[path.index(child):] + [child])
+                elif state.get(child) is None and self.is_derived(child):
+                    state[child] = 1
+                    path.append(child)
+                    stack.append(iter(self.inputs(child)))
+
+    def plan(self, names: Iterable[str]) -> List[str]:
+        """
+        Derived metrics needed to evaluate `names` (themselves included), in topological
+        order: every metric comes after all the derived metrics it depends on.
+        """
+        order: List[str] = []
+        seen = set()
+
+        def visit(name: str) -> None:
+            if name in seen or not self.is_derived(name):
+                return
+            seen.add(name)
+            for dep in self.inputs(name):
+                visit(dep)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def leaves(self, names: Iterable[str]) -> List[str]:
+        """Stored series needed (transitively) to evaluate `names`, in first-seen order."""
+        names = list(names)
+        leaves = [name for name in names if not self.is_derived(name)]
+        for derived in self.plan(names):
+            leaves.extend(dep for dep in self.inputs(derived) if not self.is_derived(dep))
+        return list(dict.fromkeys(leaves))
+
+
+class MetricEvaluator:
+    """
+    Evaluates metrics of one company over the DAG, memoizing every intermediate series.
+
+    Built from the stored leaf series of one request; a derived series shared by several
+    requested metrics (or by several levels of the DAG) is computed once.
+    """
+
+    def __init__(self, graph: MetricGraph, leaf_series: Dict[str, List[Dict[str, Any]]]):
+        self.graph = graph
+        self._series: Dict[str, Optional[List[Dict[str, Any]]]] = dict(leaf_series)
+
+    def series(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        """The raw (unrounded) series of a leaf or derived metric, or None without data."""
+        if name not in self._series:
+            for node in self.graph.plan([name]):
+                if node in self._series:
+                    continue
+                inputs = {dep: self._series.get(dep) for dep in self.graph.inputs(node)}
+                if any(not data for data in inputs.values()):
+                    self._series[node] = None
+                else:
+                    self._series[node] = self.graph.metric(node).compute_series(inputs) or None
+        return self._series.get(name)
+
+    def missing(self, name: str) -> Optional[str]:
+        """The first stored dependency of `name` without data, or None."""
+        return next((leaf for leaf in self.graph.leaves([name]) if not self._series.get(leaf)), None)
+
+    def inputs(self, name: str) -> Dict[str, List[Dict[str, Any]]]:
+        """The direct inputs of a metric, as passed to its `get_chart_data`."""
+        return {dep: self.series(dep) or [] for dep in (self.graph.inputs(name) or [name])}
+
+
+@lru_cache(maxsize=1)
+def get_metric_graph() -> MetricGraph:
+    """The DAG of the registered metrics, built and checked for cycles on first use."""
+    from . import METRIC_REGISTRY
+
+    return MetricGraph(METRIC_REGISTRY)
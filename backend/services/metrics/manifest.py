@@ -0,0 +1,67 @@
+"""
+Generated manifest of the built-in metrics: name → module:class, dependencies and unit.
+
+The registry reads `manifest.json` instead of importing every metric module at startup.
+Regenerate it after adding or changing a metric class (from backend/):
+    python -m services.metrics.manifest           # rewrite manifest.json
+    python -m services.metrics.manifest --check   # exit 1 if manifest.json is stale
+"""
+import argparse
+import importlib
+import inspect
+import json
+import pkgutil
+import sys
+from pathlib import Path
+from typing import Dict
+
+from services.metrics.base_metric import BaseMetric
+from services.metrics.registry import MANIFEST_PATH, ManifestEntry
+
+
+def build_manifest() -> Dict[str, ManifestEntry]:
+    """
+    Discovers the metric classes by importing every module of this package: concrete
+    BaseMetric subclasses defined in the module, with `register_metric` enabled.
+    """
+    package = BaseMetric.__module__.rpartition(".")[0]
+    manifest: Dict[str, ManifestEntry] = {}
+    for _, name, _ in pkgutil.iter_modules([str(Path(__file__).parent)]):
+        module = importlib.import_module(f"{package}.{name}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__ or not issubclass(cls, BaseMetric) or inspect.isabstract(cls):
+                continue
+            instance = cls()
+            if instance.register_metric:
+                manifest[instance.metric_name] = ManifestEntry(
+                    module=module.__name__,
+                    cls=cls.__name__,
+                    dependencies=list(instance.dependencies),
+                    unit=instance.value_unit,
+                )
+    return dict(sorted(manifest.items()))
+
+
+def dump_manifest(manifest: Dict[str, ManifestEntry]) -> str:
+    return json.dumps({name: entry._asdict() for name, entry in manifest.items()}, ensure_ascii=False, indent=2) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only verify that manifest.json is up to date")
+    args = parser.parse_args()
+
+    content = dump_manifest(build_manifest())
+    current = MANIFEST_PATH.read_text(encoding="utf-8") if MANIFEST_PATH.exists() else None
+    if args.check:
+        if content != current:
+            print(f"{MANIFEST_PATH} is out of date; run `python -m services.metrics.manifest`")
+            sys.exit(1)
+        print(f"{MANIFEST_PATH} is up to date")
+        return
+    MANIFEST_PATH.write_text(content, encoding="utf-8")
+    print(f"Wrote {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 from abc import abstractmethod
 from typing import List, Dict, Any
+import numpy as np
 import pandas as pd
-from .base_metric import BaseMetric, ratio_label, value_label
-from schemas.chart import ChartData, ChartAxis, ChartSeries, ChartTitle, ChartLegend
+from .aligned_series import align, series_arrays, series_from_arrays
+from .base_metric import BaseMetric
+from schemas.chart import ChartData
 
 class MultiMetric(BaseMetric):
     """
@@ -44,62 +46,45 @@ class MultiMetric(BaseMetric):
         """
         Calculates the metric values from the provided time series data for dependent metrics.
         """
-        # Fetch data for all dependent metrics and store in a dictionary
-        dependent_dfs = {}
-        for metric_name in self.dependent_metrics:
-            data = time_series_data.get(metric_name)
-            if not data:
-                # If any dependent metric data is missing, we cannot calculate
-                return ChartData(
-                    title=ChartTitle(text=f"{self.chart_title} (No Data)"),
-                    series=[]
-                )
-            dependent_dfs[metric_name] = pd.DataFrame(data).set_index("year")
+        # If any dependent metric data is missing, we cannot calculate
+        if any(not time_series_data.get(metric_name) for metric_name in self.dependent_metrics):
+            return self.no_data_chart()
 
-        # Merge all dependent dataframes into a single dataframe, aligning by year
-        # Use 'outer' join to keep all years, then fill NaNs if necessary (e.g., with 0)
-        # The choice of fillna(0) depends on the specific operation.
-        # For sum/average, 0 might be appropriate. For other operations, it might need adjustment.
-        aligned_df = pd.DataFrame()
-        for metric_name, df in dependent_dfs.items():
-            aligned_df = aligned_df.merge(df["value"].rename(metric_name),
-                                          left_index=True,
-                                          right_index=True,
-                                          how='outer')
-        
-        # Drop rows where any of the dependent metrics are NaN (meaning no data for that year)
-        # Or, depending on the operation, you might want to fill NaNs.
-        aligned_df = aligned_df.dropna()
+        calculated = self.compute_series(time_series_data)
 
-        if aligned_df.empty:
-            return ChartData(
-                title=ChartTitle(text=f"{self.chart_title} (No Data)"),
-                series=[]
-            )
+        if not calculated:
+            return self.no_data_chart()
 
-        # Calculate the series values using the abstract method defined by the subclass
-        calculated_series = self._calculate_series_values(aligned_df)
-        
-        if calculated_series.empty:
-            return ChartData(
-                title=ChartTitle(text=f"{self.chart_title} (No Data)"),
-                series=[]
-            )
-
-        categories = calculated_series.index.tolist()
-        values = calculated_series.round(2).tolist()
+        categories, values = series_arrays(calculated)
+        values = np.round(values, 2).tolist()
         growth_rates = self._calculate_growth_rates(values)
 
-        return ChartData(
-            title=ChartTitle(text=self.chart_title),
-            legend=ChartLegend(data=["值", "增长率"], bottom=2,left=150),
-            xAxis=[ChartAxis(type="category", data=categories, name="", nameLocation="middle", nameGap=30, axisLabel={"show": False})],
-            yAxis=[
-                ChartAxis(type="value", axisLabel={"formatter": "{value}"}),
-                ChartAxis(type="value", position="right", axisLabel={"formatter": "{value} %"})
-            ],
-            series=[
-                ChartSeries(name="值", type="bar", data=values, label=value_label),
-                ChartSeries(name="增长率", type="line", yAxisIndex=1, data=growth_rates, smooth=True, label=ratio_label),
-            ]
+        return self.build_chart(categories, values, growth_rates)
+
+    def compute_series(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Align all dependent metrics on the sorted union of years in one pass, then keep
+        # only the years where every dependent metric has a value
+        aligned = align([time_series_data[metric_name] for metric_name in self.dependent_metrics]).complete()
+        if not aligned.years:
+            return []
+
+        aligned_df = pd.DataFrame(
+            aligned.values,
+            index=pd.Index(aligned.years, name="year"),
+            columns=list(self.dependent_metrics),
         )
+        # Calculate the series values using the abstract method defined by the subclass
+        calculated_series = self._calculate_series_values(aligned_df)
+        return series_from_arrays(calculated_series.index.tolist(), calculated_series.to_numpy(dtype=np.float64))
+
+    def compute_frame(self, frame: pd.DataFrame) -> pd.Series:
+        # 子类的计算可能依赖时间顺序（如 pct_change），因此逐公司调用
+        aligned = frame[self.dependent_metrics].dropna()
+        results = {
+            company_id: self._calculate_series_values(group.droplevel("company_id"))
+            for company_id, group in aligned.groupby(level="company_id")
+        }
+        results = {company_id: values for company_id, values in results.items() if not values.empty}
+        if not results:
+            return pd.Series(dtype=float, index=frame.index[:0])
+        return pd.concat(results, names=["company_id", "year"])
@@ -0,0 +1,153 @@
+import ast
+from functools import lru_cache
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .formula import CompiledFormula, FormulaError, compile_formula
+
+# 比较运算符 → NumPy 向量化比较（NaN 参与比较恒为 False）
+_COMPARISONS = {
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+# 窗口函数：条件在最近 n 期中每期都成立 / 至少一期成立
+WINDOW_FUNCTIONS = ("all_last", "any_last")
+
+_Condition = Callable[[Mapping[str, np.ndarray], np.ndarray], np.ndarray]
+
+
+def _rolling_window(matrix: np.ndarray, periods: int, require_all: bool) -> np.ndarray:
+    """
+    Column t of the result tells whether the condition held in every (or any) of columns
+    t-periods+1 … t of the boolean matrix; the first periods-1 columns are False.
+    """
+    result = np.zeros(matrix.shape, dtype=bool)
+    if periods > matrix.shape[1]:
+        return result
+    # 按行累计成立次数，窗口内次数 = 两端累计值之差
+    counts = np.concatenate([np.zeros((matrix.shape[0], 1), dtype=np.int64), np.cumsum(matrix, axis=1)], axis=1)
+    window = counts[:, periods:] - counts[:, :-periods]
+    result[:, periods - 1:] = window == periods if require_all else window > 0
+    return result
+
+
+def evaluate_rows(
+    formula: CompiledFormula,
+    matrices: Mapping[str, np.ndarray],
+    positions: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Evaluates a formula on (company × period) matrices, one row per company. The rows are
+    stacked into the formula's flat columns with the column number as position, so lag and
+    pct_change never reach into another company's series.
+    """
+    shape = matrices[formula.names[0]].shape
+    if positions is None:
+        positions = np.broadcast_to(np.arange(shape[1]), shape)
+    columns = {name: matrices[name].ravel() for name in formula.names}
+    return formula.evaluate(columns, positions.ravel()).reshape(shape)
+
+
+class CompiledPredicate:
+    """
+    A screening predicate such as
+    `all_last(free_cash_flow_to_net_income_ratio > 1, 3) and asset_liability_ratio < 0.5`,
+    compiled into NumPy operations over (company × period) matrices.
+
+    Comparisons take formula expressions on both sides (see CompiledFormula) and combine with
+    `and`, `or` and `not`; `all_last(condition, n)` / `any_last(condition, n)` require the
+    condition in every / any of the last n periods. Every condition evaluates to a boolean
+    matrix; a company matches when the predicate holds in its last column.
+    """
+
+    def __init__(self, source: str):
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise FormulaError(f"Invalid predicate syntax: {e.msg}") from None
+        self.source = ast.unparse(tree)
+        self._names: Dict[str, None] = {}
+        self._kernel = self._condition(tree.body)
+        # 谓词引用的指标名（按首次出现顺序）
+        self.names: Tuple[str, ...] = tuple(self._names)
+        if not self.names:
+            raise FormulaError("A predicate must reference at least one metric")
+
+    def _condition(self, node: ast.AST) -> _Condition:
+        if isinstance(node, ast.BoolOp):
+            operands = [self._condition(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            def kernel(matrices, positions):
+                result = operands[0](matrices, positions)
+                for operand in operands[1:]:
+                    result = combine(result, operand(matrices, positions))
+                return result
+            return kernel
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = self._condition(node.operand)
+            return lambda matrices, positions: np.logical_not(operand(matrices, positions))
+
+        if isinstance(node, ast.Compare):
+            # 链式比较 a < b < c 等价于 a < b and b < c
+            operands = [self._operand(operand) for operand in [node.left, *node.comparators]]
+            comparisons = [_COMPARISONS[type(op)] for op in node.ops]
+            def kernel(matrices, positions):
+                values = [operand(matrices, positions) for operand in operands]
+                result = comparisons[0](values[0], values[1])
+                for i, compare in enumerate(comparisons[1:], start=1):
+                    result = np.logical_and(result, compare(values[i], values[i + 1]))
+                return result
+            return kernel
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in WINDOW_FUNCTIONS:
+            return self._window_call(node)
+
+        raise FormulaError(
+            f"Expected a condition (comparison, and/or/not, {'/'.join(WINDOW_FUNCTIONS)}), got: {ast.unparse(node)}"
+        )
+
+    def _window_call(self, call: ast.Call) -> _Condition:
+        function = call.func.id
+        if len(call.args) != 2 or call.keywords:
+            raise FormulaError(f"{function}() takes a condition and a number of periods")
+        node = call.args[1]
+        if not (isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool) and node.value >= 1):
+            raise FormulaError(f"The periods argument of {function}() must be a positive integer literal")
+        periods, require_all = node.value, function == "all_last"
+        operand = self._condition(call.args[0])
+        return lambda matrices, positions: _rolling_window(operand(matrices, positions), periods, require_all)
+
+    def _operand(self, node: ast.AST) -> Callable[[Mapping[str, np.ndarray], np.ndarray], np.ndarray]:
+        try:
+            # 常量阈值（含负数）直接参与广播
+            value = float(ast.literal_eval(node))
+            return lambda matrices, positions: value
+        except (ValueError, TypeError, SyntaxError):
+            pass
+        formula = compile_formula(ast.unparse(node))
+        self._names.update(dict.fromkeys(formula.names))
+        return lambda matrices, positions: evaluate_rows(formula, matrices, positions)
+
+    def evaluate(self, matrices: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Evaluates the predicate on one (company × period) float matrix per referenced metric,
+        each row holding a company's series aligned so that its latest period is the last
+        column (missing periods NaN). Returns the boolean matrix of the predicate per period.
+        """
+        shape = next(iter(matrices.values())).shape
+        positions = np.broadcast_to(np.arange(shape[1]), shape)
+        with np.errstate(invalid="ignore"):
+            return np.asarray(self._kernel(matrices, positions), dtype=bool)
+
+
+@lru_cache(maxsize=1024)
+def compile_predicate(source: str) -> CompiledPredicate:
+    """Parses and compiles a predicate once; the compiled plan is cached by its source text."""
+    return CompiledPredicate(source)
@@ -1,8 +1,10 @@
 from abc import abstractmethod
 from typing import List, Dict, Any
+import numpy as np
 import pandas as pd
-from .base_metric import BaseMetric, ratio_label, value_label
-from schemas.chart import ChartData, ChartAxis, ChartSeries, ChartTitle, ChartLegend
+from .aligned_series import align, series_arrays, series_from_arrays
+from .base_metric import BaseMetric
+from schemas.chart import ChartData
 
 class RatioMetric(BaseMetric):
     """
@@ -13,6 +15,8 @@ class RatioMetric(BaseMetric):
     Subclasses must define `metric_name`, `numerator_metric`, `denominator_metric`,
     and can override `chart_title`.
     """
+    value_series_name = "比率"
+
     @property
     @abstractmethod
     def numerator_metric(self) -> str:
@@ -44,39 +48,30 @@ class RatioMetric(BaseMetric):
         denominator_data = time_series_data.get(self.denominator_metric)
 
         if not numerator_data or not denominator_data:
-            return ChartData(
-                title=ChartTitle(text=f"{self.chart_title} (No Data)"),
-                series=[]
-            )
+            return self.no_data_chart()
 
         # --- Data Processing ---
-        df_num = pd.DataFrame(numerator_data).set_index("year")
-        df_den = pd.DataFrame(denominator_data).set_index("year")
+        ratio = self.compute_series(time_series_data)
 
-        # Align data by year and calculate the ratio
-        # Replace 0 in denominator with NA to avoid division by zero, then fill resulting NaNs with 0
-        df_ratio = (df_num["value"] / df_den["value"].replace(0, pd.NA)).dropna()
-        
-        if df_ratio.empty:
-            return ChartData(
-                title=ChartTitle(text=f"{self.chart_title} (No Data)"),
-                series=[]
-            )
+        if not ratio:
+            return self.no_data_chart()
 
-        categories = df_ratio.index.tolist()
-        values = df_ratio.round(2).tolist()
+        categories, values = series_arrays(ratio)
+        values = np.round(values, 2).tolist()
         growth_rates = self._calculate_growth_rates(values)
 
-        return ChartData(
-            title=ChartTitle(text=self.chart_title),
-            legend=ChartLegend(data=["比率", "增长率"], bottom=2,left=150),
-            xAxis=[ChartAxis(type="category", data=categories, name="", nameLocation="middle", nameGap=30, axisLabel={"show": False})],
-            yAxis=[
-                ChartAxis(type="value", axisLabel={"formatter": "{value}"}),
-                ChartAxis(type="value", position="right", axisLabel={"formatter": "{value} %"})
-            ],
-            series=[
-                ChartSeries(name="比率", type="bar", data=values, label=value_label),
-                ChartSeries(name="增长率", type="line", yAxisIndex=1, data=growth_rates, smooth=True, label=ratio_label),
-            ]
-        )
+        return self.build_chart(categories, values, growth_rates)
+
+    def compute_series(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Align data by year and calculate the ratio
+        # A zero denominator yields NaN, and years missing either side are dropped
+        aligned = align([time_series_data[self.numerator_metric], time_series_data[self.denominator_metric]], sort=False)
+        numerator, denominator = aligned.values[:, 0], aligned.values[:, 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = numerator / np.where(denominator == 0, np.nan, denominator)
+        keep = ~np.isnan(ratio)
+        return series_from_arrays([year for year, k in zip(aligned.years, keep) if k], ratio[keep])
+
+    def compute_frame(self, frame: pd.DataFrame) -> pd.Series:
+        ratio = frame[self.numerator_metric] / frame[self.denominator_metric].replace(0, np.nan)
+        return ratio.dropna()
@@ -0,0 +1,109 @@
+import importlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Type
+
+from .base_metric import BaseMetric
+
+
+class ManifestEntry(NamedTuple):
+    """Where a built-in metric lives and what it needs, as recorded in the generated manifest."""
+    module: str
+    cls: str
+    dependencies: List[str]
+    unit: int
+
+
+MANIFEST_PATH = Path(__file__).with_name("manifest.json")
+
+
+def load_manifest() -> Dict[str, ManifestEntry]:
+    """Reads the generated manifest (see `services.metrics.manifest`)."""
+    data = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    return {name: ManifestEntry(**entry) for name, entry in data.items()}
+
+
+class MetricRegistry:
+    """
+    Registry of metric names → metric classes.
+
+    Built-in metrics are described by the generated manifest and their modules are imported on
+    first use; metrics registered at runtime (formulas) are added as classes. Dependencies are
+    answered from the manifest without importing anything. Each metric has one shared instance.
+    """
+
+    def __init__(self, manifest: Dict[str, ManifestEntry]):
+        self._manifest = dict(manifest)
+        self._classes: Dict[str, Type[BaseMetric]] = {}
+        self._instances: Dict[str, BaseMetric] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_classes(cls, classes: Dict[str, Type[BaseMetric]]) -> "MetricRegistry":
+        registry = cls({})
+        for name, metric_class in classes.items():
+            registry.register(name, metric_class)
+        return registry
+
+    def copy(self) -> "MetricRegistry":
+        """A registry sharing the loaded classes and instances, to validate a change before applying it."""
+        other = MetricRegistry(self._manifest)
+        other._classes, other._instances = dict(self._classes), dict(self._instances)
+        return other
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._manifest or name in self._classes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def names(self) -> List[str]:
+        return list(dict.fromkeys([*self._manifest, *self._classes]))
+
+    def is_builtin(self, name: str) -> bool:
+        """True for the metrics implemented as classes in this package."""
+        return name in self._manifest
+
+    def dependencies(self, name: str) -> List[str]:
+        entry = self._manifest.get(name)
+        if entry is not None:
+            return list(entry.dependencies)
+        metric = self.get(name)
+        return list(metric.dependencies) if metric is not None else []
+
+    def get_class(self, name: str) -> Optional[Type[BaseMetric]]:
+        """The metric class, importing its module on first use; None for unknown names."""
+        metric_class = self._classes.get(name)
+        if metric_class is None and name in self._manifest:
+            entry = self._manifest[name]
+            metric_class = getattr(importlib.import_module(entry.module), entry.cls)
+            self._classes[name] = metric_class
+        return metric_class
+
+    def get(self, name: str) -> Optional[BaseMetric]:
+        """The shared instance of a metric; None for unknown names."""
+        metric = self._instances.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._instances.get(name)
+                if metric is None:
+                    metric_class = self.get_class(name)
+                    if metric_class is None:
+                        return None
+                    metric = self._instances[name] = metric_class()
+        return metric
+
+    def register(self, name: str, metric_class: Type[BaseMetric]) -> None:
+        """Adds or replaces a runtime metric (e.g. a formula)."""
+        with self._lock:
+            self._classes[name] = metric_class
+            self._instances.pop(name, None)
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._classes.pop(name, None)
+            self._instances.pop(name, None)
@@ -1,7 +1,8 @@
 from abc import abstractmethod
 from typing import List, Dict, Any
-from .base_metric import BaseMetric, ratio_label, value_label
-from schemas.chart import ChartData, ChartAxis, ChartSeries, ChartTitle, ChartLegend
+import pandas as pd
+from .base_metric import BaseMetric
+from schemas.chart import ChartData
 
 class SingleMetric(BaseMetric):
     """
@@ -24,6 +25,10 @@ class SingleMetric(BaseMetric):
         """The name for the primary data series in the chart (e.g., "资产", "收入")."""
         raise NotImplementedError
 
+    @property
+    def value_series_name(self) -> str:
+        return self.series_name
+
     def get_chart_data(self, time_series_data: Dict[str, List[Dict[str, Any]]]) -> ChartData:
         """
         Generates the chart data by processing the time series data for this metric.
@@ -31,25 +36,14 @@ class SingleMetric(BaseMetric):
         metric_data = time_series_data.get(self.metric_name, [])
 
         if not metric_data:
-            return ChartData(
-                title=ChartTitle(text=f"{self.chart_title} (No Data)"),
-                series=[]
-            )
+            return self.no_data_chart()
 
         # Use the inherited helper methods for data processing
         categories, values = self._process_time_series_data(metric_data)
         growth_rates = self._calculate_growth_rates(values)
 
-        return ChartData(
-            title=ChartTitle(text=self.chart_title),
-            legend=ChartLegend(data=[self.series_name, "增长率"], bottom=2,left=150),
-            xAxis=[ChartAxis(type="category", data=categories, name="", nameLocation="middle", nameGap=30, axisLabel={"show": False})],
-            yAxis=[
-                ChartAxis(type="value", axisLabel={"formatter": "{value}"}),
-                ChartAxis(type="value", position="right", axisLabel={"formatter": "{value} %"})
-            ],
-            series=[
-                ChartSeries(name=self.series_name, type="bar", data=values, label=value_label),
-                ChartSeries(name="增长率", type="line", yAxisIndex=1, data=growth_rates, smooth=True, label=ratio_label),
-            ]
-        )
+        return self.build_chart(categories, values, growth_rates)
+
+    def compute_frame(self, frame: pd.DataFrame) -> pd.Series:
+        divisor = self.value_unit or 1
+        return frame[self.metric_name].fillna(0) / divisor
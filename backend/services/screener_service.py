@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from models.company import IndustryCategoryEnum
+from repositories.company_repo import CompanyRepository
+from repositories.financial_repo import FinancialStatementRepository, get_metric_repositories
+from repositories.metric_catalog import metric_catalog
+from schemas.financial import Granularity
+from schemas.pagination import Page
+from schemas.screener import ScreenerMatch
+from services.financial_service import compute_metric_frame
+from services.metrics import METRIC_REGISTRY
+from services.metrics.formula import FormulaError, compile_formula
+from services.metrics.predicate import compile_predicate, evaluate_rows
+
+
+def _right_aligned_matrices(frame: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray, List[str], np.ndarray]:
+    """
+    Turns a (company_id, year) × metric frame into one (company × period) matrix per metric,
+    each row shifted so that the company's latest period with any value is the last column.
+
+    Returns the matrices, the company ids of the rows, the sorted period labels and the index
+    (into the labels) of each company's latest period. Companies without any value are dropped.
+    """
+    company_codes, company_ids = pd.factorize(frame.index.get_level_values("company_id"), sort=True)
+    period_codes, periods = pd.factorize(frame.index.get_level_values("year"), sort=True)
+    shape = (len(company_ids), len(periods))
+
+    # 1. 长表散射成稠密矩阵（缺失期间为 NaN）
+    dense = {}
+    for name in frame.columns:
+        matrix = np.full(shape, np.nan)
+        matrix[company_codes, period_codes] = frame[name].to_numpy(dtype=np.float64)
+        dense[name] = matrix
+
+    # 2. 每家公司的最近一期：任一指标有值的最后一列
+    present = np.zeros(shape, dtype=bool)
+    for matrix in dense.values():
+        present |= ~np.isnan(matrix)
+    keep = present.any(axis=1)
+    latest = shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+
+    # 3. 按行右对齐：最近一期移到最后一列，左侧补 NaN
+    rows = np.flatnonzero(keep)
+    latest = latest[rows]
+    source = latest[:, None] - (shape[1] - 1) + np.arange(shape[1])
+    valid = source >= 0
+    source = np.where(valid, source, 0)
+    aligned = {
+        name: np.where(valid, matrix[rows[:, None], source], np.nan)
+        for name, matrix in dense.items()
+    }
+    return aligned, np.asarray(company_ids)[rows], [str(period) for period in periods], latest
+
+
+class MetricScreenerService:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+        self.all_repos: List[FinancialStatementRepository] = get_metric_repositories()
+        metric_catalog.ensure_loaded(db, self.all_repos)
+
+    def screen(
+        self,
+        where: str,
+        sort_by: Optional[str] = None,
+        descending: bool = True,
+        industry_category: Optional[IndustryCategoryEnum] = None,
+        granularity: Granularity = Granularity.ANNUAL,
+        page: int = 1,
+        limit: int = 50,
+    ) -> Page[ScreenerMatch]:
+        """
+        Screens every company (or every company of an industry) with a predicate over registered
+        metrics, e.g. `all_last(free_cash_flow_to_net_income_ratio > 1, 3) and asset_liability_ratio < 0.5`.
+
+        The metrics of the whole universe are computed in one grouped query, then the predicate
+        is evaluated as array operations on (company × period) matrices aligned on each
+        company's latest period. Matches are ranked by `sort_by` (a formula evaluated at the
+        latest period; missing values last) or by company id, and paginated.
+        """
+        # 1. 编译筛选条件与排序表达式，只允许引用已注册指标
+        predicate = compile_predicate(where)
+        ranking = compile_formula(sort_by) if sort_by else None
+        metric_names = list(dict.fromkeys(predicate.names + (ranking.names if ranking else ())))
+        unknown = [name for name in metric_names if name not in METRIC_REGISTRY]
+        if unknown:
+            raise FormulaError(f"Unknown metrics: {', '.join(unknown)}")
+
+        # 2. 一次查询计算整个公司池的指标值
+        company_ids = None
+        if industry_category is not None:
+            company_ids = [c.id for c in CompanyRepository().get_multi_by_ids_or_industry(self.db, industry_category=industry_category)]
+        frame = compute_metric_frame(self.db, self.all_repos, company_ids, metric_names, granularity)
+        if frame.empty:
+            return Page[ScreenerMatch](items=[], page=page, total_pages=0, total=0)
+
+        # 3. 矩阵化并向量化求值：谓词在每家公司最近一期（最后一列）成立即命中
+        matrices, row_company_ids, periods, latest = _right_aligned_matrices(frame)
+        matched = np.flatnonzero(predicate.evaluate(matrices)[:, -1])
+
+        # 4. 排序（缺失的排序值排在最后，同值按公司ID）
+        scores = None
+        if ranking is not None:
+            scores = evaluate_rows(ranking, matrices)[:, -1]
+            keys = -scores[matched] if descending else scores[matched]
+            matched = matched[np.lexsort((row_company_ids[matched], np.nan_to_num(keys, nan=np.inf)))]
+
+        # 5. 分页，只为当前页查询公司信息
+        total = len(matched)
+        rows = matched[(page - 1) * limit:page * limit]
+        companies = {
+            c.id: c for c in CompanyRepository().get_multi_by_ids_or_industry(self.db, ids=row_company_ids[rows].tolist())
+        }
+        items = []
+        for row in rows:
+            company = companies.get(int(row_company_ids[row]))
+            if company is None:
+                continue
+            values = {name: matrices[name][row, -1] for name in metric_names}
+            items.append(ScreenerMatch(
+                company_id=company.id,
+                name=company.name,
+                ticker=company.ticker,
+                period=periods[latest[row]],
+                values={name: None if np.isnan(value) else round(float(value), 2) for name, value in values.items()},
+                score=None if scores is None or np.isnan(scores[row]) else round(float(scores[row]), 2),
+            ))
+        total_pages = (total + limit - 1) // limit
+        return Page[ScreenerMatch](items=items, page=page, total_pages=total_pages, total=total)
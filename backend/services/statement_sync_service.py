@@ -0,0 +1,90 @@
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from repositories.financial_repo import get_statement_dependencies, FinancialStatementRepository
+from schemas.financial import FinancialStatementType, StatementUpsertSummary, SyncMode, ReportPeriod
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        return date.fromisoformat(value[:10])
+    return None
+
+
+def _incremental_limit(watermark: Dict[Tuple[str, str], Optional[date]], period: ReportPeriod) -> Optional[int]:
+    """
+    Number of newest periods to request so that every period after the latest stored
+    fiscal year, plus that year itself (it may have been amended), is covered.
+    Returns None (no limit) when nothing is stored yet.
+    """
+    years = [int(fiscal_year) for fiscal_year, _ in watermark if str(fiscal_year).isdigit()]
+    if not years:
+        return None
+    years_back = max(date.today().year - max(years), 0) + 2
+    return years_back * 4 if period == ReportPeriod.QUARTER else years_back
+
+
+def select_new_or_amended(
+    repo: FinancialStatementRepository,
+    records: List[Dict[str, Any]],
+    watermark: Dict[Tuple[str, str], Optional[date]],
+) -> List[Dict[str, Any]]:
+    """
+    Keeps the records whose (fiscal_year, period) is not stored yet, or whose filing
+    date is newer than the stored one (an amended filing).
+    """
+    selected = []
+    for record in records:
+        fiscal_year, period, filing_date = repo.codec.peek(record, "fiscal_year", "period", "filing_date")
+        key = (str(fiscal_year), period)
+        if key not in watermark:
+            selected.append(record)
+            continue
+        stored, incoming = watermark[key], _parse_date(filing_date)
+        if incoming and (stored is None or incoming > stored):
+            selected.append(record)
+    return selected
+
+
+def sync_statement(
+    db: Session,
+    *,
+    company_id: int,
+    ticker: str,
+    statement_type: FinancialStatementType,
+    mode: SyncMode = SyncMode.LATEST,
+    period: ReportPeriod = ReportPeriod.ANNUAL,
+    on_fetched: Optional[Callable[[int], None]] = None,
+    fetched: Optional[Any] = None,
+) -> Optional[StatementUpsertSummary]:
+    """
+    Fetches a company's statements from the vendor according to `mode` and upserts them.
+    `on_fetched` is called with the number of records to write between the fetch and the upsert.
+    `fetched` is a LATEST payload already loaded by a batch request (`load_many`); it skips the fetch.
+
+    Returns None when the vendor returned nothing, and an empty summary when an
+    incremental sync found no new or amended period.
+    """
+    loader, repo = get_statement_dependencies(statement_type)
+
+    if mode == SyncMode.LATEST:
+        data = fetched if fetched is not None else loader.load(ticker)
+    elif mode == SyncMode.FULL:
+        data = loader.load_history(ticker, period=period.value)
+    else:
+        watermark = repo.get_period_filing_dates(db, company_id)
+        data = loader.load_history(ticker, period=period.value, limit=_incremental_limit(watermark, period))
+        if data:
+            data = select_new_or_amended(repo, data, watermark)
+            if not data:
+                return StatementUpsertSummary()
+
+    if not data:
+        return None
+    if on_fetched is not None:
+        on_fetched(len(data) if isinstance(data, list) else 1)
+    return repo.bulk_upsert_from_json(db, data=data, company_id=company_id)
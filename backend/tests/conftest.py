@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models.company_metric  # noqa: F401  注册 Company.company_metrics 关系的目标模型
+import models.metric_series  # noqa: F401  注册物化指标序列表（metric_series）
+from models import Base, Company
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database holding one company (id 1)."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    session.add(Company(id=1, name="Apple", ticker="AAPL"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
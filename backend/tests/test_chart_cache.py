@@ -0,0 +1,48 @@
+from repositories.events import StatementEvents, StatementsChanged
+from schemas.chart import ChartData, ChartTitle
+from schemas.financial import FinancialStatementType as T
+from services.chart_cache import ChartCache
+
+
+def _chart(text):
+    return ChartData(title=ChartTitle(text=text), series=[])
+
+
+def test_lru_eviction_and_ttl():
+    cache = ChartCache(max_entries=2, ttl_seconds=60)
+    cache.put(1, "a", _chart("a"), [T.INCOME])
+    cache.put(1, "b", _chart("b"), [T.INCOME])
+    assert cache.get(1, "a").title.text == "a"  # a 变为最近使用
+    cache.put(1, "c", _chart("c"), [T.INCOME])
+
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "c") is not None
+    assert cache.stats()["evictions"] == 1
+
+    expired = ChartCache(max_entries=2, ttl_seconds=0)
+    expired.put(1, "a", _chart("a"), [T.INCOME])
+    assert expired.get(1, "a") is None
+    assert expired.stats()["expirations"] == 1
+
+
+def test_upsert_event_invalidates_only_dependent_charts():
+    cache, events = ChartCache(max_entries=10, ttl_seconds=60), StatementEvents()
+    events.subscribe(cache.on_statements_changed)
+    cache.put(1, "free_cash_flow", _chart("fcf"), [T.CASH])
+    cache.put(1, "total_assets", _chart("ta"), [T.BALANCE])
+    cache.put(2, "free_cash_flow", _chart("fcf"), [T.CASH])
+
+    events.publish(StatementsChanged(T.CASH, 1))
+
+    assert cache.get(1, "free_cash_flow") is None
+    assert cache.get(1, "total_assets") is not None
+    assert cache.get(2, "free_cash_flow") is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_chart_computed_across_a_write_is_not_cached():
+    cache = ChartCache(max_entries=10, ttl_seconds=60)
+    generation = cache.generation(1)
+    cache.invalidate(1, T.INCOME)
+    cache.put(1, "net_income", _chart("stale"), [T.INCOME], generation=generation)
+    assert cache.get(1, "net_income") is None
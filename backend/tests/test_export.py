@@ -0,0 +1,64 @@
+import csv
+import io
+
+import pytest
+
+from models import Company
+from repositories.financial_repo import CashStatementRepository, IncomeStatementRepository
+from services.export_service import INTEGER, NUMBER, STRING, ExportColumn, _export, export_statements
+from schemas.export import ExportFormat
+from schemas.financial import FinancialStatementType
+
+COLUMNS = [ExportColumn("company_id", INTEGER), ExportColumn("period", STRING), ExportColumn("net_income", NUMBER)]
+CHUNKS = [
+    {"company_id": [1, 1], "period": ["2023", "2024"], "net_income": [1.5, None]},
+    {"company_id": [2], "period": ["2024"], "net_income": [-3.0]},
+]
+
+
+def test_csv_export_streams_every_chunk():
+    export = _export(ExportFormat.CSV, COLUMNS, lambda: iter(CHUNKS))
+    rows = list(csv.reader(io.StringIO(b"".join(export.body).decode("utf-8"))))
+    assert rows == [["company_id", "period", "net_income"], ["1", "2023", "1.5"], ["1", "2024", ""], ["2", "2024", "-3.0"]]
+
+
+def test_parquet_export_writes_one_row_group_per_chunk():
+    pq = pytest.importorskip("pyarrow.parquet")
+    export = _export(ExportFormat.PARQUET, COLUMNS, lambda: iter(CHUNKS))
+    data = io.BytesIO(b"".join(export.body))
+    assert pq.ParquetFile(data).num_row_groups == 2
+    assert pq.read_table(data).to_pydict() == {"company_id": [1, 1, 2], "period": ["2023", "2024", "2024"], "net_income": [1.5, None, -3.0]}
+
+
+def _statement(symbol, year, **values):
+    return {"date": f"{year}-12-31", "symbol": symbol, "filingDate": f"{year + 1}-02-01", "fiscalYear": str(year), "period": "FY", **values}
+
+
+def test_statement_export_merges_core_and_eav_rows(db):
+    db.add_all([Company(id=3, name="Microsoft", ticker="MSFT"), Company(id=2, name="Nvidia", ticker="NVDA")])
+    db.commit()
+    income, cash = IncomeStatementRepository(), CashStatementRepository()
+    # 公司 id 与报表主键顺序不一致：先写入公司 3，再写入公司 1 和 2
+    for company_id, symbol in [(3, "MSFT"), (1, "AAPL"), (2, "NVDA")]:
+        income.bulk_upsert_from_json(db, data=[
+            _statement(symbol, 2023, revenue=company_id * 100, auditor=f"auditor-{company_id}"),
+            # 利润表的 EAV 数值属性 inventory 与现金流量表的整数核心列同名
+            _statement(symbol, 2024, revenue=company_id * 100 + 1, customMargin=company_id / 10, inventory=company_id + 0.5),
+        ], company_id=company_id)
+    cash.bulk_upsert_from_json(db, data=_statement("AAPL", 2024, inventory=7), company_id=1)
+
+    # 分块边界落在公司 2 的两张报表之间
+    export = export_statements(db, [FinancialStatementType.INCOME, FinancialStatementType.CASH], [1, 2, 3], ExportFormat.CSV, chunk_size=3)
+    rows = list(csv.DictReader(io.StringIO(b"".join(export.body).decode("utf-8"))))
+    assert list(rows[0])[:6] == ["statement_type", "company_id", "symbol", "fiscal_year", "period", "date"]
+    assert [(row["statement_type"], row["company_id"], row["fiscal_year"]) for row in rows] == [
+        ("income", "1", "2023"), ("income", "1", "2024"), ("income", "2", "2023"),
+        ("income", "2", "2024"), ("income", "3", "2023"), ("income", "3", "2024"),
+        ("cash", "1", "2024"),
+    ]
+    assert [(row["revenue"], row["auditor"], row["custom_margin"], row["inventory"]) for row in rows] == [
+        ("100", "auditor-1", "", ""), ("101", "", "0.1", "1.5"),
+        ("200", "auditor-2", "", ""), ("201", "", "0.2", "2.5"),
+        ("300", "auditor-3", "", ""), ("301", "", "0.3", "3.5"),
+        ("", "", "", "7.0"),
+    ]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from modules.data_loader.fmp_batch_loader import FMPBatchLoader
+
+
+class _StubFMPHandler(BaseHTTPRequestHandler):
+    """Answers `/<endpoint>?symbol=X` with `[{"symbol": X, "endpoint": <endpoint>}]`; symbol BAD returns 500."""
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(0.05)
+            url = urlparse(self.path)
+            symbol = parse_qs(url.query)["symbol"][0]
+            if symbol == "BAD":
+                self.send_response(500)
+                self.end_headers()
+                return
+            body = json.dumps([{"symbol": symbol, "endpoint": url.path.strip("/")}]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _StubFMPHandler.in_flight = _StubFMPHandler.max_in_flight = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubFMPHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_many_respects_concurrency_cap(stub_server):
+    loader = FMPBatchLoader("test-key", base_url=stub_server, concurrency=4)
+    pairs = [(f"T{i}", endpoint) for i in range(10) for endpoint in ("balance-sheet-statement", "cash-flow-statement")]
+
+    results = loader.fetch_many_sync(pairs)
+
+    assert set(results) == set(pairs)
+    for (symbol, endpoint), payload in results.items():
+        assert payload == [{"symbol": symbol, "endpoint": endpoint}]
+    assert 1 < _StubFMPHandler.max_in_flight <= 4
+
+
+def test_fetch_many_reports_failed_pairs_as_none(stub_server):
+    loader = FMPBatchLoader("test-key", base_url=stub_server, concurrency=2)
+
+    results = loader.fetch_many_sync([("AAPL", "income-statement"), ("BAD", "income-statement")])
+
+    assert results[("AAPL", "income-statement")] == [{"symbol": "AAPL", "endpoint": "income-statement"}]
+    assert results[("BAD", "income-statement")] is None
+
+
+def test_batches_share_one_client_until_closed(stub_server):
+    loader = FMPBatchLoader("test-key", base_url=stub_server, concurrency=2)
+    pairs = [("AAPL", "income-statement")]
+
+    loader.fetch_many_sync(pairs)
+    client = loader._client
+    # 可在其他事件循环中 await；请求仍在 loader 自己的循环里复用同一个连接池
+    assert asyncio.run(loader.fetch_many(pairs))[pairs[0]] == [{"symbol": "AAPL", "endpoint": "income-statement"}]
+    assert loader._client is client
+
+    loader.close()
+    assert client.is_closed and loader._client is None
+    # 关闭后再次使用时重新创建
+    assert loader.fetch_many_sync(pairs)[pairs[0]] is not None
+    loader.close()
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.exceptions import VendorUnavailableError
+from modules.data_loader.fmp_batch_loader import FMPBatchLoader
+from modules.data_loader.fmp_loader import FMPBaseLoader
+from modules.data_loader.resilience import TokenBucket, VendorGuard
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """Returns the queued status codes in order (429 carries Retry-After: 0), then 200."""
+    statuses = []
+    calls = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.calls += 1
+        code = cls.statuses.pop(0) if cls.statuses else 200
+        body = json.dumps([{"symbol": "AAPL"}]).encode() if code == 200 else b""
+        self.send_response(code)
+        if code == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server():
+    _FlakyHandler.statuses, _FlakyHandler.calls = [], 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _guard(**overrides):
+    options = dict(rate_limit_per_minute=60_000, burst=10, max_retries=3, backoff_base=0.001,
+                   backoff_max=0.01, failure_threshold=3, reset_timeout=0.2)
+    options.update(overrides)
+    return VendorGuard("FMP", **options)
+
+
+def test_token_bucket_spaces_requests_beyond_burst():
+    bucket = TokenBucket(rate_per_second=100, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.01, abs=2e-3)
+    assert waits[3] == pytest.approx(0.02, abs=2e-3)
+
+
+def test_retries_throttling_and_server_errors(flaky_server):
+    _FlakyHandler.statuses = [429, 503]
+    guard = _guard()
+    loader = FMPBaseLoader("key", base_url=flaky_server, guard=guard)
+
+    assert loader.fetch_all("income-statement", "AAPL") == [{"symbol": "AAPL"}]
+    stats = guard.stats()
+    assert (stats["retries"], stats["throttled"], stats["failures"]) == (2, 1, 1)
+    assert stats["circuit_state"] == "closed"
+
+
+def test_circuit_breaker_fails_fast_then_recovers(flaky_server):
+    _FlakyHandler.statuses = [500] * 3
+    guard = _guard(max_retries=2)
+    loader = FMPBaseLoader("key", base_url=flaky_server, guard=guard)
+
+    with pytest.raises(VendorUnavailableError):
+        loader.fetch_all("income-statement", "AAPL")
+    calls = _FlakyHandler.calls
+    with pytest.raises(VendorUnavailableError, match="circuit breaker is open"):
+        loader.fetch_all("income-statement", "AAPL")
+    assert _FlakyHandler.calls == calls
+
+    # 批量拉取在熔断期间直接返回 None
+    batch = FMPBatchLoader("key", base_url=flaky_server, guard=guard)
+    assert batch.fetch_many_sync([("AAPL", "income-statement")]) == {("AAPL", "income-statement"): None}
+    assert _FlakyHandler.calls == calls
+
+    time.sleep(0.25)
+    assert batch.fetch_many_sync([("AAPL", "income-statement")]) == {("AAPL", "income-statement"): [{"symbol": "AAPL"}]}
+    stats = guard.stats()
+    assert stats["circuit_state"] == "closed"
+    assert stats["circuit_opens"] == 1
+    assert stats["circuit_open_seconds"] >= 0.2
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from models.base import now_cst
+from models.ingest_job import IngestJob, IngestJobStatus
+from modules.workers import ingest_worker
+from modules.workers.ingest_worker import IngestWorkerPool
+from repositories.ingest_job_repo import IngestJobRepository
+from schemas.financial import StatementUpsertSummary
+
+
+def _job(db, status, updated_at=None):
+    job = IngestJob(company_id=1, ticker="AAPL", statement_type="income", status=status)
+    db.add(job)
+    db.commit()
+    if updated_at is not None:
+        job.updated_at = updated_at
+        db.commit()
+    return job.id
+
+
+def test_claim_is_atomic(db):
+    repo = IngestJobRepository()
+    job_id = _job(db, IngestJobStatus.PENDING)
+    assert repo.claim(db, job_id).status == IngestJobStatus.RUNNING
+    # 第二个进程 / 线程认领同一任务失败
+    assert repo.claim(db, job_id) is None
+
+
+def test_start_requeues_only_stale_running_jobs(db, monkeypatch):
+    pending = _job(db, IngestJobStatus.PENDING)
+    stale = _job(db, IngestJobStatus.RUNNING, updated_at=now_cst() - timedelta(hours=2))
+    running = _job(db, IngestJobStatus.RUNNING, updated_at=now_cst())
+    _job(db, IngestJobStatus.SUCCEEDED)
+
+    synced = []
+    def sync_statement(db, *, on_fetched, **kwargs):
+        # 拉取完成后、upsert 之前刷新进度（心跳）
+        on_fetched(3)
+        synced.append(db.query(IngestJob.message).filter(IngestJob.progress == 60).scalar())
+        return StatementUpsertSummary(statements=1)
+    monkeypatch.setattr(ingest_worker, "sync_statement", sync_statement)
+    pool = IngestWorkerPool(pool_size=2, session_factory=lambda: db, stale_after_seconds=3600)
+    submitted = []
+    monkeypatch.setattr(pool, "submit", lambda job_ids: submitted.extend(job_ids))
+    pool.start()
+    pool.shutdown()
+    assert submitted == [pending, stale]
+
+    # 同一任务被两个进程各入队一次：只执行一次
+    for job_id in submitted + submitted:
+        pool._run(job_id)
+    assert synced == ["upserting 3 records", "upserting 3 records"]
+    statuses = {job.id: job.status for job in db.query(IngestJob).all()}
+    assert statuses[running] == IngestJobStatus.RUNNING
+    assert statuses[pending] == statuses[stale] == IngestJobStatus.SUCCEEDED
+
+
+def test_batch_fetches_each_statement_type_once(db, monkeypatch):
+    jobs = [_job(db, IngestJobStatus.PENDING) for _ in range(2)]
+    db.query(IngestJob).filter(IngestJob.id == jobs[1]).update({"ticker": "MSFT"})
+    db.commit()
+
+    class Loader:
+        calls = []
+        def load_many(self, tickers):
+            self.calls.append(list(tickers))
+            return {"AAPL": {"symbol": "AAPL"}, "MSFT": None}
+    monkeypatch.setattr(ingest_worker, "get_statement_dependencies", lambda statement_type: (Loader(), None))
+    synced = []
+    def sync_statement(db, *, fetched, **kwargs):
+        synced.append(fetched["symbol"])
+        return StatementUpsertSummary(statements=1)
+    monkeypatch.setattr(ingest_worker, "sync_statement", sync_statement)
+
+    IngestWorkerPool(pool_size=1, session_factory=lambda: db)._run_batch(jobs)
+    assert Loader.calls == [["AAPL", "MSFT"]]
+    assert synced == ["AAPL"]
+    statuses = [db.get(IngestJob, job_id).status for job_id in jobs]
+    assert statuses == [IngestJobStatus.SUCCEEDED, IngestJobStatus.FAILED]
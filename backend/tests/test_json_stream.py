@@ -0,0 +1,42 @@
+import io
+import json
+
+import pytest
+
+from utils.json_stream import iter_json_records
+
+RECORDS = [{"symbol": "AAPL", "revenue": 391035000000, "note": "résumé ✓"}, {"symbol": "MSFT", "ratio": -1.5e-3, "tags": [1, {"a": None}]}]
+
+
+def _parse(text, read_size=64):
+    return list(iter_json_records(io.BytesIO(text.encode("utf-8")), read_size=read_size))
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 7, 64 * 1024])
+def test_records_split_across_read_boundaries(read_size):
+    # 记录、数字与多字节 UTF-8 字符都可能被读取边界截断
+    text = json.dumps(RECORDS, ensure_ascii=False, indent=2)
+    assert _parse(text, read_size) == RECORDS
+
+
+def test_top_level_object_and_array():
+    assert _parse(json.dumps(RECORDS[0])) == [RECORDS[0]]
+    assert _parse(" [ ] ") == []
+    assert _parse(json.dumps(RECORDS), read_size=5) == RECORDS
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "42",
+    "[1, 2]",
+    '[{"a": 1} {"b": 2}]',
+    '[{"a": 1},]',
+    '[{"a": 1}',
+    '[{"a": 1}, {"b": ',
+    '{"a": 1} {"b": 2}',
+    '[{"a": 1}] x',
+    '{"a": tru}',
+])
+def test_malformed_or_truncated_input_raises_value_error(text):
+    with pytest.raises(ValueError):
+        _parse(text, read_size=3)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.config import config
+from repositories.metric_catalog import metric_catalog
+from repositories.metric_formula_repo import MetricFormulaRepository
+from schemas.metric_formula import MetricFormulaCreate
+from services.metric_formula_service import MetricFormulaService, unregister_formula_metric
+from services.metrics import METRIC_REGISTRY
+from services.metrics.formula import FormulaError, compile_formula, make_formula_metric
+
+
+def _series(*values):
+    return [{"year": str(2021 + i), "value": v} for i, v in enumerate(values)]
+
+
+def test_formula_matches_pandas_semantics():
+    metric = make_formula_metric("growth_margin", "pct_change(net_income) * 100 - revenue / lag(revenue)")()
+    data = {"net_income": _series(10.0, 12.0, 6.0, 3.0), "revenue": _series(100.0, 0.0, 50.0, 60.0)}
+
+    net_income, revenue = (pd.Series([p["value"] for p in data[name]]) for name in ("net_income", "revenue"))
+    expected = net_income.pct_change() * 100 - revenue / revenue.shift().replace(0, np.nan)
+    expected = expected.replace([np.inf, -np.inf], np.nan).dropna()
+
+    assert metric.dependencies == ["net_income", "revenue"]
+    assert [p["value"] for p in metric.compute_series(data)] == expected.tolist()
+    assert [p["year"] for p in metric.compute_series(data)] == ["2022", "2024"]
+
+
+def test_frame_evaluation_shifts_within_each_company():
+    metric = make_formula_metric("ni_diff", "diff(net_income)")()
+    index = pd.MultiIndex.from_tuples([(1, "2021"), (1, "2022"), (2, "2021"), (2, "2022")], names=["company_id", "year"])
+    frame = pd.DataFrame({"net_income": [1.0, 3.0, 10.0, 15.0]}, index=index)
+
+    assert metric.compute_frame(frame).to_dict() == {(1, "2022"): 2.0, (2, "2022"): 5.0}
+
+
+@pytest.mark.parametrize("formula", ["net_income +", "__import__('os')", "net_income.real", "lag(net_income, 0)", "1 + 2"])
+def test_invalid_formulas_are_rejected(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_save_formula_registers_only_what_is_stored(db, monkeypatch):
+    monkeypatch.setattr(metric_catalog, "ensure_loaded", lambda *args: None)
+    monkeypatch.setattr(config.metric_series, "enabled", False)
+    service = MetricFormulaService(db)
+    definition = MetricFormulaCreate(name="doubled_net_income", formula="net_income * 2")
+
+    # 写入失败：不注册
+    def failing_upsert(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+    service.repo.upsert = failing_upsert
+    with pytest.raises(RuntimeError):
+        service.save_formula(definition)
+    assert "doubled_net_income" not in METRIC_REGISTRY
+
+    del service.repo.upsert
+    try:
+        assert service.save_formula(definition).dependencies == ["net_income"]
+        assert "doubled_net_income" in METRIC_REGISTRY
+        assert MetricFormulaRepository().get_by_name(db, "doubled_net_income").formula == "net_income * 2"
+    finally:
+        unregister_formula_metric("doubled_net_income")
+
+
+def test_delete_formula_unregisters_only_what_is_deleted(db, monkeypatch):
+    monkeypatch.setattr(metric_catalog, "ensure_loaded", lambda *args: None)
+    monkeypatch.setattr(config.metric_series, "enabled", False)
+    service = MetricFormulaService(db)
+    service.save_formula(MetricFormulaCreate(name="tripled_net_income", formula="net_income * 3"))
+    try:
+        # 删除失败：公式仍然注册，且仍在数据库中
+        def failing_delete(*args, **kwargs):
+            raise RuntimeError("database unavailable")
+        service.repo.delete_by_name = failing_delete
+        with pytest.raises(RuntimeError):
+            service.delete_formula("tripled_net_income")
+        assert "tripled_net_income" in METRIC_REGISTRY
+        assert MetricFormulaRepository().get_by_name(db, "tripled_net_income") is not None
+
+        del service.repo.delete_by_name
+        assert service.delete_formula("tripled_net_income")
+        assert "tripled_net_income" not in METRIC_REGISTRY
+        assert MetricFormulaRepository().get_by_name(db, "tripled_net_income") is None
+    finally:
+        if "tripled_net_income" in METRIC_REGISTRY:
+            unregister_formula_metric("tripled_net_income")
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from services.metrics.asset_liability_ratio import AssetLiabilityRatioMetric
+from services.metrics.base_metric import grouped_growth_rates
+from services.metrics.net_income import NetIncomeMetric
+
+SERIES = {
+    1: {"total_assets": [100.0, 120.0, 150.0], "total_liabilities": [50.0, 0.0, 60.0], "net_income": [1e9, 2e9, 1.5e9]},
+    2: {"total_assets": [80.0, 90.0, 90.0], "total_liabilities": [40.0, 45.0, 30.0], "net_income": [5e8, None, 7e8]},
+}
+YEARS = ["2021", "2022", "2023"]
+
+
+def _frame(dependencies):
+    rows = [
+        {"company_id": company_id, "year": year, **{dep: series[dep][i] for dep in dependencies}}
+        for company_id, series in SERIES.items() for i, year in enumerate(YEARS)
+    ]
+    return pd.DataFrame(rows).set_index(["company_id", "year"])
+
+
+def _time_series(company_id, dependencies):
+    return {dep: [{"year": year, "value": SERIES[company_id][dep][i]} for i, year in enumerate(YEARS)] for dep in dependencies}
+
+
+def test_compute_frame_matches_per_company_charts():
+    for metric in (NetIncomeMetric(), AssetLiabilityRatioMetric()):
+        dependencies = metric.dependencies or [metric.metric_name]
+        values = metric.compute_frame(_frame(dependencies)).round(2)
+        growth = grouped_growth_rates(values)
+
+        for company_id in SERIES:
+            chart = metric.get_chart_data(_time_series(company_id, dependencies))
+            assert values.loc[company_id].index.tolist() == chart.x_axis[0].data
+            assert values.loc[company_id].tolist() == chart.series[0].data
+            assert growth.loc[company_id].tolist() == chart.series[1].data
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from repositories.financial_repo import BalanceStatementRepository, IncomeStatementRepository, _label_periods, _trailing_twelve_months
+from schemas.financial import SeriesWindow
+
+REPOS = [IncomeStatementRepository(), BalanceStatementRepository()]
+
+
+def _rows(source, metric, values):
+    return [
+        {"source": source, "company_id": 1, "metric": metric, "year": year, "period": period, "value": value}
+        for (year, period), value in values.items()
+    ]
+
+
+def test_trailing_twelve_months():
+    quarters = [("2023", "Q1"), ("2023", "Q2"), ("2023", "Q3"), ("2023", "Q4"), ("2024", "Q1"), ("2024", "Q3"), ("2024", "Q4"), ("2025", "Q1")]
+    revenue = dict(zip(quarters, [1.0, 2.0, 3.0, 4.0, 5.0, 7.0, 8.0, 9.0]))
+    assets = dict(zip(quarters, [10.0, 20.0, 30.0, 40.0, 50.0, 70.0, 80.0, 90.0]))
+    frame = pd.DataFrame(_rows(0, "revenue", revenue) + _rows(1, "total_assets", assets)).sample(frac=1, random_state=0)
+
+    result = _label_periods(_trailing_twelve_months(frame, REPOS)).set_index(["metric", "year"])["value"]
+    # 利润表：连续四个季度求和；2024Q2 缺失，跨过缺口的窗口被丢弃
+    assert result.loc["revenue"].to_dict() == {"2023Q4": 10.0, "2024Q1": 14.0}
+    # 资产负债表：时点值，取季末值
+    assert result.loc["total_assets"].to_dict() == {year + period: value for (year, period), value in assets.items()}
+
+
+def test_series_window_slice():
+    labels = ["2021", "2022", "2023", "2024", "2025"]
+    assert labels[SeriesWindow(last_n=2).slice(labels)] == ["2024", "2025"]
+    assert labels[SeriesWindow(2022, 2024).slice(labels)] == ["2022", "2023", "2024"]
+    assert labels[SeriesWindow(end_year=2023, last_n=5).slice(labels)] == ["2021", "2022", "2023"]
+    quarters = ["2023Q4", "2024Q1", "2024Q2"]
+    assert quarters[SeriesWindow(start_year=2024).slice(quarters)] == ["2024Q1", "2024Q2"]
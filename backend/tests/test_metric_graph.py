@@ -0,0 +1,65 @@
+import pytest
+
+from services.metrics.graph import MetricCycleError, MetricEvaluator, MetricGraph
+from services.metrics.ratio_metric import RatioMetric
+from services.metrics.registry import MetricRegistry
+from services.metrics.single_metric import SingleMetric
+
+
+def _ratio(name, numerator, denominator):
+    return type(name, (RatioMetric,), {
+        "metric_name": name, "chart_title": name, "numerator_metric": numerator, "denominator_metric": denominator,
+    })
+
+
+class _Revenue(SingleMetric):
+    metric_name = "revenue"
+    chart_title = "revenue"
+    series_name = "revenue"
+
+
+REGISTRY = {
+    "revenue": _Revenue,
+    "margin": _ratio("margin", "net_income", "revenue"),
+    "margin_to_assets": _ratio("margin_to_assets", "margin", "total_assets"),
+    "margin_to_liabilities": _ratio("margin_to_liabilities", "margin", "total_liabilities"),
+}
+
+
+def _series(*values):
+    return [{"year": str(2021 + i), "value": v} for i, v in enumerate(values)]
+
+
+def test_plan_is_topological_and_leaves_are_stored_series():
+    graph = MetricGraph(MetricRegistry.from_classes(REGISTRY))
+
+    assert graph.plan(["margin_to_assets", "margin_to_liabilities"]) == ["margin", "margin_to_assets", "margin_to_liabilities"]
+    assert graph.leaves(["margin_to_assets"]) == ["net_income", "revenue", "total_assets"]
+    assert graph.leaves(["revenue"]) == ["revenue"]
+
+
+def test_cycle_is_detected():
+    registry = dict(REGISTRY, margin=_ratio("margin", "net_income", "margin_to_assets"))
+
+    with pytest.raises(MetricCycleError) as excinfo:
+        MetricGraph(MetricRegistry.from_classes(registry))
+    assert excinfo.value.cycle in (["margin", "margin_to_assets", "margin"], ["margin_to_assets", "margin", "margin_to_assets"])
+
+
+def test_shared_intermediate_is_computed_once(monkeypatch):
+    graph = MetricGraph(MetricRegistry.from_classes(REGISTRY))
+    evaluator = MetricEvaluator(graph, {
+        "net_income": _series(10.0, 20.0), "revenue": _series(100.0, 100.0),
+        "total_assets": _series(0.5, 0.4), "total_liabilities": _series(0.2, 0.0),
+    })
+    margin = graph.metric("margin")
+    calls = []
+    original = margin.compute_series
+    monkeypatch.setattr(margin, "compute_series", lambda data: calls.append(1) or original(data))
+
+    to_assets = graph.metric("margin_to_assets").get_chart_data(evaluator.inputs("margin_to_assets"))
+    to_liabilities = graph.metric("margin_to_liabilities").get_chart_data(evaluator.inputs("margin_to_liabilities"))
+
+    assert len(calls) == 1
+    assert to_assets.series[0].data == [0.2, 0.5]
+    assert to_liabilities.series[0].data == [0.5]
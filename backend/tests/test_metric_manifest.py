@@ -0,0 +1,7 @@
+from services.metrics.manifest import build_manifest, dump_manifest
+from services.metrics.registry import MANIFEST_PATH
+
+
+def test_manifest_matches_metric_sources():
+    # 新增或修改指标类后需重新生成：python -m services.metrics.manifest
+    assert MANIFEST_PATH.read_text(encoding="utf-8") == dump_manifest(build_manifest())
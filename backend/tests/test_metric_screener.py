@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.metrics.formula import FormulaError
+from services.metrics.predicate import compile_predicate
+from services.screener_service import _right_aligned_matrices
+
+
+def test_right_aligned_matrices():
+    index = pd.MultiIndex.from_tuples(
+        [(1, "2022"), (1, "2023"), (1, "2024"), (2, "2021"), (2, "2022"), (3, "2024")], names=["company_id", "year"]
+    )
+    frame = pd.DataFrame({"ratio": [1.5, 2.0, np.nan, 3.0, 4.0, np.nan], "debt": [0.1, 0.2, 0.3, 0.4, 0.5, np.nan]}, index=index)
+
+    matrices, company_ids, periods, latest = _right_aligned_matrices(frame)
+    # 公司 3 没有任何值被丢弃；公司 2 的最近一期为 2022
+    assert company_ids.tolist() == [1, 2]
+    assert [periods[i] for i in latest] == ["2024", "2022"]
+    np.testing.assert_array_equal(matrices["ratio"], [[np.nan, 1.5, 2.0, np.nan], [np.nan, np.nan, 3.0, 4.0]])
+
+
+def test_predicate_windows():
+    ratio = np.array([[np.nan, 1.2, 1.5, 1.1], [2.0, 0.9, 1.5, 1.1], [np.nan, np.nan, 3.0, 4.0]])
+    debt = np.array([[0.1, 0.2, 0.3, 0.4], [0.1, 0.2, 0.3, 0.4], [0.1, 0.2, 0.3, 0.6]])
+    matrices = {"fcf_ratio": ratio, "debt_ratio": debt}
+
+    predicate = compile_predicate("all_last(fcf_ratio > 1, 3) and debt_ratio < 0.5")
+    assert predicate.names == ("fcf_ratio", "debt_ratio")
+    assert predicate.evaluate(matrices)[:, -1].tolist() == [True, False, False]
+    assert compile_predicate("any_last(fcf_ratio < 1, 3)").evaluate(matrices)[:, -1].tolist() == [False, True, False]
+    # 操作数可以是公式；pct_change 不跨行
+    assert compile_predicate("1 < pct_change(fcf_ratio) + 1 <= 1.5").evaluate(matrices)[:, -1].tolist() == [False, False, True]
+
+    for source in ["fcf_ratio", "all_last(fcf_ratio > 1, 0)", "1 > 0"]:
+        with pytest.raises(FormulaError):
+            compile_predicate(source)
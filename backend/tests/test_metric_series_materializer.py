@@ -0,0 +1,28 @@
+import threading
+
+from repositories.events import StatementsChanged
+from schemas.financial import FinancialStatementType
+from services.metric_series_service import MetricSeriesMaterializer
+
+
+def test_writes_are_coalesced_and_materialized_off_the_publishing_thread():
+    materializer = MetricSeriesMaterializer(session_factory=None, debounce_seconds=0.2)
+    calls, done = [], threading.Event()
+
+    def refresh_company(company_id, statement_types):
+        calls.append((company_id, set(statement_types), threading.current_thread().name))
+        done.set()
+
+    materializer.refresh_company = refresh_company
+    materializer.start()
+    try:
+        # 分块上传：每个提交的分块发布一次事件
+        for statement_type in [FinancialStatementType.INCOME] * 10 + [FinancialStatementType.CASH]:
+            materializer.on_statements_changed(StatementsChanged(statement_type, 1))
+        assert not calls and materializer.is_stale(1)
+
+        assert done.wait(timeout=5)
+        assert calls == [(1, {FinancialStatementType.INCOME, FinancialStatementType.CASH}, "metric-series-materializer")]
+    finally:
+        materializer.shutdown(wait=True)
+    assert not materializer.is_stale(1)
@@ -0,0 +1,61 @@
+import os
+import time
+from pathlib import Path
+
+from core.config import config
+from modules.data_loader.fmp_loader import FMPBalanceSheetLoader, FMPBaseLoader, FMPCashFlowLoader, FMPIncomeSheetLoader
+from modules.data_loader.response_cache import ResponseCache, FixtureStore
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "financial_data"
+
+
+def test_cache_roundtrip_and_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1 << 20, default_ttl=60, endpoint_ttl={"short": 0})
+    cache.put("balance-sheet-statement", {"symbol": "AAPL", "apikey": "secret"}, [{"a": 1}])
+
+    # API Key 不参与寻址
+    assert cache.get("balance-sheet-statement", {"symbol": "AAPL"}) == [{"a": 1}]
+    assert cache.get("balance-sheet-statement", {"symbol": "MSFT"}) is None
+
+    cache.put("short", {"symbol": "AAPL"}, [{"a": 2}])
+    time.sleep(0.01)
+    assert cache.get("short", {"symbol": "AAPL"}) is None
+    assert cache.get("short", {"symbol": "AAPL"}, ignore_ttl=True) == [{"a": 2}]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1 << 20, default_ttl=60)
+    payload = [{"value": "x" * 100}]
+    cache.put("e", {"symbol": "A"}, payload)
+    # 容量只够三条缓存
+    cache.max_bytes = int(cache._current_size() * 3.5)
+    for i, symbol in enumerate(["A", "B", "C"]):
+        cache.put("e", {"symbol": symbol}, payload)
+        path = cache._path(cache.cache_key("e", {"symbol": symbol}))
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    cache.get("e", {"symbol": "A"})  # A 变为最近使用
+    cache.put("e", {"symbol": "D"}, payload)
+
+    assert cache.get("e", {"symbol": "B"}) is None
+    assert cache.get("e", {"symbol": "A"}) == payload
+    assert cache.get("e", {"symbol": "D"}) == payload
+
+
+def test_offline_replay_serves_fixtures_without_network(tmp_path):
+    loader = FMPBaseLoader(
+        "key",
+        base_url="http://127.0.0.1:9",
+        cache=ResponseCache(str(tmp_path), max_bytes=1 << 20, default_ttl=60),
+        fixtures=FixtureStore(str(FIXTURES_DIR)),
+        offline=True,
+    )
+    records = loader.fetch_all("balance-sheet-statement", "AAPL", period="annual", limit=2)
+    assert len(records) == 2
+    assert all(r["symbol"] == "AAPL" and r["period"] == "FY" for r in records)
+    assert loader.fetch_all("balance-sheet-statement", "MSFT") is None
+
+
+def test_endpoint_ttl_keys_match_loader_endpoints():
+    # 按端点覆盖的有效期只有在键与请求的端点名一致时才生效
+    endpoints = {FMPBalanceSheetLoader.endpoint, FMPIncomeSheetLoader.endpoint, FMPCashFlowLoader.endpoint}
+    assert set(config.financial_modeling_prep.cache.endpoint_ttl) == endpoints
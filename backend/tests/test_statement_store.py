@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from models import Company
+from repositories import statement_store as store_module
+from repositories.financial_repo import BalanceStatementRepository, IncomeStatementRepository
+from repositories.statement_store import StatementStore, _CompanyBlock, _StatementTable
+from schemas.financial import FinancialStatementType
+
+
+def _store():
+    store = StatementStore(session_factory=None, max_bytes=2**20)
+    income, balance = _StatementTable(IncomeStatementRepository()), _StatementTable(BalanceStatementRepository())
+    balance.attributes["goodwill"] = balance.core_width
+    revenue, total_assets = income.attributes["revenue"], balance.attributes["total_assets"]
+
+    years, periods = np.array(["2022", "2023", "2024"]), np.array(["FY", "FY", "FY"])
+    values = np.full((3, len(income.attributes)), np.nan)
+    values[:, revenue] = [10.0, np.nan, 30.0]
+    income.blocks[1] = _CompanyBlock(years, periods, values)
+    values = np.full((3, len(balance.attributes)), np.nan)
+    values[:, total_assets] = [100.0, 110.0, 120.0]
+    values[1:, balance.core_width] = [5.0, 6.0]
+    balance.blocks[1] = _CompanyBlock(years, periods, values)
+    # 属性 goodwill 加入之前建的块更窄
+    balance.blocks[2] = _CompanyBlock(years[:1], periods[:1], values[:1, :balance.core_width])
+
+    store._tables = {FinancialStatementType.INCOME: income, FinancialStatementType.BALANCE: balance}
+    store._ready = True
+    return store
+
+
+def test_series_rows():
+    store = _store()
+    types = [FinancialStatementType.INCOME, FinancialStatementType.BALANCE]
+    rows = store.series_rows(types, [1, 2], ["revenue", "goodwill"], ["FY"])
+    # 核心列的 NULL 保留为 None 行；EAV 属性只在有值的报表上存在
+    assert rows == [
+        (0, 1, "revenue", "2022", "FY", 10.0), (0, 1, "revenue", "2023", "FY", None), (0, 1, "revenue", "2024", "FY", 30.0),
+        (1, 1, "goodwill", "2023", "FY", 5.0), (1, 1, "goodwill", "2024", "FY", 6.0),
+    ]
+    assert store.series_rows(types, None, ["total_assets"], ["FY"], first_year=2023, limit=1) == [
+        (1, 1, "total_assets", "2024", "FY", 120.0),
+    ]
+    assert store.series_rows(types, [1], ["revenue"], ["Q1", "Q2", "Q3", "Q4"]) == []
+
+    store._ready = False
+    assert store.series_rows(types, [1], ["revenue"], ["FY"]) is None
+
+
+def _upload(db, repo):
+    db.add_all([Company(id=3, name="Microsoft", ticker="MSFT"), Company(id=2, name="Nvidia", ticker="NVDA")])
+    db.commit()
+    for company_id, symbol in [(3, "MSFT"), (1, "AAPL"), (2, "NVDA")]:
+        records = [
+            {"date": f"{year}-12-31", "symbol": symbol, "filingDate": f"{year + 1}-02-01", "fiscalYear": str(year),
+             "period": "FY", "revenue": company_id * 100 + year % 10, "customMargin": company_id / 10}
+            for year in (2023, 2024)
+        ]
+        repo.bulk_upsert_from_json(db, data=records, company_id=company_id)
+
+
+def test_load_in_company_batches(db, monkeypatch):
+    repo = IncomeStatementRepository()
+    _upload(db, repo)
+    monkeypatch.setattr(store_module, "LOAD_BATCH_COMPANIES", 2)
+    store = StatementStore(session_factory=lambda: db, max_bytes=2**20)
+    assert store.load([repo])
+
+    table = store._tables[FinancialStatementType.INCOME]
+    assert sorted(table.blocks) == [1, 2, 3]
+    assert table.estimate_nbytes(db) >= store._nbytes
+    assert store.series_rows([FinancialStatementType.INCOME], [2, 3], ["revenue", "custom_margin"], ["FY"]) == [
+        (0, 2, "revenue", "2023", "FY", 203.0), (0, 2, "revenue", "2024", "FY", 204.0),
+        (0, 2, "custom_margin", "2023", "FY", 0.2), (0, 2, "custom_margin", "2024", "FY", 0.2),
+        (0, 3, "revenue", "2023", "FY", 303.0), (0, 3, "revenue", "2024", "FY", 304.0),
+        (0, 3, "custom_margin", "2023", "FY", 0.3), (0, 3, "custom_margin", "2024", "FY", 0.3),
+    ]
+
+
+def test_load_skipped_when_estimate_exceeds_budget(db, monkeypatch):
+    repo = IncomeStatementRepository()
+    _upload(db, repo)
+    # 超出预算时不读取任何报表数据
+    monkeypatch.setattr(_StatementTable, "load_blocks", lambda *args: pytest.fail("statements loaded over budget"))
+    store = StatementStore(session_factory=lambda: db, max_bytes=64)
+    assert not store.load([repo])
+    assert not store.ready
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.app_factory import create_app
+from core.config import config
+from core.database import get_db
+
+
+@pytest.fixture
+def client(db):
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def _upload(client, records, batch_size=1):
+    return client.post(
+        f"{config.api.prefix}/financial-statements/upload",
+        data={"company_id": 1, "type": "income", "batch_size": batch_size},
+        files={"file": ("income.json", json.dumps(records).encode(), "application/json")},
+    )
+
+
+def _record(year, **values):
+    return {"date": f"{year}-09-28", "symbol": "AAPL", "filingDate": f"{year}-11-01", "fiscalYear": str(year), "period": "FY", **values}
+
+
+def test_upload_reports_committed_records_when_a_batch_fails(client):
+    # 第二条记录的 period 为空：仓储层抛出 HTTPException（422），而不是 ValueError
+    response = _upload(client, [_record(2023, revenue=1), {**_record(2024), "period": ""}])
+    assert response.status_code == 422
+    assert "after 1 committed records" in response.json()["msg"]
+
+    response = _upload(client, [_record(2023, revenue=1), _record(2024, revenue=2)])
+    assert response.status_code == 200
+    assert response.json()["data"]["statements"] == 2
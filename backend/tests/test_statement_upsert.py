@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import event
+
+from repositories.financial_repo import IncomeStatementRepository
+
+
+def _record(period="FY", **values):
+    return {"date": "2024-09-28", "symbol": "AAPL", "filingDate": "2024-11-01", "fiscalYear": "2024", "period": period, **values}
+
+
+def _stored(db, repo, period="FY"):
+    return db.query(repo.model).filter_by(symbol="AAPL", fiscal_year="2024", period=period).one()
+
+
+@pytest.fixture(params=["sqlite", "portable"])
+def upsert_db(request, db, monkeypatch):
+    """The SQLite session, natively or through the dialect-independent upsert fallback."""
+    if request.param == "portable":
+        monkeypatch.setattr(db.get_bind().dialect, "name", "postgresql")
+    return db
+
+
+def test_bulk_upsert_insert_update_unchanged(upsert_db):
+    db = upsert_db
+    repo = IncomeStatementRepository()
+    summary = repo.bulk_upsert_from_json(db, data=[_record(revenue=100, netIncome=10), _record("Q1", revenue=30)], company_id=1)
+    assert (summary.statements, summary.inserted, summary.updated, summary.unchanged) == (2, 2, 0, 0)
+
+    summary = repo.bulk_upsert_from_json(db, data=[_record(revenue=100, netIncome=10), _record("Q1", revenue=35)], company_id=1)
+    assert (summary.inserted, summary.updated, summary.unchanged) == (0, 1, 1)
+    assert _stored(db, repo, "Q1").revenue == 35
+
+
+def test_bulk_upsert_partial_record_keeps_other_columns(upsert_db):
+    db = upsert_db
+    repo = IncomeStatementRepository()
+    repo.bulk_upsert_from_json(db, data=_record(revenue=100, netIncome=10), company_id=1)
+
+    # 只带 netIncome 的记录不能把 revenue 覆盖为 NULL
+    summary = repo.bulk_upsert_from_json(db, data=_record(netIncome=12), company_id=1)
+    assert (summary.updated, summary.unchanged) == (1, 0)
+    db.expire_all()
+    stored = _stored(db, repo)
+    assert (stored.revenue, stored.net_income) == (100, 12)
+
+    # 部分记录中的字段与已存储值一致时不写入
+    summary = repo.bulk_upsert_from_json(db, data=_record(netIncome=12), company_id=1)
+    assert (summary.updated, summary.unchanged, summary.rows_touched) == (0, 1, 0)
+
+
+def _eav(db, repo):
+    return {row.attribute_name: (row.value_numeric, row.value_string) for row in db.query(repo.eav_model).all()}
+
+
+def test_eav_sync_writes_only_the_difference(db):
+    repo = IncomeStatementRepository()
+    writes = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, statement, *args: writes.append(statement.split()[0]))
+
+    filing = _record(revenue=100, customMargin=0.25, segmentCount=3, auditor="KPMG")
+    repo.bulk_upsert_from_json(db, data=filing, company_id=1)
+
+    # 未变化的报表重新同步：不产生任何写入（浮点值在容差内视为相同）
+    writes.clear()
+    summary = repo.bulk_upsert_from_json(db, data={**filing, "customMargin": 0.25 + 1e-9}, company_id=1)
+    assert (summary.eav_inserted, summary.eav_updated, summary.eav_deleted, summary.eav_skipped) == (0, 0, 0, 3)
+    assert not {"INSERT", "UPDATE", "DELETE"} & set(writes)
+
+    # 一个值变化、一个新属性、一个属性消失：各一次写入
+    changed = _record(revenue=100, customMargin=0.3, auditor="KPMG", goodwillRatio=0.1)
+    summary = repo.bulk_upsert_from_json(db, data=changed, company_id=1)
+    assert (summary.eav_inserted, summary.eav_updated, summary.eav_deleted, summary.eav_skipped) == (1, 1, 1, 1)
+    assert _eav(db, repo) == {"custom_margin": (0.3, None), "auditor": (None, "KPMG"), "goodwill_ratio": (0.1, None)}
@@ -0,0 +1,37 @@
+from repositories.events import StatementEvents, StatementVersionWatcher
+from repositories.financial_repo import IncomeStatementRepository
+from schemas.chart import ChartData, ChartTitle
+from schemas.financial import FinancialStatementType as T
+from services.chart_cache import ChartCache
+from services.metric_series_service import MetricSeriesMaterializer
+
+
+def _record(**values):
+    return {"date": "2024-09-28", "symbol": "AAPL", "filingDate": "2024-11-01", "fiscalYear": "2024", "period": "FY", **values}
+
+
+def test_writes_of_another_process_invalidate_its_caches(db):
+    # 另一个进程：自己的事件总线、图表缓存与版本监视器，共享同一个数据库
+    events, cache = StatementEvents(), ChartCache(max_entries=10, ttl_seconds=3600)
+    events.subscribe(cache.on_statements_changed)
+    watcher = StatementVersionWatcher(lambda: db, events)
+    watcher.poll(publish=False)
+    cache.put(1, "revenue", ChartData(title=ChartTitle(text="revenue"), series=[]), [T.INCOME])
+
+    # 本进程写入（发布到本进程的事件总线）
+    IncomeStatementRepository().bulk_upsert_from_json(db, data=_record(revenue=100), company_id=1)
+
+    remote = []
+    events.subscribe(remote.append)
+    assert watcher.poll() == 1
+    assert cache.get(1, "revenue") is None
+    assert remote[0].remote and (remote[0].company_id, remote[0].statement_type, remote[0].version) == (1, T.INCOME, 1)
+    # 已同步的版本不再重复发布
+    assert watcher.poll() == 0
+
+    # 写入进程尚未物化：其他进程的物化器据版本号判定为过期，图表实时计算
+    materializer = MetricSeriesMaterializer(lambda: db)
+    materializer.on_statements_changed(remote[0])
+    assert not materializer.is_stale(1) and materializer.is_stale(1, db)
+    materializer.versions.mark_materialized(db, 1, {T.INCOME: 1})
+    assert not materializer.is_stale(1, db)
@@ -0,0 +1,93 @@
+import codecs
+import json
+from typing import Any, BinaryIO, Dict, Iterator
+
+# 每次从文件读取的字节数
+READ_SIZE = 64 * 1024
+# 单个 JSON 元素允许占用的最大缓冲区（字符数），防止异常输入导致内存无限增长
+MAX_ELEMENT_SIZE = 16 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_records(fp: BinaryIO, *, read_size: int = READ_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    增量解析 JSON 文件，逐条产出记录，内存占用只与单条记录大小相关。
+
+    支持两种顶层结构：对象数组 `[{...}, {...}]`，或单个对象 `{...}`。
+    格式错误时抛出 ValueError。
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> None:
+        nonlocal buf, pos, eof
+        chunk = fp.read(read_size)
+        if not chunk:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+        else:
+            buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+
+    def next_char() -> str:
+        """跳过空白并返回下一个有效字符（不消费），文件结束时返回空字符串。"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                return ""
+            fill()
+
+    def decode_value() -> Any:
+        nonlocal pos
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # 数字可能恰好被缓冲区截断，需要确认其后还有分隔符
+                if end < len(buf) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Invalid JSON at character {e.pos}: {e.msg}") from e
+            if len(buf) - pos > MAX_ELEMENT_SIZE:
+                raise ValueError("JSON element exceeds the maximum allowed size.")
+            fill()
+
+    def as_record(value: Any) -> Dict[str, Any]:
+        if not isinstance(value, dict):
+            raise ValueError("Each element of the JSON array must be an object.")
+        return value
+
+    first = next_char()
+    if first == "{":
+        yield as_record(decode_value())
+        if next_char():
+            raise ValueError("Unexpected data after the top-level JSON object.")
+        return
+    if first != "[":
+        raise ValueError("JSON content must be an object or an array of objects.")
+    pos += 1
+
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            yield as_record(decode_value())
+            sep = next_char()
+            pos += 1
+            if sep == "]":
+                break
+            if sep != ",":
+                raise ValueError("Expected ',' or ']' between array elements.")
+
+    if next_char():
+        raise ValueError("Unexpected data after the top-level JSON array.")